@@ -0,0 +1,41 @@
+"""consecutivo diario de tickets
+
+Revision ID: 5c1f0a7d2e43
+Revises: 231449849d5e
+Create Date: 2026-10-17 09:12:41.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f0a7d2e43'
+down_revision: Union[str, Sequence[str], None] = '231449849d5e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ticket_sequences',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('last_value', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('day')
+    )
+
+    # Continuar la numeración existente: último consecutivo emitido por día
+    op.execute("""
+        INSERT INTO ticket_sequences (day, last_value)
+        SELECT to_date(split_part(ticket_number, '-', 2), 'YYYYMMDD'),
+               MAX(CAST(split_part(ticket_number, '-', 3) AS INTEGER))
+        FROM sale_tickets
+        WHERE ticket_number LIKE 'TKT-%'
+        GROUP BY 1
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('ticket_sequences')
@@ -0,0 +1,53 @@
+"""indices de busqueda por trigramas
+
+Revision ID: 8b3e61c4f9a2
+Revises: 5c1f0a7d2e43
+Create Date: 2026-10-17 11:40:08.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3e61c4f9a2'
+down_revision: Union[str, Sequence[str], None] = '5c1f0a7d2e43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+
+    # unaccent() no es IMMUTABLE; este envoltorio permite usarlo en índices
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+        $func$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $func$
+    """)
+
+    # Búsqueda por nombre sin acentos ni mayúsculas ("pechuga" encuentra "Pechúga")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_product_name_trgm
+        ON "Master_Data" USING gin (f_unaccent(lower("Product")) gin_trgm_ops)
+    """)
+
+    # Subcadenas de código y código de barras
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_product_code_trgm
+        ON "Master_Data" USING gin (lower("Code") gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_product_barcode_trgm
+        ON "Master_Data" USING gin (lower("Barcode") gin_trgm_ops)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_product_barcode_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_product_code_trgm")
+    op.execute("DROP INDEX IF EXISTS idx_product_name_trgm")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
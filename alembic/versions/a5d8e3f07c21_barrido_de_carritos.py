@@ -0,0 +1,43 @@
+"""barrido de carritos abandonados: índice y archivo de items
+
+Revision ID: a5d8e3f07c21
+Revises: e7b2c94f1a36
+Create Date: 2026-10-17 18:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d8e3f07c21'
+down_revision: Union[str, Sequence[str], None] = 'e7b2c94f1a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_cart_status_updated', 'cart', ['status', 'updated_at'], unique=False)
+    op.create_table(
+        'cart_items_archive',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('cart_id', sa.BigInteger(), nullable=False),
+        sa.Column('product_id', sa.BigInteger(), nullable=False),
+        sa.Column('product_name', sa.Text(), nullable=False),
+        sa.Column('price', sa.NUMERIC(10, 2), nullable=False),
+        sa.Column('quantity', sa.NUMERIC(10, 4), nullable=False),
+        sa.Column('subtotal', sa.NUMERIC(10, 2), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        op.f('ix_cart_items_archive_cart_id'), 'cart_items_archive', ['cart_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_cart_items_archive_cart_id'), table_name='cart_items_archive')
+    op.drop_table('cart_items_archive')
+    op.drop_index('idx_cart_status_updated', table_name='cart')
@@ -0,0 +1,69 @@
+"""rollups de ventas por hora y por producto
+
+Revision ID: d41a7c2b9e10
+Revises: 8b3e61c4f9a2
+Create Date: 2026-10-17 11:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7c2b9e10'
+down_revision: Union[str, Sequence[str], None] = '8b3e61c4f9a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sales_rollup_hourly',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('hour', sa.Integer(), nullable=False),
+        sa.Column('payment_method', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('num_tickets', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total', sa.NUMERIC(14, 2), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('day', 'hour', 'payment_method', 'user_id')
+    )
+    op.create_table(
+        'sales_rollup_product_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('product_id', sa.BigInteger(), nullable=False),
+        sa.Column('quantity', sa.NUMERIC(14, 4), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.NUMERIC(14, 2), nullable=False, server_default='0'),
+        sa.Column('num_orders', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('day', 'product_id')
+    )
+    op.create_index(
+        op.f('ix_sales_rollup_product_daily_product_id'),
+        'sales_rollup_product_daily', ['product_id'], unique=False
+    )
+
+    # Backfill con el historial existente (mismas cubetas que crud_rollups)
+    op.execute("""
+        INSERT INTO sales_rollup_hourly (day, hour, payment_method, user_id, num_tickets, total)
+        SELECT CAST(created_at AS DATE), CAST(EXTRACT(HOUR FROM created_at) AS INTEGER),
+               payment_method, user_id, COUNT(*), SUM(total)
+        FROM sale_tickets
+        WHERE status = 'completed'
+        GROUP BY 1, 2, 3, 4
+    """)
+    op.execute("""
+        INSERT INTO sales_rollup_product_daily (day, product_id, quantity, revenue, num_orders)
+        SELECT CAST(t.created_at AS DATE), i.product_id,
+               SUM(i.quantity), SUM(i.subtotal), COUNT(DISTINCT t.id)
+        FROM sale_ticket_items i
+        JOIN sale_tickets t ON t.id = i.ticket_id
+        WHERE t.status = 'completed'
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sales_rollup_product_daily_product_id'), table_name='sales_rollup_product_daily')
+    op.drop_table('sales_rollup_product_daily')
+    op.drop_table('sales_rollup_hourly')
@@ -0,0 +1,35 @@
+"""total e item_count desnormalizados en cart
+
+Revision ID: e7b2c94f1a36
+Revises: d41a7c2b9e10
+Create Date: 2026-10-17 16:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c94f1a36'
+down_revision: Union[str, Sequence[str], None] = 'd41a7c2b9e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cart', sa.Column('total', sa.NUMERIC(12, 2), nullable=False, server_default='0'))
+    op.add_column('cart', sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill desde cart_items (mismo cálculo que verificar_totales_carritos)
+    op.execute("""
+        UPDATE cart SET
+            total = COALESCE((SELECT SUM(i.subtotal) FROM cart_items i WHERE i.cart_id = cart.id), 0),
+            item_count = (SELECT COUNT(*) FROM cart_items i WHERE i.cart_id = cart.id)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('cart', 'item_count')
+    op.drop_column('cart', 'total')
@@ -21,8 +21,26 @@ class Settings(BaseSettings):
 def get_settings():
     return Settings()
 
-# Uso en security.py
-from app.core.config import get_settings
+class DatabaseSettings(BaseSettings):
+    """
+    Pool de conexiones (variables DB_*). Va aparte de Settings para que
+    database.py, alembic y los scripts no requieran SECRET_KEY.
+    """
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Límite por sentencia en Postgres (0 = sin límite)
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    # Esperas de checkout a partir de este umbral se registran en el log
+    DB_POOL_SLOW_CHECKOUT_MS: float = 100
+    
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+        extra = "ignore"
 
-settings = get_settings()
-SECRET_KEY = settings.SECRET_KEY
\ No newline at end of file
+@lru_cache()
+def get_database_settings():
+    return DatabaseSettings()
\ No newline at end of file
@@ -32,6 +32,12 @@ class DuplicateError(AppException):
         )
 
 
+class ConflictError(AppException):
+    """El recurso cambió de estado y la operación ya no aplica"""
+    def __init__(self, message: str):
+        super().__init__(message, status_code=409)
+
+
 class InsufficientStockError(AppException):
     """Stock insuficiente"""
     def __init__(self, product_name: str, available: int, requested: int):
@@ -0,0 +1,294 @@
+"""
+Registro de métricas en proceso, expuesto en formato de texto de Prometheus.
+
+Los contadores e histogramas acumulan en un shard por hilo (threading.local):
+incrementar no toma ningún lock compartido, solo el primer uso de cada
+hilo registra su shard. Al exportar se suman los shards de todos los hilos.
+
+    from app.core.metrics import metrics
+    metrics.tickets_created.inc(payment_method="cash")
+"""
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as SATimeoutError
+
+
+# Cubetas de latencia de requests (segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Cubetas de espera del pool: normalmente sub-milisegundo, hasta pool_timeout (30 s)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger("pos.db")
+
+
+class _Sharded:
+    """Valores por hilo; cada shard solo lo escribe su propio hilo"""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards: List[Dict] = []
+        self._register_lock = threading.Lock()
+
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._register_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter(_Sharded):
+    """Contador monotónico con etiquetas"""
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.items()):
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{self._label_text(key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Sharded):
+    """Histograma con cubetas fijas y etiquetas"""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            # [conteo por cubeta (+Inf al final), suma, conteo]
+            state = shard[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self) -> List[str]:
+        totals: Dict[Tuple[str, ...], list] = {}
+        for shard in list(self._shards):
+            for key, (counts, total, count) in list(shard.items()):
+                merged = totals.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(totals.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = self._label_text(key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Valor instantáneo que se lee al exportar"""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float], labels: Dict[str, str] = None):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.labels = labels or {}
+
+    def sample(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        labels = ",".join(f'{name}="{_escape(value)}"' for name, value in self.labels.items())
+        return [f"{self.name}{{{labels}}} {_number(value)}" if labels else f"{self.name} {_number(value)}"]
+
+    def render(self) -> List[str]:
+        sample = self.sample()
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", *sample] if sample else []
+
+
+class MetricsRegistry:
+    """Métricas del POS: HTTP, pool de conexiones y contadores de negocio"""
+
+    def __init__(self):
+        self.http_latency = Histogram(
+            "pos_http_request_duration_seconds", "Latencia de los requests HTTP",
+            labels=("method", "route", "status")
+        )
+        self.pool_checkout = Histogram(
+            "pos_db_pool_checkout_seconds", "Espera para obtener una conexión del pool",
+            labels=("pool",), buckets=POOL_WAIT_BUCKETS
+        )
+        self.pool_timeouts = Counter(
+            "pos_db_pool_timeouts_total", "Checkouts que agotaron pool_timeout", labels=("pool",)
+        )
+        self.tickets_created = Counter(
+            "pos_tickets_created_total", "Tickets de venta creados", labels=("payment_method",)
+        )
+        self.carts_opened = Counter("pos_carts_opened_total", "Carritos creados")
+        self.withdrawals = Counter(
+            "pos_withdrawals_total", "Retiros de efectivo registrados", labels=("reason",)
+        )
+        self.checkout_failures = Counter(
+            "pos_checkout_failures_total", "Checkouts rechazados", labels=("reason",)
+        )
+        self.carts_swept = Counter(
+            "pos_carts_swept_total", "Carritos abiertos abandonados cancelados por el barrido"
+        )
+        self.cart_items_archived = Counter(
+            "pos_cart_items_archived_total", "Items de carritos abandonados movidos a cart_items_archive"
+        )
+        self.gauges: List[Gauge] = []
+
+    def instrument_engine(self, engine, slow_checkout_ms: float = 100, pool_name: str = "sync") -> None:
+        """
+        Mide la espera de checkout del pool, cuenta los timeouts, registra en
+        el log las esperas de slow_checkout_ms o más y publica el tamaño del
+        pool como gauges, todo con la etiqueta pool=pool_name. Para el engine
+        async se instrumenta su sync_engine.
+
+        engine.dispose() reemplaza el pool: el evento engine_disposed
+        instrumenta el nuevo y los gauges leen siempre engine.pool.
+        """
+        if getattr(engine, "_pos_metrics", False):
+            return
+        engine._pos_metrics = True
+        self._instrument_pool(engine.pool, slow_checkout_ms, pool_name)
+        event.listen(
+            engine, "engine_disposed",
+            lambda disposed: self._instrument_pool(disposed.pool, slow_checkout_ms, pool_name)
+        )
+
+        for name, help_text, method in (
+            ("pos_db_pool_size", "Tamaño configurado del pool", "size"),
+            ("pos_db_pool_checked_out", "Conexiones prestadas en este momento", "checkedout"),
+            ("pos_db_pool_overflow", "Conexiones abiertas por encima del tamaño del pool", "overflow"),
+        ):
+            if hasattr(engine.pool, method):
+                self.gauges.append(Gauge(
+                    name, help_text, lambda method=method: getattr(engine.pool, method)(), labels={"pool": pool_name}
+                ))
+
+    def _instrument_pool(self, pool, slow_checkout_ms: float, pool_name: str) -> None:
+        """Envuelve pool.connect para medir la espera de checkout"""
+        if getattr(pool, "_pos_metrics", False):
+            return
+        connect = pool.connect
+
+        def timed_connect():
+            start = time.perf_counter()
+            try:
+                return connect()
+            except SATimeoutError:
+                self.pool_timeouts.inc(pool=pool_name)
+                logger.error(json.dumps({"event": "pool_timeout", "pool": pool_name, **_pool_status(pool)}))
+                raise
+            finally:
+                waited = time.perf_counter() - start
+                self.pool_checkout.observe(waited, pool=pool_name)
+                if waited * 1000 >= slow_checkout_ms:
+                    logger.warning(json.dumps({
+                        "event": "slow_pool_checkout", "pool": pool_name, "ms": round(waited * 1000, 2),
+                        **_pool_status(pool)
+                    }))
+
+        pool.connect = timed_connect
+        pool._pos_metrics = True
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.http_latency, self.pool_checkout, self.pool_timeouts):
+            lines.extend(metric.render())
+        lines.extend(self._render_gauges())
+        for metric in (
+            self.tickets_created, self.carts_opened, self.withdrawals, self.checkout_failures,
+            self.carts_swept, self.cart_items_archived
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _render_gauges(self) -> List[str]:
+        """Un solo HELP/TYPE por nombre: cada engine aporta su muestra con su etiqueta pool"""
+        families: Dict[str, List[Gauge]] = {}
+        for gauge in self.gauges:
+            families.setdefault(gauge.name, []).append(gauge)
+        lines: List[str] = []
+        for name, gauges in families.items():
+            samples = [line for gauge in gauges for line in gauge.sample()]
+            if samples:
+                lines.extend([f"# HELP {name} {gauges[0].help}", f"# TYPE {name} gauge", *samples])
+        return lines
+
+
+# Instancia compartida por el proceso
+metrics = MetricsRegistry()
+
+
+async def metrics_middleware(request, call_next):
+    """Middleware HTTP: latencia por plantilla de ruta (/tickets/{ticket_id}), método y status"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.http_latency.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+
+def _pool_status(pool) -> dict:
+    return {
+        name: getattr(pool, name)()
+        for name in ("size", "checkedout", "overflow")
+        if hasattr(pool, name)
+    }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
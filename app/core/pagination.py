@@ -0,0 +1,91 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+En lugar de OFFSET, cada página continúa después de la última fila de la
+anterior: WHERE (created_at, id) < (:created_at, :id) ORDER BY ... LIMIT n.
+El costo es constante sin importar qué tan profunda sea la página.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from app.core.exceptions import ValidationError
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Convierte los valores de la llave en un cursor opaco (base64 url-safe)"""
+    raw = json.dumps([
+        v.isoformat() if isinstance(v, (datetime, date)) else v
+        for v in values
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    """
+    Recupera los valores de la llave de un cursor.
+
+    Raises:
+        ValidationError: Si el cursor no es válido para estas columnas
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+
+        result = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            else:
+                value = python_type(value)
+            result.append(value)
+        return result
+    except (ValueError, TypeError, NotImplementedError):
+        raise ValidationError("cursor", "Cursor de paginación inválido")
+
+
+def paginate_keyset(
+    query: Query,
+    columns: Sequence,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    descending: bool = True
+) -> Tuple[List, Optional[str]]:
+    """
+    Aplica paginación por cursor a una consulta.
+
+    Args:
+        query: Consulta con los filtros ya aplicados (sin ORDER BY ni OFFSET)
+        columns: Columnas de la llave, la última debe ser única (ej. created_at, id)
+        cursor: Cursor recibido de la página anterior (None para la primera)
+        limit: Máximo de filas por página
+        descending: True para ordenar de más reciente a más antiguo
+
+    Returns:
+        (filas de la página, cursor de la siguiente página o None si es la última)
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        bound = tuple_(*values)
+        query = query.filter(key < bound if descending else key > bound)
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, c.key) for c in columns])
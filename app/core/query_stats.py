@@ -0,0 +1,154 @@
+"""
+Estadísticas de SQL por request.
+
+Los eventos before/after_cursor_execute del engine miden cada sentencia
+y la suman a las estadísticas del request en curso (un contextvar que
+fija el middleware). Al terminar el request se escribe una línea de log
+estructurada (JSON) y, con QUERY_STATS_HEADERS=1, se agregan headers:
+
+    X-DB-Statements, X-DB-Time-Ms, X-DB-Slowest-Ms
+
+Las sentencias que tardan SLOW_QUERY_MS o más se registran como lentas;
+con SLOW_QUERY_EXPLAIN=1 el log incluye su plan (EXPLAIN).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+
+# Headers X-DB-* en las respuestas (modo debug)
+QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", "0") == "1"
+# Umbral de consulta lenta, en milisegundos
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Adjuntar el plan de las consultas lentas
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "0") == "1"
+
+logger = logging.getLogger("pos.sql")
+
+
+class RequestQueryStats:
+    """
+    Sentencias, tiempo total y sentencia más lenta de un request.
+    Un request puede registrar desde varios hilos (consultas en paralelo).
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.statements += 1
+            self.total_ms += elapsed_ms
+            if elapsed_ms >= self.slowest_ms:
+                self.slowest_ms = elapsed_ms
+                self.slowest_statement = statement
+
+    def as_dict(self) -> Dict:
+        return {
+            "statements": self.statements,
+            "db_ms": round(self.total_ms, 2),
+            "slowest_ms": round(self.slowest_ms, 2),
+            "slowest_statement": self.slowest_statement
+        }
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-DB-Statements": str(self.statements),
+            "X-DB-Time-Ms": f"{self.total_ms:.2f}",
+            "X-DB-Slowest-Ms": f"{self.slowest_ms:.2f}"
+        }
+
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def current_stats() -> Optional[RequestQueryStats]:
+    """Estadísticas del request en curso (None fuera de un request)"""
+    return _current.get()
+
+
+def install(engine) -> None:
+    """Registra los eventos de medición en el engine (una sola vez)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+async def query_stats_middleware(request, call_next):
+    """
+    Middleware HTTP: mide el SQL del request y lo publica en el log y,
+    en modo debug, en los headers de la respuesta.
+
+    En respuestas por streaming solo cuenta lo ejecutado antes de
+    empezar a enviar el cuerpo.
+    """
+    stats = RequestQueryStats()
+    token = _current.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+
+    logger.info(json.dumps({
+        "event": "request_sql",
+        "method": request.method,
+        "path": request.url.path,
+        "status": response.status_code,
+        **stats.as_dict()
+    }))
+    if QUERY_STATS_HEADERS:
+        response.headers.update(stats.headers())
+    return response
+
+
+def explain(connection, statement: str, parameters) -> List[str]:
+    """
+    Plan de una sentencia SELECT (EXPLAIN QUERY PLAN en SQLite, EXPLAIN en
+    Postgres). Usa un cursor DBAPI aparte para no volver a disparar los eventos.
+    """
+    prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception as exc:
+        return [f"EXPLAIN no disponible: {exc}"]
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        entry = {"event": "slow_query", "ms": round(elapsed_ms, 2), "statement": statement}
+        if SLOW_QUERY_EXPLAIN and not executemany and statement.lstrip().upper().startswith("SELECT"):
+            entry["plan"] = explain(conn, statement, parameters)
+        logger.warning(json.dumps(entry, default=str))
+
+
+def _handle_error(context) -> None:
+    """Una sentencia que falla no llega a after_cursor_execute: se descarta su inicio"""
+    connection = context.connection
+    if connection is not None and context.execution_context is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
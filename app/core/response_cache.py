@@ -0,0 +1,140 @@
+"""
+Caché de respuestas para reportes y dashboard.
+LRU acotado por tamaño, con TTL e invalidación por eventos (etiquetas).
+"""
+
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Parámetros de la ruta que no forman parte de la llave
+_EXCLUDED_PARAMS = ("db", "current_user")
+
+
+class ResponseCache:
+    """
+    Caché de respuestas por ruta y parámetros normalizados.
+
+    - Cada entrada lleva etiquetas (ej. "sales"); invalidate("sales")
+      descarta todas las entradas con esa etiqueta.
+    - Una respuesta calculada mientras ocurría una invalidación no se
+      guarda, así nunca queda una respuesta anterior a la última venta.
+    - El TTL acota lo desactualizado que puede quedar un worker cuando
+      el evento ocurrió en otro proceso.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # llave -> (respuesta, etiquetas, momento de carga)
+        self._entries: "OrderedDict[Tuple, Tuple[Any, Tuple[str, ...], float]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Tuple, tags: Iterable[str], compute: Callable[[], Any]) -> Any:
+        """
+        Regresa la respuesta guardada o la calcula y la guarda.
+
+        Args:
+            key: Llave de la respuesta (ruta y parámetros)
+            tags: Eventos que invalidan la respuesta
+            compute: Función que genera la respuesta en un miss
+        """
+        tags = tuple(tags)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            token = self._token(tags)
+
+        value = compute()
+
+        with self._lock:
+            # Si hubo invalidaciones durante el cálculo la respuesta puede estar vieja
+            if token == self._token(tags):
+                self._entries[key] = (value, tags, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, *tags: str) -> None:
+        """Descarta las respuestas que dependen de alguno de estos eventos"""
+        with self._lock:
+            self.invalidations += 1
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [k for k, (_, entry_tags, _) in self._entries.items() if set(entry_tags) & set(tags)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Vacía el caché"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Contadores de aciertos, fallos, desalojos e invalidaciones"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    def _token(self, tags: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+
+# Instancia compartida por el proceso
+response_cache = ResponseCache()
+
+
+def cached_response(name: str, tags: Iterable[str]):
+    """
+    Decorador para rutas: la llave es el nombre de la ruta más sus
+    parámetros de consulta ordenados (sin la sesión ni el usuario).
+
+        @router.get("/summary")
+        @cached_response("dashboard.summary", tags=("sales",))
+        def get_dashboard_summary(period: str = "today", db: Session = Depends(get_db)):
+            ...
+    """
+    tags = tuple(tags)
+
+    def decorator(endpoint: Callable) -> Callable:
+        @functools.wraps(endpoint)
+        def wrapper(**kwargs):
+            params = tuple(sorted(
+                (k, v) for k, v in kwargs.items() if k not in _EXCLUDED_PARAMS
+            ))
+            return response_cache.get_or_compute(
+                (name, params), tags, lambda: endpoint(**kwargs)
+            )
+        return wrapper
+
+    return decorator
@@ -71,8 +71,12 @@ def get_current_user(
     db: Session = Depends(get_db)
 ) -> Users:
     """Obtiene el usuario actual desde el token JWT"""
-    token = credentials.credentials
-    payload = decode_access_token(token)
+    username = _username_del_token(credentials)
+    user = db.query(Users).filter(Users.Username == username).first()
+    return _usuario_existente(user)
+
+def _username_del_token(credentials: HTTPAuthorizationCredentials) -> str:
+    payload = decode_access_token(credentials.credentials)
     
     username: str = payload.get("sub")
     if username is None:
@@ -80,14 +84,14 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales inválidas",
         )
-    
-    user = db.query(Users).filter(Users.Username == username).first()
+    return username
+
+def _usuario_existente(user: Users | None) -> Users:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario no encontrado",
         )
-    
     return user
 
 def get_current_active_user(current_user: Users = Depends(get_current_user)) -> Users:
@@ -0,0 +1,80 @@
+"""
+Ventanas de tiempo para reportes.
+
+Convierte un día de negocio (en la zona horaria de la tienda) en un rango
+semiabierto [inicio, fin) en UTC, que es como se guardan created_at y
+opened_at (datetime.utcnow()). Filtrar con
+
+    columna >= inicio AND columna < fin
+
+usa los índices sobre la columna; func.date(columna) == fecha no puede.
+"""
+
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import and_
+
+from app.core.exceptions import ValidationError
+
+
+# Zona horaria de la tienda (ej. "America/Mexico_City"); sin valor, UTC
+STORE_TIMEZONE = os.getenv("STORE_TIMEZONE") or None
+
+
+def store_zone(tz: Optional[str] = None):
+    """
+    Zona horaria a usar: la indicada, la de la tienda o UTC.
+
+    Raises:
+        ValidationError: Si la zona horaria no existe
+    """
+    name = tz or STORE_TIMEZONE
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError("tz", f"Zona horaria desconocida: {name}")
+
+
+def business_today(tz: Optional[str] = None) -> date:
+    """Fecha actual en la zona horaria de la tienda"""
+    return datetime.now(store_zone(tz)).date()
+
+
+def day_window(day: Optional[date] = None, tz: Optional[str] = None) -> Tuple[datetime, datetime]:
+    """
+    Rango [inicio, fin) en UTC (sin tzinfo) de un día de negocio.
+
+    Args:
+        day: Día de negocio (por defecto, hoy en la zona de la tienda)
+        tz: Zona horaria (por defecto STORE_TIMEZONE, o UTC)
+
+    Returns:
+        (inicio, fin) comparables contra columnas guardadas con utcnow()
+    """
+    zone = store_zone(tz)
+    if day is None:
+        day = datetime.now(zone).date()
+
+    start = datetime.combine(day, time.min, tzinfo=zone)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=zone)
+    return _to_utc(start), _to_utc(end)
+
+
+def within(column, window: Tuple[datetime, datetime]):
+    """Condición semiabierta column >= inicio AND column < fin"""
+    start, end = window
+    return and_(column >= start, column < end)
+
+
+def to_store_time(moment: datetime, tz: Optional[str] = None) -> datetime:
+    """Convierte un datetime UTC (sin tzinfo) a la hora local de la tienda"""
+    return moment.replace(tzinfo=timezone.utc).astimezone(store_zone(tz)).replace(tzinfo=None)
+
+
+def _to_utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
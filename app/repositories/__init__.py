@@ -2,5 +2,13 @@
 Repositorios para acceso a datos.
 """
 from .product_repository import ProductRepository
+from .catalog_cache import CatalogCache, catalog_cache
+from .search_index import NgramIndex, ngram_index, normalize_text
+from .inventory_counters import InventoryCounters, inventory_counters
 
-__all__ = ['ProductRepository']
\ No newline at end of file
+__all__ = [
+    'ProductRepository',
+    'CatalogCache', 'catalog_cache',
+    'NgramIndex', 'ngram_index', 'normalize_text',
+    'InventoryCounters', 'inventory_counters'
+]
\ No newline at end of file
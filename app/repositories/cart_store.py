@@ -0,0 +1,518 @@
+"""
+Almacén write-behind de carritos abiertos.
+Opcional: con CART_STORE=memory los items de los carritos abiertos viven en
+memoria y se escriben en cart/cart_items solo al cobrar, al cancelar o en el
+volcado periódico. Cada cambio se registra antes en un journal local
+(append-only, JSON por línea) que se vuelve a aplicar al arrancar.
+
+El encabezado del carrito se inserta al crearlo (el Id sale de la BD) y los
+cambios de estado se escriben de inmediato; lo que se difiere son los items.
+El backend en memoria es por proceso: con varios workers se necesita un
+backend compartido (misma interfaz que MemoryCartBackend) o afinidad de
+sesión por carrito.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+# Importar modelos de SQLAlchemy
+from models import Cart, CartItem, Product
+
+from app.core.exceptions import ConflictError
+
+
+CART_STORE = os.getenv("CART_STORE", "db")
+CART_STORE_JOURNAL = os.getenv("CART_STORE_JOURNAL", "cart_journal.log")
+CART_STORE_FSYNC = os.getenv("CART_STORE_FSYNC", "1") == "1"
+CART_STORE_FLUSH_SECONDS = float(os.getenv("CART_STORE_FLUSH_SECONDS", "30"))
+
+logger = logging.getLogger("pos.carts")
+
+# Error (409) al tocar un carrito que un checkout está cerrando o ya cerró
+CARRITO_NO_DISPONIBLE = "El carrito se está cobrando o ya fue cerrado"
+
+_ITEM_FIELDS = ("id", "product_id", "product_name", "price", "quantity", "subtotal")
+
+
+class CartState:
+    """
+    Estado en memoria de un carrito abierto.
+    Los items se indexan por producto (un renglón por producto, como en BD);
+    su Id es local al carrito y estable mientras el carrito siga abierto.
+    cerrando marca que sus items ya van en la transacción de un cobro o
+    cancelación: hasta cerrar() o liberar() no acepta cambios.
+    """
+    __slots__ = ("id", "user_id", "status", "created_at", "updated_at",
+                 "items", "next_item_id", "version", "flushed_version", "cerrando")
+
+    def __init__(self, cart_id: int, user_id: Optional[int], created_at: datetime):
+        self.id = cart_id
+        self.user_id = user_id
+        self.status = "open"
+        self.created_at = created_at
+        self.updated_at = created_at
+        self.items: Dict[int, Dict] = {}
+        self.next_item_id = 1
+        self.version = 0
+        self.flushed_version = 0
+        self.cerrando = False
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.flushed_version
+
+    @property
+    def total(self) -> Decimal:
+        return sum((i["subtotal"] for i in self.items.values()), Decimal("0"))
+
+    def find_item(self, item_id: int) -> Optional[Dict]:
+        return next((i for i in self.items.values() if i["id"] == item_id), None)
+
+    def to_cart(self) -> Cart:
+        """Copia como Cart transitorio (fuera de la sesión) para las respuestas"""
+        cart = Cart(
+            id=self.id, user_id=self.user_id, status=self.status,
+            created_at=self.created_at, updated_at=self.updated_at,
+            total=self.total, item_count=len(self.items)
+        )
+        cart.items = [_to_cart_item(self.id, item) for item in self.items.values()]
+        return cart
+
+
+class MemoryCartBackend:
+    """
+    Backend en memoria del proceso. Un backend compartido solo tiene que
+    guardar y regresar CartState por Id con estas mismas operaciones.
+    """
+
+    def __init__(self):
+        self._carts: Dict[int, CartState] = {}
+
+    def get(self, cart_id: int) -> Optional[CartState]:
+        return self._carts.get(cart_id)
+
+    def put(self, state: CartState) -> None:
+        self._carts[state.id] = state
+
+    def delete(self, cart_id: int) -> None:
+        self._carts.pop(cart_id, None)
+
+    def all(self) -> List[CartState]:
+        return list(self._carts.values())
+
+
+class CartStore:
+    """
+    Carritos abiertos con escritura diferida.
+
+    - Cada cambio se agrega al journal (con fsync) antes de responder, así
+      que un reinicio no pierde canastas: start() vuelve a aplicar el journal
+      y escribe los carritos recuperados.
+    - escribir() deja el estado del carrito en la transacción del llamador
+      (checkout o cancelación); cerrar() lo saca del almacén tras el commit y
+      liberar() lo reabre si la transacción se revierte. Entre escribir() y
+      cualquiera de los dos, los cambios al carrito se rechazan (409): un
+      escaneo no se confirma al cajero para luego perderse.
+    - flush() escribe los carritos con cambios pendientes y compacta el
+      journal; start() lo programa cada CART_STORE_FLUSH_SECONDS.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = CART_STORE == "memory",
+        journal_path: str = CART_STORE_JOURNAL,
+        fsync: bool = CART_STORE_FSYNC,
+        backend: Optional[MemoryCartBackend] = None
+    ):
+        self.enabled = enabled
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self.backend = backend or MemoryCartBackend()
+        self.flushes = 0
+        self._journal = None
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.RLock()
+
+    # ------------------ Ciclo de vida ------------------
+    def start(self, session_factory: Callable[[], Session], interval: float = CART_STORE_FLUSH_SECONDS) -> None:
+        """Recupera el journal, escribe lo recuperado y programa el volcado periódico"""
+        if not self.enabled:
+            return
+        self._session_factory = session_factory
+        recuperados = self._replay()
+        if recuperados:
+            logger.info(json.dumps({"event": "cart_store_recovered", "carts": recuperados}))
+        self.flush()
+
+        if self._thread is None and interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name="cart-store-flush", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el volcado periódico y escribe lo pendiente"""
+        if not self.enabled:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    # ------------------ Lecturas ------------------
+    def tiene(self, cart_id: int) -> bool:
+        return self.enabled and self.backend.get(cart_id) is not None
+
+    def obtener(self, cart_id: int) -> Optional[Cart]:
+        """Carrito con sus items (Cart transitorio) o None si no está en el almacén"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            state = self.backend.get(cart_id)
+            return state.to_cart() if state is not None else None
+
+    def ultima_actividad(self, cart_id: int) -> Optional[datetime]:
+        """Momento del último cambio en memoria (en BD llega con el volcado)"""
+        state = self.backend.get(cart_id) if self.enabled else None
+        return state.updated_at if state is not None else None
+
+    def total(self, cart_id: int) -> Optional[Decimal]:
+        """Total en memoria o None si el carrito ya no está en el almacén"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            state = self.backend.get(cart_id)
+            return state.total if state is not None else None
+
+    def stats(self) -> Dict:
+        carts = self.backend.all() if self.enabled else []
+        return {
+            "enabled": self.enabled,
+            "open_carts": len(carts),
+            "dirty_carts": sum(1 for s in carts if s.dirty),
+            "flushes": self.flushes
+        }
+
+    # ------------------ Cambios ------------------
+    def abrir(self, cart: Cart) -> None:
+        """Registra un carrito recién creado (su encabezado ya está en BD)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            state = CartState(cart.id, cart.user_id, cart.created_at or datetime.utcnow())
+            self._append([{
+                "op": "open", "cart": state.id, "user_id": state.user_id,
+                "created_at": state.created_at.isoformat()
+            }])
+            self.backend.put(state)
+
+    def agregar(self, cart_id: int, lineas: Iterable[Tuple[Product, Decimal]]) -> List[CartItem]:
+        """
+        Suma cantidades al carrito (un renglón por producto) con una sola
+        escritura al journal. Regresa el item resultante de cada línea.
+        """
+        with self._lock:
+            state = self._abierto(cart_id)
+            # Se calcula sobre copias: la memoria cambia solo si el journal se escribió
+            tocados, resultado = {}, []
+            next_item_id = state.next_item_id
+            for product, quantity in lineas:
+                item = tocados.get(product.Id)
+                if item is None:
+                    actual = state.items.get(product.Id)
+                    if actual is not None:
+                        item = dict(actual)
+                    else:
+                        item = {
+                            "id": next_item_id, "product_id": product.Id,
+                            "product_name": product.Product, "price": Decimal(product.Price),
+                            "quantity": Decimal("0")
+                        }
+                        next_item_id += 1
+                    tocados[product.Id] = item
+                item["quantity"] += Decimal(quantity)
+                item["subtotal"] = _subtotal(item["price"], item["quantity"])
+                resultado.append(item)
+
+            self._append([{"op": "item", "cart": cart_id, "item": _item_json(i)} for i in tocados.values()])
+            state.items.update(tocados)
+            state.next_item_id = next_item_id
+            self._touch(state)
+            return [_to_cart_item(cart_id, item) for item in resultado]
+
+    def cambiar_cantidad(self, cart_id: int, item_id: int, quantity: Decimal) -> Optional[CartItem]:
+        with self._lock:
+            state = self._abierto(cart_id)
+            actual = state.find_item(item_id)
+            if actual is None:
+                return None
+            item = dict(actual, quantity=Decimal(quantity))
+            item["subtotal"] = _subtotal(item["price"], item["quantity"])
+            self._append([{"op": "item", "cart": cart_id, "item": _item_json(item)}])
+            state.items[item["product_id"]] = item
+            self._touch(state)
+            return _to_cart_item(cart_id, item)
+
+    def eliminar(self, cart_id: int, item_id: int) -> bool:
+        with self._lock:
+            state = self._abierto(cart_id)
+            item = state.find_item(item_id)
+            if item is None:
+                return False
+            self._append([{"op": "remove", "cart": cart_id, "product_id": item["product_id"]}])
+            del state.items[item["product_id"]]
+            self._touch(state)
+            return True
+
+    def vaciar(self, cart_id: int) -> None:
+        with self._lock:
+            state = self._abierto(cart_id)
+            self._append([{"op": "clear", "cart": cart_id}])
+            state.items.clear()
+            self._touch(state)
+
+    # ------------------ Escritura a BD ------------------
+    def escribir(self, db: Session, cart_id: int) -> None:
+        """
+        Escribe los items del carrito en la transacción de db, sin commit.
+        Desde aquí el carrito no acepta cambios: tras el commit se llama a
+        cerrar() y, si la transacción se revierte, a liberar().
+        """
+        if not self.tiene(cart_id):
+            return
+        with self._lock:
+            state = self._abierto(cart_id)
+            state.cerrando = True
+            snapshot = _snapshot(state)
+        try:
+            _write(db, [snapshot])
+        except Exception:
+            self.liberar(cart_id)
+            raise
+
+    def cerrar(self, cart_id: int) -> None:
+        """Saca del almacén un carrito ya cobrado o cancelado (tras el commit)"""
+        if not self.tiene(cart_id):
+            return
+        with self._lock:
+            self._append([{"op": "close", "cart": cart_id}])
+            self.backend.delete(cart_id)
+
+    def liberar(self, cart_id: int) -> None:
+        """Vuelve a aceptar cambios en un carrito cuya transacción de escribir() se revirtió"""
+        if not self.enabled:
+            return
+        with self._lock:
+            state = self.backend.get(cart_id)
+            if state is not None:
+                state.cerrando = False
+
+    def flush(self) -> int:
+        """
+        Escribe en una transacción los carritos con cambios pendientes y
+        compacta el journal. Regresa cuántos carritos escribió.
+        """
+        if not self.enabled or self._session_factory is None:
+            return 0
+        with self._lock:
+            pendientes = [_snapshot(s) for s in self.backend.all() if s.dirty]
+
+        escritos = 0
+        if pendientes:
+            db = self._session_factory()
+            try:
+                # Un carrito cobrado o cancelado mientras tanto ya no se toca
+                abiertos = _write(db, pendientes)
+                db.commit()
+                escritos = len(abiertos)
+            except Exception:
+                db.rollback()
+                logger.exception("cart_store_flush_failed")
+                return 0
+            finally:
+                db.close()
+
+            with self._lock:
+                for snapshot in pendientes:
+                    if snapshot["id"] not in abiertos:
+                        self._append([{"op": "close", "cart": snapshot["id"]}])
+                        self.backend.delete(snapshot["id"])
+                        continue
+                    state = self.backend.get(snapshot["id"])
+                    if state is not None:
+                        state.flushed_version = max(state.flushed_version, snapshot["version"])
+            self.flushes += 1
+
+        self._compact()
+        return escritos
+
+    # ------------------ Internos ------------------
+    def _abierto(self, cart_id: int) -> CartState:
+        """Estado del carrito para modificarlo (llamar con self._lock tomado)"""
+        state = self.backend.get(cart_id)
+        if state is None or state.cerrando:
+            raise ConflictError(CARRITO_NO_DISPONIBLE)
+        return state
+
+    def _touch(self, state: CartState) -> None:
+        state.updated_at = datetime.utcnow()
+        state.version += 1
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("cart_store_flush_failed")
+
+    def _append(self, records: List[Dict]) -> None:
+        """Agrega registros al journal; con fsync sobreviven a una caída del equipo"""
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _replay(self) -> int:
+        """Reconstruye los carritos abiertos a partir del journal"""
+        if not os.path.exists(self.journal_path):
+            return 0
+        with self._lock, open(self.journal_path, encoding="utf-8") as journal:
+            for linea in journal:
+                try:
+                    record = json.loads(linea)
+                except ValueError:
+                    # Última línea incompleta por una caída a mitad de escritura
+                    continue
+                cart_id = record["cart"]
+                state = self.backend.get(cart_id)
+                if record["op"] == "open":
+                    self.backend.put(CartState(
+                        cart_id, record["user_id"], datetime.fromisoformat(record["created_at"])
+                    ))
+                elif state is None:
+                    continue
+                elif record["op"] == "item":
+                    item = _item_from_json(record["item"])
+                    state.items[item["product_id"]] = item
+                    state.next_item_id = max(state.next_item_id, item["id"] + 1)
+                elif record["op"] == "remove":
+                    state.items.pop(record["product_id"], None)
+                elif record["op"] == "clear":
+                    state.items.clear()
+                elif record["op"] == "close":
+                    self.backend.delete(cart_id)
+            # Lo recuperado se vuelve a escribir (la escritura es idempotente)
+            carts = self.backend.all()
+            for state in carts:
+                state.version += 1
+            return len(carts)
+
+    def _compact(self) -> None:
+        """Reescribe el journal solo con los carritos abiertos (reemplazo atómico)"""
+        with self._lock:
+            records = []
+            for state in self.backend.all():
+                records.append({
+                    "op": "open", "cart": state.id, "user_id": state.user_id,
+                    "created_at": state.created_at.isoformat()
+                })
+                records.extend({"op": "item", "cart": state.id, "item": _item_json(i)} for i in state.items.values())
+
+            temporal = self.journal_path + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as journal:
+                journal.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+                journal.flush()
+                os.fsync(journal.fileno())
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            os.replace(temporal, self.journal_path)
+
+
+def _snapshot(state: CartState) -> Dict:
+    return {
+        "id": state.id,
+        "version": state.version,
+        "updated_at": state.updated_at,
+        "total": state.total,
+        "items": [dict(item) for item in state.items.values()]
+    }
+
+
+def _write(db: Session, snapshots: List[Dict]) -> Set[int]:
+    """
+    Reemplaza los items de estos carritos (un DELETE y un INSERT por lotes)
+    solo si siguen abiertos en BD. Regresa los Ids que escribió.
+
+    El DELETE va primero y filtra por status: en SQLite toma el candado de
+    escritura y en Postgres espera a un checkout en curso sobre esos items;
+    después se bloquean (FOR UPDATE) los carritos que siguen abiertos, así
+    un cobro confirmado entre medias no recibe una foto vieja del carrito.
+    """
+    if not snapshots:
+        return set()
+    ids = [s["id"] for s in snapshots]
+    sigue_abierto = (Cart.id.in_(ids), Cart.status == "open")
+    db.execute(delete(CartItem).where(CartItem.cart_id.in_(select(Cart.id).where(*sigue_abierto))))
+    abiertos = set(db.scalars(select(Cart.id).where(*sigue_abierto).with_for_update()))
+    snapshots = [s for s in snapshots if s["id"] in abiertos]
+    if not snapshots:
+        return abiertos
+
+    filas = [
+        {field: item[field] for field in _ITEM_FIELDS if field != "id"} | {"cart_id": s["id"]}
+        for s in snapshots for item in s["items"]
+    ]
+    if filas:
+        db.execute(insert(CartItem), filas)
+    db.execute(
+        update(Cart).where(Cart.status == "open").execution_options(synchronize_session=None),
+        [
+            {"id": s["id"], "updated_at": s["updated_at"], "total": s["total"], "item_count": len(s["items"])}
+            for s in snapshots
+        ]
+    )
+    return abiertos
+
+
+def _subtotal(price: Decimal, quantity: Decimal) -> Decimal:
+    # Mismo redondeo que crud.subtotal_item, para que el total cuadre al escribir
+    return (price * quantity).quantize(Decimal("0.01"))
+
+
+def _to_cart_item(cart_id: int, item: Dict) -> CartItem:
+    return CartItem(cart_id=cart_id, **{field: item[field] for field in _ITEM_FIELDS})
+
+
+def _item_json(item: Dict) -> Dict:
+    return {field: str(item[field]) if isinstance(item[field], Decimal) else item[field] for field in _ITEM_FIELDS}
+
+
+def _item_from_json(data: Dict) -> Dict:
+    return {
+        "id": data["id"], "product_id": data["product_id"], "product_name": data["product_name"],
+        "price": Decimal(data["price"]), "quantity": Decimal(data["quantity"]),
+        "subtotal": Decimal(data["subtotal"])
+    }
+
+
+# Instancia compartida por el proceso
+cart_store = CartStore()
@@ -0,0 +1,188 @@
+"""
+Caché en memoria del catálogo de productos (Master_Data).
+Lectura a través de caché por Id, Code y Barcode, invalidada por versión.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.session import make_transient_to_detached
+
+# Importar modelo de SQLAlchemy
+from models import Product
+
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "50000"))
+
+_FIELDS = (
+    "Id", "Code", "Barcode", "Product", "Category", "Units",
+    "Price", "Stock", "Min_Stock", "Activo"
+)
+
+
+class CatalogEntry:
+    """
+    Copia compacta de una fila de Master_Data.
+    Guarda la versión del catálogo con la que se cargó.
+    """
+    __slots__ = _FIELDS + ("version", "loaded_at")
+
+    def __init__(self, product: Product, version: int):
+        for field in _FIELDS:
+            setattr(self, field, getattr(product, field))
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def to_product(self, db: Session) -> Product:
+        """
+        Adjunta la entrada a la sesión como un Product persistente sin
+        emitir SQL. Si la sesión ya tiene ese producto regresa su instancia:
+        su estado es tan o más reciente que la copia del caché y no se pisa.
+        """
+        actual = db.identity_map.get(db.identity_key(Product, self.Id))
+        if actual is not None:
+            return actual
+
+        product = Product()
+        for field in _FIELDS:
+            setattr(product, field, getattr(self, field))
+        make_transient_to_detached(product)
+        db.add(product)
+        return product
+
+
+class CatalogCache:
+    """
+    Caché de productos por Id, Code y Barcode.
+
+    - Los cambios de catálogo (alta, edición, baja, precio) suben la versión
+      y con eso invalidan todas las entradas.
+    - Los movimientos de stock solo descartan los productos afectados.
+    - Las entradas también expiran por TTL, para acotar lo desactualizado
+      que puede quedar un worker cuando el cambio ocurrió en otro proceso.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = CATALOG_CACHE_TTL,
+        max_entries: int = CATALOG_CACHE_MAX_ENTRIES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._discards = 0
+        self._by_id: Dict[int, CatalogEntry] = {}
+        self._id_by_code: Dict[str, int] = {}
+        self._id_by_barcode: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ------------------ Lecturas ------------------
+    def get_by_id(self, db: Session, product_id: int) -> Optional[Product]:
+        """Obtiene un producto por Id, consultando la BD solo en un miss"""
+        entry = self._fresh(self._by_id.get(product_id))
+        if entry is not None:
+            return self._hit(db, entry)
+
+        token = self._token()
+        return self._miss(db.query(Product).filter(
+            Product.Id == product_id
+        ).first(), token)
+
+    def get_by_code(self, db: Session, code: str) -> Optional[Product]:
+        """Obtiene un producto por código exacto"""
+        entry = self._fresh(self._by_id.get(self._id_by_code.get(str(code))))
+        if entry is not None:
+            return self._hit(db, entry)
+
+        token = self._token()
+        return self._miss(db.query(Product).filter(
+            Product.Code == str(code)
+        ).first(), token)
+
+    def get_by_barcode(self, db: Session, barcode: str) -> Optional[Product]:
+        """Obtiene un producto por código de barras exacto"""
+        entry = self._fresh(self._by_id.get(self._id_by_barcode.get(str(barcode))))
+        if entry is not None:
+            return self._hit(db, entry)
+
+        token = self._token()
+        return self._miss(db.query(Product).filter(
+            Product.Barcode == str(barcode)
+        ).first(), token)
+
+    # ------------------ Invalidación ------------------
+    def bump_version(self) -> int:
+        """Invalida todo el catálogo (cambió algún producto)"""
+        with self._lock:
+            self.version += 1
+            self._by_id.clear()
+            self._id_by_code.clear()
+            self._id_by_barcode.clear()
+            return self.version
+
+    def discard(self, product_ids: Iterable[int]) -> None:
+        """Descarta solo los productos indicados (ej. cambió su stock)"""
+        with self._lock:
+            self._discards += 1
+            for product_id in product_ids:
+                entry = self._by_id.pop(product_id, None)
+                if entry is not None:
+                    self._id_by_code.pop(str(entry.Code), None)
+                    self._id_by_barcode.pop(str(entry.Barcode), None)
+
+    def stats(self) -> Dict:
+        """Contadores de aciertos y fallos"""
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._by_id),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    # ------------------ Internos ------------------
+    def _token(self) -> tuple:
+        """Estado del caché antes de consultar la BD en un miss"""
+        return (self.version, self._discards)
+
+    def _fresh(self, entry: Optional[CatalogEntry]) -> Optional[CatalogEntry]:
+        if entry is None or entry.version != self.version:
+            return None
+        if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+            return None
+        return entry
+
+    def _hit(self, db: Session, entry: CatalogEntry) -> Product:
+        with self._lock:
+            self.hits += 1
+        return entry.to_product(db)
+
+    def _miss(self, product: Optional[Product], token: tuple) -> Optional[Product]:
+        with self._lock:
+            self.misses += 1
+            # Si hubo invalidaciones durante la consulta la fila puede estar vieja
+            if product is None or token != self._token():
+                return product
+
+            if len(self._by_id) >= self.max_entries:
+                self._by_id.clear()
+                self._id_by_code.clear()
+                self._id_by_barcode.clear()
+
+            self._by_id[product.Id] = CatalogEntry(product, self.version)
+            self._id_by_code[str(product.Code)] = product.Id
+            if product.Barcode is not None:
+                self._id_by_barcode[str(product.Barcode)] = product.Id
+        return product
+
+
+# Instancia compartida por el proceso
+catalog_cache = CatalogCache()
@@ -0,0 +1,136 @@
+"""
+Contadores de inventario en memoria (total, stock bajo, categorías).
+Opcionales: con INVENTORY_COUNTERS=1 el resumen de inventario se responde
+sin recorrer Master_Data en cada consulta.
+"""
+
+import heapq
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+# Importar modelo de SQLAlchemy
+from models import Product
+
+# La versión del catálogo indica cuándo recargar todo
+from app.repositories.catalog_cache import catalog_cache
+
+
+INVENTORY_COUNTERS = os.getenv("INVENTORY_COUNTERS", "0") == "1"
+INVENTORY_COUNTERS_TTL = float(os.getenv("INVENTORY_COUNTERS_TTL", "30"))
+
+LowStockItem = namedtuple("LowStockItem", "Id Product Stock Min_Stock")
+
+
+def stock_counts_query(db: Session):
+    """
+    Una sola consulta con todos los contadores del inventario activo.
+    Usa CASE (equivalente portable de FILTER) dentro de cada agregado.
+    """
+    active = Product.Activo == 1
+    return db.query(
+        func.count(case((active, 1))).label("total"),
+        func.count(case((active & (Product.Stock <= Product.Min_Stock), 1))).label("low_stock"),
+        func.count(func.distinct(case((active, Product.Category)))).label("categories")
+    )
+
+
+def low_stock_query(db: Session):
+    """Productos activos con stock bajo, los más críticos primero"""
+    return db.query(
+        Product.Id, Product.Product, Product.Stock, Product.Min_Stock
+    ).filter(
+        Product.Activo == 1,
+        Product.Stock <= Product.Min_Stock
+    ).order_by(Product.Stock - Product.Min_Stock, Product.Id)
+
+
+class InventoryCounters:
+    """
+    Contadores del inventario mantenidos de forma incremental.
+
+    - Los movimientos de stock marcan productos como pendientes; en la
+      siguiente lectura solo se consultan esos productos.
+    - Un cambio de catálogo (versión) o el TTL fuerzan una recarga completa,
+      lo que también cubre movimientos hechos por otros procesos.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = INVENTORY_COUNTERS,
+        ttl_seconds: float = INVENTORY_COUNTERS_TTL
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._total = 0
+        self._categories = 0
+        self._low: Dict[int, LowStockItem] = {}
+        self._dirty: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def mark_dirty(self, product_ids: Iterable[int]) -> None:
+        """Registra que cambió el stock de estos productos"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._dirty.update(product_ids)
+
+    def snapshot(self, db: Session, top: int = 10) -> Dict:
+        """
+        Contadores actuales y los productos con stock más bajo.
+
+        Args:
+            db: Sesión de SQLAlchemy (solo para recargar o refrescar pendientes)
+            top: Máximo de productos con stock bajo a regresar
+
+        Returns:
+            Diccionario con total, low_stock, categories y low_stock_products
+        """
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > self.ttl_seconds
+            if self._version != catalog_cache.version or expired:
+                self._reload(db)
+            elif self._dirty:
+                self._refresh(db)
+
+            return {
+                "total": self._total,
+                "low_stock": len(self._low),
+                "categories": self._categories,
+                "low_stock_products": heapq.nsmallest(
+                    top, self._low.values(), key=lambda p: (p.Stock - p.Min_Stock, p.Id)
+                )
+            }
+
+    # ------------------ Internos ------------------
+    def _reload(self, db: Session) -> None:
+        self._dirty.clear()
+        self._version = catalog_cache.version
+        counts = stock_counts_query(db).one()
+        self._total = counts.total
+        self._categories = counts.categories
+        self._low = {row.Id: LowStockItem(*row) for row in low_stock_query(db)}
+        self._loaded_at = time.monotonic()
+
+    def _refresh(self, db: Session) -> None:
+        ids: List[int] = list(self._dirty)
+        self._dirty.clear()
+        rows = db.query(
+            Product.Id, Product.Product, Product.Stock, Product.Min_Stock, Product.Activo
+        ).filter(Product.Id.in_(ids))
+        for product_id, name, stock, min_stock, activo in rows:
+            if activo == 1 and stock <= min_stock:
+                self._low[product_id] = LowStockItem(product_id, name, stock, min_stock)
+            else:
+                self._low.pop(product_id, None)
+
+
+# Instancia compartida por el proceso
+inventory_counters = InventoryCounters()
@@ -4,8 +4,8 @@ Capa de acceso a datos - solo consultas SQL, sin lógica de negocio.
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import cast, String, or_, and_
-from typing import List, Optional
+from sqlalchemy import cast, String, or_, and_, case, func, insert, update
+from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
 
 # Importar modelo de SQLAlchemy
@@ -13,6 +13,14 @@ from models import Product
 
 # Importar excepciones
 from app.core.exceptions import NotFoundError, DuplicateError
+from app.core.pagination import paginate_keyset
+
+# Caché del catálogo e índice de búsqueda en memoria
+from app.repositories.catalog_cache import catalog_cache
+from app.repositories.search_index import ngram_index, normalize_text
+from app.repositories.inventory_counters import (
+    inventory_counters, stock_counts_query, low_stock_query
+)
 
 
 class ProductRepository:
@@ -28,44 +36,57 @@ class ProductRepository:
         """
         self.db = db
     
-    def get_by_id(self, product_id: int) -> Optional[Product]:
+    def get_by_id(self, product_id: int, cached: bool = True) -> Optional[Product]:
         """
         Obtiene un producto por ID.
         
         Args:
             product_id: ID del producto
+            cached: Si se puede responder desde el caché del catálogo
+                    (usar False antes de modificar el producto)
             
         Returns:
             Product o None si no existe
         """
+        if cached:
+            return catalog_cache.get_by_id(self.db, product_id)
+        
         return self.db.query(Product).filter(
             Product.Id == product_id
         ).first()
     
-    def get_by_code(self, code: str) -> Optional[Product]:
+    def get_by_code(self, code: str, cached: bool = True) -> Optional[Product]:
         """
         Obtiene un producto por código.
         
         Args:
             code: Código del producto
+            cached: Si se puede responder desde el caché del catálogo
             
         Returns:
             Product o None si no existe
         """
+        if cached:
+            return catalog_cache.get_by_code(self.db, code)
+        
         return self.db.query(Product).filter(
             cast(Product.Code, String) == str(code)
         ).first()
     
-    def get_by_barcode(self, barcode: str) -> Optional[Product]:
+    def get_by_barcode(self, barcode: str, cached: bool = True) -> Optional[Product]:
         """
         Obtiene un producto por código de barras.
         
         Args:
             barcode: Código de barras
+            cached: Si se puede responder desde el caché del catálogo
             
         Returns:
             Product o None si no existe
         """
+        if cached:
+            return catalog_cache.get_by_barcode(self.db, barcode)
+        
         return self.db.query(Product).filter(
             cast(Product.Barcode, String) == str(barcode)
         ).first()
@@ -89,6 +110,24 @@ class ProductRepository:
             Product.Activo == 1
         ).offset(skip).limit(limit).all()
     
+    def get_active_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Product], Optional[str]]:
+        """
+        Obtiene productos activos con paginación por cursor (Id).
+        
+        Args:
+            cursor: Cursor de la página anterior (None para la primera)
+            limit: Máximo de registros
+            
+        Returns:
+            (productos de la página, cursor de la siguiente o None)
+        """
+        query = self.db.query(Product).filter(Product.Activo == 1)
+        return paginate_keyset(query, [Product.Id], cursor, limit, descending=False)
+    
     def search(
         self, 
         query: str, 
@@ -97,25 +136,62 @@ class ProductRepository:
         """
         Busca productos por nombre, código o código de barras.
         
+        Ignora acentos y mayúsculas, tolera errores de captura y regresa
+        los resultados ordenados por relevancia. En PostgreSQL usa los
+        índices pg_trgm; en otros motores, el índice de trigramas en memoria.
+        
         Args:
             query: Texto a buscar
             limit: Máximo de resultados
             
         Returns:
-            Lista de productos que coinciden
+            Lista de productos que coinciden, los más relevantes primero
         """
-        search_pattern = f"%{query}%"
+        if self.db.get_bind().dialect.name == "postgresql":
+            return self._search_trigram(query, limit)
+        
+        return self._search_ngram(query, limit)
+    
+    def _search_trigram(self, query: str, limit: int) -> List[Product]:
+        """
+        Búsqueda con pg_trgm sobre f_unaccent(lower(...)).
+        Requiere la migración de índices de búsqueda.
+        """
+        term = normalize_text(query)
+        name = func.f_unaccent(func.lower(Product.Product))
+        code = func.lower(Product.Code)
+        barcode = func.lower(Product.Barcode)
+        
+        rank = case(
+            (or_(code == term, barcode == term), 3.0),
+            (name.contains(term, autoescape=True), 1.0 + func.word_similarity(term, name)),
+            else_=func.word_similarity(term, name)
+        )
         
         return self.db.query(Product).filter(
             and_(
                 Product.Activo == 1,
                 or_(
-                    Product.Product.ilike(search_pattern),
-                    cast(Product.Code, String).ilike(search_pattern),
-                    cast(Product.Barcode, String).ilike(search_pattern)
+                    name.op("%>")(term),
+                    name.contains(term, autoescape=True),
+                    code.contains(term, autoescape=True),
+                    barcode.contains(term, autoescape=True)
                 )
             )
-        ).limit(limit).all()
+        ).order_by(rank.desc(), Product.Product).limit(limit).all()
+    
+    def _search_ngram(self, query: str, limit: int) -> List[Product]:
+        """Búsqueda con el índice de trigramas en memoria"""
+        ranked = ngram_index.search(self.db, query, limit)
+        if not ranked:
+            return []
+        
+        productos = self.db.query(Product).filter(
+            Product.Id.in_([product_id for product_id, _ in ranked])
+        ).all()
+        por_id = {p.Id: p for p in productos}
+        
+        return [por_id[product_id] for product_id, _ in ranked if product_id in por_id]
     
     def exists_by_code(self, code: str, exclude_id: Optional[int] = None) -> bool:
         """
@@ -161,6 +237,61 @@ class ProductRepository:
         
         return query.first() is not None
     
+    def get_code_index(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Carga solo Id, Code y Barcode de todo el catálogo.
+        
+        Returns:
+            (código -> Id, código de barras -> Id)
+        """
+        by_code: Dict[str, int] = {}
+        by_barcode: Dict[str, int] = {}
+        rows = self.db.query(Product.Id, Product.Code, Product.Barcode).yield_per(5000)
+        for product_id, code, barcode in rows:
+            by_code[str(code)] = product_id
+            if barcode is not None:
+                by_barcode[str(barcode)] = product_id
+        return by_code, by_barcode
+    
+    def bulk_upsert(self, new_rows: List[Dict], existing_rows: List[Dict]) -> None:
+        """
+        Inserta y actualiza productos en bloque, en una sola transacción.
+        
+        Args:
+            new_rows: Valores de productos nuevos (sin Id)
+            existing_rows: Valores de productos existentes (con Id)
+        """
+        if new_rows:
+            self.db.execute(insert(Product), new_rows)
+        if existing_rows:
+            self.db.execute(update(Product), existing_rows)
+        self.db.commit()
+    
+    def get_inventory_stats(self, top: int = 10) -> Dict:
+        """
+        Contadores del inventario y los productos con stock más bajo.
+        
+        Con los contadores en memoria activos responde sin consultar
+        todo el catálogo; si no, usa una consulta agregada y otra con LIMIT.
+        
+        Args:
+            top: Máximo de productos con stock bajo a regresar (0 para ninguno)
+            
+        Returns:
+            Diccionario con total, low_stock, categories y low_stock_products
+            (filas con Id, Product, Stock y Min_Stock)
+        """
+        if inventory_counters.enabled:
+            return inventory_counters.snapshot(self.db, top)
+        
+        counts = stock_counts_query(self.db).one()
+        return {
+            "total": counts.total,
+            "low_stock": counts.low_stock,
+            "categories": counts.categories,
+            "low_stock_products": low_stock_query(self.db).limit(top).all() if top else []
+        }
+    
     def get_low_stock_products(self) -> List[Product]:
         """
         Obtiene productos con stock bajo o igual al mínimo.
@@ -230,7 +361,7 @@ class ProductRepository:
         Raises:
             NotFoundError: Si el producto no existe
         """
-        producto = self.get_by_id(product_id)
+        producto = self.get_by_id(product_id, cached=False)
         
         if not producto:
             raise NotFoundError("Producto", product_id)
@@ -0,0 +1,136 @@
+"""
+Índice invertido de trigramas en memoria para buscar productos.
+Respaldo de pg_trgm cuando la base no es PostgreSQL (SQLite, pruebas).
+"""
+
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+# Importar modelo de SQLAlchemy
+from models import Product
+
+# La versión del catálogo indica cuándo reconstruir el índice
+from app.repositories.catalog_cache import catalog_cache
+
+
+# Mismo umbral por defecto que pg_trgm.word_similarity_threshold
+MIN_SCORE = 0.6
+
+
+def normalize_text(text: str) -> str:
+    """
+    Minúsculas y sin acentos: "Pechuga Ñandú" -> "pechuga nandu".
+    """
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    sin_acentos = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(sin_acentos.lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Trigramas de cada palabra, con el mismo relleno que pg_trgm
+    (dos espacios al inicio y uno al final).
+    """
+    result = set()
+    for word in text.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+class NgramIndex:
+    """
+    Índice trigrama del nombre -> Ids de producto activos.
+
+    Igual que la búsqueda con pg_trgm, la similitud solo se mide sobre el
+    nombre; código y código de barras coinciden completos o como subcadena.
+
+    Se reconstruye de forma perezosa cuando cambia la versión del catálogo
+    (alta, edición, baja o cambio de precio de productos).
+    """
+
+    def __init__(self):
+        self.version = None
+        # (trigrama del nombre -> Ids, Id -> textos normalizados), se reemplaza completo
+        self._data: Tuple[Dict[str, Set[int]], Dict[int, Tuple[str, str, str]]] = ({}, {})
+        self._lock = threading.Lock()
+
+    def search(self, db: Session, query: str, limit: int = 100) -> List[Tuple[int, float]]:
+        """
+        Busca productos y los regresa ordenados por relevancia.
+
+        Args:
+            db: Sesión de SQLAlchemy (solo para reconstruir el índice)
+            query: Texto a buscar
+            limit: Máximo de resultados
+
+        Returns:
+            Lista de (Id, puntaje) de mayor a menor puntaje
+        """
+        self._ensure_fresh(db)
+
+        term = normalize_text(query)
+        query_grams = trigrams(term)
+        if not query_grams:
+            return []
+
+        postings, texts = self._data
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(postings.get(gram, ()))
+
+        # Candidatos: nombre parecido, o término contenido en nombre, código o barcode
+        candidates = {product_id for product_id, count in shared.items() if count / len(query_grams) >= MIN_SCORE}
+        candidates.update(
+            product_id for product_id, (name, code, barcode) in texts.items()
+            if term in name or term in code or term in barcode
+        )
+
+        scored = []
+        for product_id in candidates:
+            name, code, barcode = texts[product_id]
+            similarity = shared.get(product_id, 0) / len(query_grams)
+            # Por encima de cualquier coincidencia en el nombre (1 + similitud <= 2)
+            if term == code or term == barcode:
+                score = 3.0
+            elif term in name:
+                score = 1.0 + similarity
+            else:
+                score = similarity
+            scored.append((product_id, round(score, 4)))
+
+        scored.sort(key=lambda item: (-item[1], texts[item[0]][0]))
+        return scored[:limit]
+
+    def _ensure_fresh(self, db: Session) -> None:
+        if self.version == catalog_cache.version:
+            return
+
+        with self._lock:
+            version = catalog_cache.version
+            if self.version == version:
+                return
+
+            rows = db.query(
+                Product.Id, Product.Product, Product.Code, Product.Barcode
+            ).filter(Product.Activo == 1).all()
+
+            postings: Dict[str, Set[int]] = {}
+            texts: Dict[int, Tuple[str, str, str]] = {}
+            for product_id, name, code, barcode in rows:
+                fields = tuple(normalize_text(v or "") for v in (name, code, barcode))
+                texts[product_id] = fields
+                for gram in trigrams(fields[0]):
+                    postings.setdefault(gram, set()).add(product_id)
+
+            self._data = (postings, texts)
+            self.version = version
+
+
+# Instancia compartida por el proceso
+ngram_index = NgramIndex()
@@ -1,22 +1,35 @@
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, case, and_
+from sqlalchemy import func, case, and_, or_
 from database import get_db
 from app.core.security import get_current_user, require_manager
 from models import (
-    Users, Product, SaleTicket, SaleTicketItem, 
-    CashRegister, Cart
+    Users, Product, SaleTicket,
+    CashRegister, Cart, SalesRollupHourly, SalesRollupProductDaily
 )
-from datetime import datetime, timedelta
-from typing import List, Dict
+from app.repositories.product_repository import ProductRepository
+from app.core.response_cache import cached_response, response_cache
+from app.core.time_window import business_today, day_window, to_store_time
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Callable, List, Dict, Tuple
 from decimal import Decimal
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard & Reportes"])
 
+# Consultas del resumen en paralelo; cada hilo usa su propia conexión del pool
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", "4"))
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
 # ==================== RESUMEN GENERAL ====================
 @router.get("/summary", dependencies=[Depends(require_manager)])
+@cached_response("dashboard.summary", tags=("sales", "inventory"))
 def get_dashboard_summary(
     period: str = Query("today", regex="^(today|week|month|year)$"),
+    debug: bool = Query(False, description="Incluir el tiempo de cada consulta"),
     db: Session = Depends(get_db),
     current_user: Users = Depends(get_current_user)
 ):
@@ -32,53 +45,53 @@ def get_dashboard_summary(
     - Estado de inventario
     
     **Períodos:** today, week, month, year
-    """
-    
-    # Calcular fechas
-    now = datetime.now()
-    start_date, end_date = _get_period_dates(period, now)
-    prev_start, prev_end = _get_previous_period_dates(period, now)
     
-    # VENTAS DEL PERÍODO ACTUAL
-    current_sales = db.query(
-        func.sum(SaleTicket.total).label('total'),
-        func.count(SaleTicket.id).label('count'),
-        func.avg(SaleTicket.total).label('avg_ticket')
-    ).filter(
-        SaleTicket.created_at.between(start_date, end_date),
-        SaleTicket.status == 'completed'
-    ).first()
-    
-    # VENTAS DEL PERÍODO ANTERIOR
-    previous_sales = db.query(
-        func.sum(SaleTicket.total).label('total'),
-        func.count(SaleTicket.id).label('count')
-    ).filter(
-        SaleTicket.created_at.between(prev_start, prev_end),
-        SaleTicket.status == 'completed'
-    ).first()
-    
-    # DESGLOSE POR MÉTODO DE PAGO
-    payment_methods = db.query(
-        SaleTicket.payment_method,
-        func.sum(SaleTicket.total).label('total'),
-        func.count(SaleTicket.id).label('count')
-    ).filter(
-        SaleTicket.created_at.between(start_date, end_date),
-        SaleTicket.status == 'completed'
-    ).group_by(SaleTicket.payment_method).all()
-    
-    # INVENTARIO CRÍTICO
-    low_stock = db.query(Product).filter(
-        Product.Stock <= Product.Min_Stock,
-        Product.Activo == 1
-    ).count()
+    Las consultas son independientes y se ejecutan en paralelo;
+    con **debug=true** se agrega el tiempo de cada una en `timings_ms`.
+    """
     
-    total_products = db.query(Product).filter(Product.Activo == 1).count()
+    # Períodos por días de negocio (STORE_TIMEZONE) -> rangos [inicio, fin) en UTC
+    today = business_today()
+    start_date, end_date = _get_period_dates(period, today)
+    prev_start, prev_end = _get_previous_period_dates(period, today)
+    
+    results, timings = _run_concurrently(db, {
+        # VENTAS DEL PERÍODO ACTUAL (rollups por hora)
+        "current_sales": lambda s: s.query(
+            func.sum(SalesRollupHourly.total).label('total'),
+            func.sum(SalesRollupHourly.num_tickets).label('count')
+        ).filter(_filtro_cubetas(start_date, end_date)).first(),
+        
+        # VENTAS DEL PERÍODO ANTERIOR
+        "previous_sales": lambda s: s.query(
+            func.sum(SalesRollupHourly.total).label('total'),
+            func.sum(SalesRollupHourly.num_tickets).label('count')
+        ).filter(_filtro_cubetas(prev_start, prev_end)).first(),
+        
+        # DESGLOSE POR MÉTODO DE PAGO
+        "payment_methods": lambda s: s.query(
+            SalesRollupHourly.payment_method,
+            func.sum(SalesRollupHourly.total).label('total'),
+            func.sum(SalesRollupHourly.num_tickets).label('count')
+        ).filter(
+            _filtro_cubetas(start_date, end_date)
+        ).group_by(SalesRollupHourly.payment_method).all(),
+        
+        # INVENTARIO CRÍTICO
+        "inventory": lambda s: ProductRepository(s).get_inventory_stats(top=0)
+    })
+    current_sales = results["current_sales"]
+    previous_sales = results["previous_sales"]
+    payment_methods = results["payment_methods"]
+    inventory = results["inventory"]
+    low_stock = inventory["low_stock"]
+    total_products = inventory["total"]
     
     # CALCULAR CAMBIOS PORCENTUALES
     current_total = float(current_sales.total or 0)
     previous_total = float(previous_sales.total or 0)
+    current_count = int(current_sales.count or 0)
+    previous_count = int(previous_sales.count or 0)
     
     sales_change = (
         ((current_total - previous_total) / previous_total * 100) 
@@ -86,11 +99,11 @@ def get_dashboard_summary(
     )
     
     tickets_change = (
-        ((current_sales.count - previous_sales.count) / previous_sales.count * 100)
-        if previous_sales.count > 0 else 0
+        ((current_count - previous_count) / previous_count * 100)
+        if previous_count > 0 else 0
     )
     
-    return {
+    summary = {
         "period": period,
         "date_range": {
             "start": start_date.isoformat(),
@@ -102,27 +115,32 @@ def get_dashboard_summary(
             "previous_period": round(previous_total, 2)
         },
         "transactions": {
-            "total": current_sales.count or 0,
+            "total": current_count,
             "change_percent": round(tickets_change, 2),
-            "previous_period": previous_sales.count or 0
+            "previous_period": previous_count
         },
-        "average_ticket": round(float(current_sales.avg_ticket or 0), 2),
+        "average_ticket": round(current_total / current_count, 2) if current_count else 0,
         "payment_methods": [
             {
                 "method": pm.payment_method,
                 "total": round(float(pm.total), 2),
-                "count": pm.count,
+                "count": int(pm.count),
                 "percentage": round(float(pm.total) / current_total * 100, 2) if current_total > 0 else 0
             }
-            for pm in payment_methods
+            for pm in payment_methods if pm.count
         ],
         "inventory": {
             "total_products": total_products,
             "low_stock_items": low_stock,
             "stock_health": round((1 - low_stock / total_products) * 100, 2) if total_products > 0 else 100
         },
-        "generated_at": now.isoformat()
+        "generated_at": datetime.utcnow().isoformat()
     }
+    
+    if debug:
+        summary["timings_ms"] = timings
+    
+    return summary
 
 
 # ==================== VENTAS POR MES ====================
@@ -143,36 +161,44 @@ def get_sales_by_month(
     - Ticket promedio
     """
     
-    start_date = datetime.now() - timedelta(days=30 * months)
+    start_date, end_date = _business_days(business_today(), 30 * months)
     
-    monthly_sales = db.query(
-        extract('year', SaleTicket.created_at).label('year'),
-        extract('month', SaleTicket.created_at).label('month'),
-        func.sum(SaleTicket.total).label('total'),
-        func.count(SaleTicket.id).label('num_tickets'),
-        func.avg(SaleTicket.total).label('avg_ticket')
+    # Cubetas UTC del rango; se agrupan por mes en la zona de la tienda
+    buckets = db.query(
+        SalesRollupHourly.day,
+        SalesRollupHourly.hour,
+        func.sum(SalesRollupHourly.total).label('total'),
+        func.sum(SalesRollupHourly.num_tickets).label('num_tickets')
     ).filter(
-        SaleTicket.created_at >= start_date,
-        SaleTicket.status == 'completed'
-    ).group_by('year', 'month').order_by('year', 'month').all()
+        _filtro_cubetas(start_date, end_date),
+        SalesRollupHourly.num_tickets > 0
+    ).group_by(SalesRollupHourly.day, SalesRollupHourly.hour).all()
+    
+    months_dict = {}
+    for b in buckets:
+        local = to_store_time(datetime(b.day.year, b.day.month, b.day.day, b.hour))
+        totals = months_dict.setdefault((local.year, local.month), [0.0, 0])
+        totals[0] += float(b.total)
+        totals[1] += int(b.num_tickets)
     
     return {
         "data": [
             {
-                "period": f"{int(row.year)}-{int(row.month):02d}",
-                "month_name": datetime(int(row.year), int(row.month), 1).strftime("%B %Y"),
-                "total_sales": round(float(row.total), 2),
-                "num_tickets": row.num_tickets,
-                "avg_ticket": round(float(row.avg_ticket), 2)
+                "period": f"{year}-{month:02d}",
+                "month_name": datetime(year, month, 1).strftime("%B %Y"),
+                "total_sales": round(total, 2),
+                "num_tickets": num_tickets,
+                "avg_ticket": round(total / num_tickets, 2)
             }
-            for row in monthly_sales
+            for (year, month), (total, num_tickets) in sorted(months_dict.items())
         ],
-        "months_analyzed": len(monthly_sales)
+        "months_analyzed": len(months_dict)
     }
 
 
 # ==================== TOP PRODUCTOS ====================
 @router.get("/products/top-selling")
+@cached_response("dashboard.top_selling", tags=("sales",))
 def get_top_selling_products(
     limit: int = Query(10, ge=1, le=50),
     period: str = Query("month", regex="^(week|month|quarter|year)$"),
@@ -190,25 +216,24 @@ def get_top_selling_products(
     - Porcentaje del total
     """
     
-    start_date, end_date = _get_period_dates(period, datetime.now())
+    start_date, end_date = _get_period_dates(period, business_today())
     
     top_products = (
         db.query(
             Product.Id,
             Product.Product,
             Product.Category,
-            func.sum(SaleTicketItem.quantity).label('total_quantity'),
-            func.sum(SaleTicketItem.subtotal).label('total_revenue'),
-            func.count(func.distinct(SaleTicket.id)).label('num_orders')
+            func.sum(SalesRollupProductDaily.quantity).label('total_quantity'),
+            func.sum(SalesRollupProductDaily.revenue).label('total_revenue'),
+            func.sum(SalesRollupProductDaily.num_orders).label('num_orders')
         )
-        .join(SaleTicketItem, Product.Id == SaleTicketItem.product_id)
-        .join(SaleTicket, SaleTicketItem.ticket_id == SaleTicket.id)
+        .join(SalesRollupProductDaily, Product.Id == SalesRollupProductDaily.product_id)
         .filter(
-            SaleTicket.created_at.between(start_date, end_date),
-            SaleTicket.status == 'completed'
+            _filtro_dias(start_date, end_date),
+            SalesRollupProductDaily.num_orders > 0
         )
         .group_by(Product.Id, Product.Product, Product.Category)
-        .order_by(func.sum(SaleTicketItem.subtotal).desc())
+        .order_by(func.sum(SalesRollupProductDaily.revenue).desc())
         .limit(limit)
         .all()
     )
@@ -226,7 +251,7 @@ def get_top_selling_products(
                 "category": p.Category,
                 "quantity_sold": int(p.total_quantity),
                 "revenue": round(float(p.total_revenue), 2),
-                "num_orders": p.num_orders,
+                "num_orders": int(p.num_orders),
                 "percentage_of_total": round(
                     float(p.total_revenue) / total_revenue * 100, 2
                 ) if total_revenue > 0 else 0
@@ -249,23 +274,22 @@ def get_sales_by_category(
     **Ideal para pie charts o treemaps.**
     """
     
-    start_date, end_date = _get_period_dates(period, datetime.now())
+    start_date, end_date = _get_period_dates(period, business_today())
     
     category_sales = (
         db.query(
             Product.Category,
-            func.sum(SaleTicketItem.subtotal).label('total'),
-            func.sum(SaleTicketItem.quantity).label('quantity'),
+            func.sum(SalesRollupProductDaily.revenue).label('total'),
+            func.sum(SalesRollupProductDaily.quantity).label('quantity'),
             func.count(func.distinct(Product.Id)).label('num_products')
         )
-        .join(SaleTicketItem, Product.Id == SaleTicketItem.product_id)
-        .join(SaleTicket, SaleTicketItem.ticket_id == SaleTicket.id)
+        .join(SalesRollupProductDaily, Product.Id == SalesRollupProductDaily.product_id)
         .filter(
-            SaleTicket.created_at.between(start_date, end_date),
-            SaleTicket.status == 'completed'
+            _filtro_dias(start_date, end_date),
+            SalesRollupProductDaily.num_orders > 0
         )
         .group_by(Product.Category)
-        .order_by(func.sum(SaleTicketItem.subtotal).desc())
+        .order_by(func.sum(SalesRollupProductDaily.revenue).desc())
         .all()
     )
     
@@ -299,39 +323,48 @@ def get_sales_by_hour(
     """
     Distribución de ventas por hora del día.
     
+    El día y las horas están en la zona horaria de la tienda (STORE_TIMEZONE).
+    
     **Útil para identificar horarios pico.**
     """
     
     if date:
         target_date = datetime.strptime(date, "%Y-%m-%d").date()
     else:
-        target_date = datetime.now().date()
+        target_date = business_today()
     
+    # Día de negocio -> rango [inicio, fin) en UTC sobre las cubetas
+    start, end = day_window(target_date)
     hourly_sales = (
         db.query(
-            extract('hour', SaleTicket.created_at).label('hour'),
-            func.sum(SaleTicket.total).label('total'),
-            func.count(SaleTicket.id).label('count')
+            SalesRollupHourly.day,
+            SalesRollupHourly.hour,
+            func.sum(SalesRollupHourly.total).label('total'),
+            func.sum(SalesRollupHourly.num_tickets).label('count')
         )
         .filter(
-            func.date(SaleTicket.created_at) == target_date,
-            SaleTicket.status == 'completed'
+            _filtro_cubetas(start, end),
+            SalesRollupHourly.num_tickets > 0
         )
-        .group_by('hour')
-        .order_by('hour')
+        .group_by(SalesRollupHourly.day, SalesRollupHourly.hour)
         .all()
     )
     
-    # Rellenar horas sin ventas
-    hours_dict = {int(h.hour): h for h in hourly_sales}
+    # Cubetas UTC -> hora local (un cambio de horario puede juntar dos cubetas)
+    hours_dict = {}
+    for h in hourly_sales:
+        local_hour = to_store_time(datetime(h.day.year, h.day.month, h.day.day, h.hour)).hour
+        totals = hours_dict.setdefault(local_hour, [0.0, 0])
+        totals[0] += float(h.total)
+        totals[1] += int(h.count)
     
     return {
         "date": target_date.isoformat(),
         "hourly_distribution": [
             {
                 "hour": f"{hour:02d}:00",
-                "total_sales": round(float(hours_dict[hour].total), 2) if hour in hours_dict else 0,
-                "num_tickets": hours_dict[hour].count if hour in hours_dict else 0
+                "total_sales": round(hours_dict[hour][0], 2) if hour in hours_dict else 0,
+                "num_tickets": hours_dict[hour][1] if hour in hours_dict else 0
             }
             for hour in range(24)
         ]
@@ -355,24 +388,23 @@ def get_cashier_performance(
     - Tiempo promedio por transacción
     """
     
-    start_date, end_date = _get_period_dates(period, datetime.now())
+    start_date, end_date = _get_period_dates(period, business_today())
     
     cashier_stats = (
         db.query(
             Users.ID,
             Users.Username,
             Users.Role,
-            func.sum(SaleTicket.total).label('total_sales'),
-            func.count(SaleTicket.id).label('num_tickets'),
-            func.avg(SaleTicket.total).label('avg_ticket')
+            func.sum(SalesRollupHourly.total).label('total_sales'),
+            func.sum(SalesRollupHourly.num_tickets).label('num_tickets')
         )
-        .join(SaleTicket, Users.ID == SaleTicket.user_id)
+        .join(SalesRollupHourly, Users.ID == SalesRollupHourly.user_id)
         .filter(
-            SaleTicket.created_at.between(start_date, end_date),
-            SaleTicket.status == 'completed'
+            _filtro_cubetas(start_date, end_date),
+            SalesRollupHourly.num_tickets > 0
         )
         .group_by(Users.ID, Users.Username, Users.Role)
-        .order_by(func.sum(SaleTicket.total).desc())
+        .order_by(func.sum(SalesRollupHourly.total).desc())
         .all()
     )
     
@@ -384,52 +416,91 @@ def get_cashier_performance(
                 "username": c.Username,
                 "role": c.Role,
                 "total_sales": round(float(c.total_sales), 2),
-                "num_tickets": c.num_tickets,
-                "avg_ticket": round(float(c.avg_ticket), 2)
+                "num_tickets": int(c.num_tickets),
+                "avg_ticket": round(float(c.total_sales) / int(c.num_tickets), 2)
             }
             for c in cashier_stats
         ]
     }
 
 
+# ==================== ESTADÍSTICAS DEL CACHÉ ====================
+@router.get("/cache/stats", dependencies=[Depends(require_manager)])
+def get_cache_stats():
+    """
+    Estadísticas del caché de respuestas (dashboard y reportes).
+    """
+    return response_cache.stats()
+
+
 # ==================== FUNCIONES AUXILIARES ====================
-def _get_period_dates(period: str, reference_date: datetime):
-    """Calcula fechas de inicio y fin según el período"""
-    
-    end = reference_date
-    
-    if period == "today":
-        start = end.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == "week":
-        start = end - timedelta(days=7)
-    elif period == "month":
-        start = end - timedelta(days=30)
-    elif period == "quarter":
-        start = end - timedelta(days=90)
-    elif period == "year":
-        start = end - timedelta(days=365)
-    else:
-        start = end - timedelta(days=30)
+def _run_concurrently(
+    db: Session,
+    queries: Dict[str, Callable[[Session], Any]]
+) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Ejecuta consultas independientes en paralelo.
+    
+    Cada consulta recibe una sesión propia sobre el mismo engine que la
+    petición (una sesión no se comparte entre hilos) y corre en una copia
+    del contexto de la petición, así su SQL cuenta en las estadísticas
+    del request. La latencia total queda cerca de la consulta más lenta
+    en lugar de la suma de todas.
+    
+    Returns:
+        (resultado por nombre, milisegundos por nombre más "total")
+    """
+    bind = db.get_bind()
+    
+    def run(query):
+        start = time.perf_counter()
+        with Session(bind=bind) as session:
+            result = query(session)
+        return result, round((time.perf_counter() - start) * 1000, 2)
+    
+    start = time.perf_counter()
+    futures = {
+        name: _executor.submit(contextvars.copy_context().run, run, query)
+        for name, query in queries.items()
+    }
+    results, timings = {}, {}
+    for name, future in futures.items():
+        results[name], timings[name] = future.result()
+    timings["total"] = round((time.perf_counter() - start) * 1000, 2)
     
+    return results, timings
+
+def _filtro_cubetas(start: datetime, end: datetime):
+    """Cubetas (day, hour) que empiezan dentro del rango semiabierto [start, end)"""
+    day, hour = SalesRollupHourly.day, SalesRollupHourly.hour
+    return and_(
+        or_(day > start.date(), and_(day == start.date(), hour >= start.hour)),
+        or_(day < end.date(), and_(day == end.date(), hour < end.hour))
+    )
+
+def _filtro_dias(start: datetime, end: datetime):
+    """Cubetas diarias (día UTC) que empiezan dentro del rango semiabierto [start, end)"""
+    first = start.date() if start.time() == dt_time.min else start.date() + timedelta(days=1)
+    last = end.date() if end.time() == dt_time.min else end.date() + timedelta(days=1)
+    return and_(SalesRollupProductDaily.day >= first, SalesRollupProductDaily.day < last)
+
+# Días de negocio de cada período (incluye hoy)
+PERIOD_DAYS = {"today": 1, "week": 7, "month": 30, "quarter": 90, "year": 365}
+
+def _business_days(today: date, days: int) -> Tuple[datetime, datetime]:
+    """
+    Rango [inicio, fin) en UTC de los últimos `days` días de negocio hasta
+    hoy inclusive (zona de la tienda), comparable contra las cubetas UTC.
+    """
+    start, _ = day_window(today - timedelta(days=days - 1))
+    _, end = day_window(today)
     return start, end
 
-def _get_previous_period_dates(period: str, reference_date: datetime):
-    """Calcula fechas del período anterior para comparación"""
-    
-    if period == "today":
-        end = reference_date - timedelta(days=1)
-        start = end.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == "week":
-        end = reference_date - timedelta(days=7)
-        start = end - timedelta(days=7)
-    elif period == "month":
-        end = reference_date - timedelta(days=30)
-        start = end - timedelta(days=30)
-    elif period == "year":
-        end = reference_date - timedelta(days=365)
-        start = end - timedelta(days=365)
-    else:
-        end = reference_date - timedelta(days=30)
-        start = end - timedelta(days=30)
-    
-    return start, end
\ No newline at end of file
+def _get_period_dates(period: str, today: date) -> Tuple[datetime, datetime]:
+    """Rango [inicio, fin) en UTC del período que termina hoy"""
+    return _business_days(today, PERIOD_DAYS.get(period, 30))
+
+def _get_previous_period_dates(period: str, today: date) -> Tuple[datetime, datetime]:
+    """Mismo número de días de negocio, inmediatamente antes del período"""
+    days = PERIOD_DAYS.get(period, 30)
+    return _business_days(today - timedelta(days=days), days)
@@ -1,7 +1,8 @@
 from typing import List, Dict
 from datetime import datetime
 import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import Product, Cart
 from app.core.config import get_settings
 
@@ -13,7 +14,7 @@ class ChatbotService:
     Usa Claude API para procesamiento de lenguaje natural.
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.api_url = "https://api.anthropic.com/v1/messages"
         self.model = "claude-sonnet-4-20250514"
@@ -134,13 +135,15 @@ Responde en JSON con esta estructura:
         """Obtiene contexto del negocio para el chatbot"""
         
         # Top 10 productos más vendidos (simplificado)
-        popular_products = self.db.query(Product).filter(
-            Product.Activo == 1
-        ).limit(10).all()
+        popular_products = (await self.db.scalars(
+            select(Product).where(Product.Activo == 1).limit(10)
+        )).all()
         
         # Resumen de inventario
-        total_products = self.db.query(Product).filter(Product.Activo == 1).count()
-        categories = self.db.query(Product.Category).distinct().all()
+        total_products = await self.db.scalar(
+            select(func.count(Product.Id)).where(Product.Activo == 1)
+        )
+        categories = (await self.db.execute(select(Product.Category).distinct())).all()
         
         context = f"""
 - Total de productos disponibles: {total_products}
@@ -154,10 +157,12 @@ Responde en JSON con esta estructura:
         """Obtiene detalles de productos por IDs"""
         try:
             ids = [int(pid) for pid in product_ids]
-            products = self.db.query(Product).filter(
-                Product.Id.in_(ids),
-                Product.Activo == 1
-            ).all()
+            products = (await self.db.scalars(
+                select(Product).where(
+                    Product.Id.in_(ids),
+                    Product.Activo == 1
+                )
+            )).all()
             
             return [
                 {
@@ -184,8 +189,8 @@ Responde en JSON con esta estructura:
 
 # app/routes/chatbot.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from pydantic import BaseModel
 from typing import List, Dict
 from app.services.ai_chatbot_service import ChatbotService
@@ -209,7 +214,7 @@ conversations = {}
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     data: ChatMessage,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Endpoint principal del chatbot.
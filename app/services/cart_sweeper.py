@@ -0,0 +1,246 @@
+"""
+Barrido de carritos abiertos abandonados.
+
+Los carritos que nunca llegan al checkout se quedan en status='open'. El
+barrido cancela los que llevan más de CART_SWEEP_IDLE_MINUTES sin cambios
+(updated_at), en lotes de CART_SWEEP_BATCH con una transacción por lote, y
+opcionalmente (CART_SWEEP_ARCHIVE=1) mueve sus items a cart_items_archive.
+
+Corre dentro de la API cada CART_SWEEP_INTERVAL_SECONDS (0 lo desactiva)
+y también desde la línea de comandos:
+
+    python -m app.services.cart_sweeper --idle-minutes 240 --archive
+    python -m app.services.cart_sweeper --dry-run
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+# Importar modelos de SQLAlchemy
+from models import Cart, CartItem, CartItemArchive
+
+from app.core.exceptions import ConflictError
+from app.core.metrics import metrics
+from app.repositories.cart_store import cart_store
+
+
+CART_SWEEP_IDLE_MINUTES = float(os.getenv("CART_SWEEP_IDLE_MINUTES", "240"))
+CART_SWEEP_BATCH = int(os.getenv("CART_SWEEP_BATCH", "500"))
+CART_SWEEP_INTERVAL_SECONDS = float(os.getenv("CART_SWEEP_INTERVAL_SECONDS", "600"))
+CART_SWEEP_ARCHIVE = os.getenv("CART_SWEEP_ARCHIVE", "0") == "1"
+
+logger = logging.getLogger("pos.carts")
+
+_ARCHIVE_COLUMNS = ("id", "cart_id", "product_id", "product_name", "price", "quantity", "subtotal")
+
+
+class CartSweeper:
+    """
+    Cancela carritos abiertos sin actividad.
+
+    - Cada lote toma hasta batch_size carritos (FOR UPDATE SKIP LOCKED en
+      Postgres, así varios workers no se pisan) y avanza por Id, de modo que
+      un carrito omitido no vuelve a tomarse en la misma corrida.
+    - Solo cancela si el carrito sigue abierto al momento del UPDATE.
+    - Los carritos del almacén en memoria se juzgan por su última actividad
+      en memoria; si están inactivos se escriben y se sacan del almacén.
+    """
+
+    def __init__(
+        self,
+        idle_minutes: float = CART_SWEEP_IDLE_MINUTES,
+        batch_size: int = CART_SWEEP_BATCH,
+        archive: bool = CART_SWEEP_ARCHIVE
+    ):
+        self.idle_minutes = idle_minutes
+        self.batch_size = batch_size
+        self.archive = archive
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------ Ciclo de vida ------------------
+    def start(self, session_factory: Callable[[], Session], interval: float = CART_SWEEP_INTERVAL_SECONDS) -> None:
+        """Programa el barrido periódico en un hilo del proceso"""
+        if self._thread is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(session_factory, interval), name="cart-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # ------------------ Barrido ------------------
+    def barrer(
+        self,
+        session_factory: Callable[[], Session],
+        max_lotes: Optional[int] = None,
+        dry_run: bool = False
+    ) -> Dict:
+        """
+        Cancela los carritos abandonados, lote por lote.
+
+        Args:
+            session_factory: Crea una sesión por lote (transacciones acotadas)
+            max_lotes: Límite de lotes por corrida (None = hasta terminar)
+            dry_run: Solo cuenta los candidatos, sin modificar nada
+
+        Returns:
+            Diccionario con carts, items_archived, batches y ms
+        """
+        inicio = time.perf_counter()
+        limite = datetime.utcnow() - timedelta(minutes=self.idle_minutes)
+        resumen = {"carts": 0, "items_archived": 0, "batches": 0}
+
+        if dry_run:
+            db = session_factory()
+            try:
+                resumen["candidates"] = db.query(func.count(Cart.id)).filter(*_abandonados(limite)).scalar()
+            finally:
+                db.close()
+            return resumen
+
+        desde_id = 0
+        while max_lotes is None or resumen["batches"] < max_lotes:
+            db = session_factory()
+            cerrar: List[int] = []
+            try:
+                tomados, cancelados, items = self._lote(db, limite, desde_id, cerrar)
+                db.commit()
+            except Exception:
+                db.rollback()
+                for cart_id in cerrar:
+                    cart_store.liberar(cart_id)
+                raise
+            finally:
+                db.close()
+
+            for cart_id in cerrar:
+                cart_store.cerrar(cart_id)
+            if not tomados:
+                break
+            desde_id = tomados[-1]
+            resumen["batches"] += 1
+            resumen["carts"] += cancelados
+            resumen["items_archived"] += items
+            metrics.carts_swept.inc(cancelados)
+            metrics.cart_items_archived.inc(items)
+            if len(tomados) < self.batch_size:
+                break
+
+        resumen["ms"] = round((time.perf_counter() - inicio) * 1000, 2)
+        if resumen["carts"]:
+            logger.info(json.dumps({"event": "cart_sweep", **resumen}))
+        return resumen
+
+    # ------------------ Internos ------------------
+    def _lote(self, db: Session, limite: datetime, desde_id: int, del_almacen: List[int]) -> Tuple[List[int], int, int]:
+        """
+        Un lote en la transacción de db: (ids tomados, cancelados, items archivados).
+        Agrega a del_almacen los carritos del almacén escritos en esta transacción.
+        """
+        tomados = [
+            cart_id for (cart_id,) in db.query(Cart.id)
+            .filter(*_abandonados(limite), Cart.id > desde_id)
+            .order_by(Cart.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ]
+
+        ids = []
+        for cart_id in tomados:
+            if cart_store.tiene(cart_id):
+                # updated_at en BD se actualiza solo al volcar; manda la actividad en memoria.
+                # None: un checkout lo sacó del almacén después de tiene()
+                actividad = cart_store.ultima_actividad(cart_id)
+                if actividad is None or actividad >= limite:
+                    continue
+                try:
+                    cart_store.escribir(db, cart_id)
+                except ConflictError:
+                    # Se está cobrando en este momento
+                    continue
+                del_almacen.append(cart_id)
+            ids.append(cart_id)
+        if not ids:
+            return tomados, 0, 0
+
+        ahora = datetime.utcnow()
+        valores = {Cart.status: "cancelled", Cart.cancelled_at: ahora, Cart.updated_at: ahora}
+        if self.archive:
+            # Los items pasan al archivo; el carrito queda vacío y consistente
+            valores.update({Cart.total: 0, Cart.item_count: 0})
+        cancelados = db.query(Cart).filter(Cart.id.in_(ids), Cart.status == "open").update(
+            valores, synchronize_session=False
+        )
+
+        items = 0
+        if self.archive and cancelados:
+            # Solo los carritos que este lote canceló (no uno cobrado mientras tanto)
+            cancelados_aqui = select(Cart.id).where(
+                Cart.id.in_(ids), Cart.status == "cancelled", Cart.cancelled_at == ahora
+            )
+            db.execute(
+                insert(CartItemArchive).from_select(
+                    list(_ARCHIVE_COLUMNS) + ["archived_at"],
+                    select(*(getattr(CartItem, c) for c in _ARCHIVE_COLUMNS), literal(ahora))
+                    .where(CartItem.cart_id.in_(cancelados_aqui))
+                )
+            )
+            items = db.execute(
+                delete(CartItem).where(CartItem.cart_id.in_(cancelados_aqui))
+            ).rowcount
+        return tomados, cancelados, items
+
+    def _run(self, session_factory: Callable[[], Session], interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.barrer(session_factory)
+            except Exception:
+                logger.exception("cart_sweep_failed")
+
+
+def _abandonados(limite: datetime) -> tuple:
+    """Filtros de un carrito abierto sin cambios desde antes de limite (idx_cart_status_updated)"""
+    return (Cart.status == "open", Cart.updated_at < limite)
+
+
+# Instancia compartida por el proceso
+cart_sweeper = CartSweeper()
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Cancela carritos abiertos abandonados")
+    parser.add_argument("--idle-minutes", type=float, default=CART_SWEEP_IDLE_MINUTES,
+                        help="Minutos sin cambios para considerar abandonado un carrito")
+    parser.add_argument("--batch", type=int, default=CART_SWEEP_BATCH, help="Carritos por transacción")
+    parser.add_argument("--max-batches", type=int, default=None, help="Límite de lotes en esta corrida")
+    parser.add_argument("--archive", action="store_true", default=CART_SWEEP_ARCHIVE,
+                        help="Mover los items a cart_items_archive")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar los candidatos")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal
+
+    sweeper = CartSweeper(idle_minutes=args.idle_minutes, batch_size=args.batch, archive=args.archive)
+    resumen = sweeper.barrer(SessionLocal, max_lotes=args.max_batches, dry_run=args.dry_run)
+    print(json.dumps(resumen))
+    return resumen
+
+
+if __name__ == "__main__":
+    main()
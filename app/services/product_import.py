@@ -0,0 +1,57 @@
+"""
+Lectura por streaming de archivos de importación de productos (CSV / NDJSON).
+Cada fila se entrega en cuanto se lee; el archivo nunca se carga completo.
+"""
+
+import csv
+import json
+from typing import Iterator, Optional, TextIO, Tuple
+
+
+# (número de línea, datos de la fila o None, error de lectura o None)
+ImportRow = Tuple[int, Optional[dict], Optional[str]]
+
+FORMATOS = ("csv", "ndjson")
+
+
+def iter_import_rows(stream: TextIO, formato: str = "csv") -> Iterator[ImportRow]:
+    """
+    Recorre el archivo fila por fila.
+
+    Args:
+        stream: Archivo de texto abierto (encabezados con los alias de
+                ProductoCreate: Code, Barcode, Product, Category, Units,
+                Price, Stock, Min_Stock)
+        formato: "csv" o "ndjson"
+
+    Returns:
+        Iterador de (línea, datos, error)
+    """
+    if formato == "ndjson":
+        return _iter_ndjson(stream)
+    return _iter_csv(stream)
+
+
+def _iter_csv(stream: TextIO) -> Iterator[ImportRow]:
+    reader = csv.DictReader(stream)
+    for row in reader:
+        if None in row:
+            yield reader.line_num, None, "La fila tiene más columnas que el encabezado"
+            continue
+        # Celdas vacías como campos ausentes (Barcode opcional, etc.)
+        yield reader.line_num, {k: v for k, v in row.items() if v not in ("", None)}, None
+
+
+def _iter_ndjson(stream: TextIO) -> Iterator[ImportRow]:
+    for line_num, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_num, None, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield line_num, None, "Cada línea debe ser un objeto JSON"
+            continue
+        yield line_num, data, None
@@ -3,9 +3,12 @@ Service para lógica de negocio de productos.
 Capa de servicios - contiene reglas de negocio y validaciones.
 """
 
+import os
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from sqlalchemy.exc import IntegrityError
+from typing import Iterable, List, Dict, Optional, Tuple
 from decimal import Decimal
+from pydantic import ValidationError as SchemaError
 
 # Importar modelos
 from models import Product
@@ -15,6 +18,10 @@ from schemas import ProductoCreate, ProductoUpdate
 
 # Importar repository
 from app.repositories.product_repository import ProductRepository
+from app.repositories.catalog_cache import catalog_cache
+from app.repositories.inventory_counters import inventory_counters
+from app.services.product_import import ImportRow
+from app.core.response_cache import response_cache
 
 # Importar excepciones
 from app.core.exceptions import (
@@ -25,6 +32,11 @@ from app.core.exceptions import (
 )
 
 
+# Filas por transacción al importar y errores que se reportan como máximo
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERRORS = 1000
+
+
 class ProductService:
     """
     Service para gestionar la lógica de negocio de productos.
@@ -39,12 +51,14 @@ class ProductService:
         self.db = db
         self.repository = ProductRepository(db)
     
-    def get_product_by_id(self, product_id: int) -> Product:
+    def get_product_by_id(self, product_id: int, cached: bool = True) -> Product:
         """
         Obtiene un producto por ID con validación.
         
         Args:
             product_id: ID del producto
+            cached: Si se puede responder desde el caché del catálogo
+                    (False cuando el producto se va a modificar)
             
         Returns:
             Product encontrado
@@ -52,7 +66,7 @@ class ProductService:
         Raises:
             NotFoundError: Si el producto no existe
         """
-        producto = self.repository.get_by_id(product_id)
+        producto = self.repository.get_by_id(product_id, cached=cached)
         
         if not producto:
             raise NotFoundError("Producto", product_id)
@@ -80,6 +94,30 @@ class ProductService:
         
         return self.repository.get_all_active(skip, limit)
     
+    def get_products_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Product], Optional[str]]:
+        """
+        Obtiene productos activos por cursor.
+        
+        Args:
+            cursor: Cursor de la página anterior (None para la primera)
+            limit: Máximo de registros
+            
+        Returns:
+            (productos de la página, cursor de la siguiente o None)
+            
+        Raises:
+            ValidationError: Si el cursor es inválido
+        """
+        # Validar límites
+        if limit > 500:
+            limit = 500
+        
+        return self.repository.get_active_page(cursor, limit)
+    
     def search_products(self, query: str) -> List[Product]:
         """
         Busca productos con validaciones.
@@ -144,7 +182,10 @@ class ProductService:
             Activo=1
         )
         
-        return self.repository.create(nuevo_producto)
+        producto = self.repository.create(nuevo_producto)
+        catalog_cache.bump_version()
+        response_cache.invalidate("inventory")
+        return producto
     
     def update_product(
         self, 
@@ -166,7 +207,7 @@ class ProductService:
             DuplicateError: Si el nuevo código/barcode ya existe
         """
         # Obtener producto existente
-        producto = self.get_product_by_id(product_id)
+        producto = self.get_product_by_id(product_id, cached=False)
         
         # Actualizar solo campos proporcionados
         update_dict = update_data.model_dump(exclude_unset=True, by_alias=False)
@@ -195,7 +236,10 @@ class ProductService:
                 raise ValidationError("min_stock", "El stock mínimo no puede ser negativo")
             producto.Min_Stock = update_dict["min_stock"]
         
-        return self.repository.update(producto)
+        producto = self.repository.update(producto)
+        catalog_cache.bump_version()
+        response_cache.invalidate("inventory")
+        return producto
     
     def update_stock(self, product_id: int, new_stock: int) -> Product:
         """
@@ -215,10 +259,14 @@ class ProductService:
         if new_stock < 0:
             raise ValidationError("stock", "El stock no puede ser negativo")
         
-        producto = self.get_product_by_id(product_id)
+        producto = self.get_product_by_id(product_id, cached=False)
         producto.Stock = new_stock
         
-        return self.repository.update(producto)
+        producto = self.repository.update(producto)
+        catalog_cache.discard([product_id])
+        inventory_counters.mark_dirty([product_id])
+        response_cache.invalidate("inventory")
+        return producto
     
     def reduce_stock(self, product_id: int, quantity: int) -> Product:
         """
@@ -239,7 +287,7 @@ class ProductService:
         if quantity <= 0:
             raise ValidationError("quantity", "La cantidad debe ser mayor a 0")
         
-        producto = self.get_product_by_id(product_id)
+        producto = self.get_product_by_id(product_id, cached=False)
         
         # Verificar stock suficiente
         if producto.Stock < quantity:
@@ -249,7 +297,11 @@ class ProductService:
             )
         
         producto.Stock = producto.Stock - quantity
-        return self.repository.update(producto)
+        producto = self.repository.update(producto)
+        catalog_cache.discard([product_id])
+        inventory_counters.mark_dirty([product_id])
+        response_cache.invalidate("inventory")
+        return producto
     
     def delete_product(self, product_id: int) -> Product:
         """
@@ -264,7 +316,124 @@ class ProductService:
         Raises:
             NotFoundError: Si el producto no existe
         """
-        return self.repository.soft_delete(product_id)
+        producto = self.repository.soft_delete(product_id)
+        catalog_cache.bump_version()
+        response_cache.invalidate("inventory")
+        return producto
+    
+    def import_products(
+        self,
+        rows: Iterable[ImportRow],
+        update_existing: bool = True,
+        batch_size: int = IMPORT_BATCH_SIZE
+    ) -> Dict:
+        """
+        Importa productos en lotes (alta o actualización por código).
+        
+        Cada fila se valida con las mismas reglas que create_product y se
+        compara contra los códigos ya cargados en memoria, sin consultar
+        la BD por fila. Las filas válidas se guardan en bloque cada
+        batch_size filas; las inválidas se reportan con su número de línea.
+        
+        Args:
+            rows: Filas de iter_import_rows (línea, datos, error)
+            update_existing: Actualizar productos cuyo código ya existe
+                             (False los reporta como duplicados)
+            batch_size: Filas por transacción
+            
+        Returns:
+            Diccionario con contadores y errores por fila
+        """
+        by_code, by_barcode = self.repository.get_code_index()
+        seen_codes = set()
+        seen_barcodes = set()
+        report = {"processed": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+        batch = {"new": [], "existing": [], "lines": []}
+        
+        def add_error(line: int, code, message: str) -> None:
+            report["failed"] += 1
+            if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                report["errors"].append({"line": line, "code": code, "error": message})
+        
+        def flush() -> None:
+            try:
+                self.repository.bulk_upsert(batch["new"], batch["existing"])
+                report["created"] += len(batch["new"])
+                report["updated"] += len(batch["existing"])
+            except IntegrityError:
+                # Otro proceso insertó los mismos códigos durante la importación
+                self.db.rollback()
+                for line, code in batch["lines"]:
+                    add_error(line, code, "Conflicto de código al guardar el lote")
+            for key in batch:
+                batch[key] = []
+        
+        for line, raw, error in rows:
+            report["processed"] += 1
+            code = raw.get("Code") if raw else None
+            if error:
+                add_error(line, code, error)
+                continue
+            
+            try:
+                data = ProductoCreate.model_validate(raw)
+                self._validate_product_data(data)
+            except SchemaError as e:
+                add_error(line, code, "; ".join(
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+                ))
+                continue
+            except ValidationError as e:
+                add_error(line, code, e.message)
+                continue
+            
+            code = str(data.code)
+            barcode = str(data.barcode) if data.barcode else None
+            existing_id = by_code.get(code)
+            
+            if barcode is None:
+                add_error(line, code, "El código de barras es obligatorio")
+            elif code in seen_codes:
+                add_error(line, code, "Código repetido en el archivo")
+            elif barcode in seen_barcodes:
+                add_error(line, code, "Código de barras repetido en el archivo")
+            elif existing_id is not None and not update_existing:
+                add_error(line, code, DuplicateError("Producto", "código", code).message)
+            elif by_barcode.get(barcode, existing_id) != existing_id:
+                add_error(line, code, DuplicateError("Producto", "código de barras", barcode).message)
+            else:
+                seen_codes.add(code)
+                seen_barcodes.add(barcode)
+                values = {
+                    "Code": code,
+                    "Barcode": barcode,
+                    "Product": data.product,
+                    "Category": data.category,
+                    "Units": data.units,
+                    "Price": data.price,
+                    "Stock": data.stock,
+                    "Min_Stock": data.min_stock
+                }
+                if existing_id is None:
+                    values["Activo"] = 1
+                    batch["new"].append(values)
+                else:
+                    values["Id"] = existing_id
+                    batch["existing"].append(values)
+                batch["lines"].append((line, code))
+                
+                if len(batch["lines"]) >= batch_size:
+                    flush()
+        
+        if batch["lines"]:
+            flush()
+        
+        if report["created"] or report["updated"]:
+            catalog_cache.bump_version()
+            response_cache.invalidate("inventory")
+        
+        report["errors_truncated"] = report["failed"] > len(report["errors"])
+        return report
     
     def get_inventory_summary(self) -> Dict:
         """
@@ -273,15 +442,13 @@ class ProductService:
         Returns:
             Diccionario con estadísticas de inventario
         """
-        total_products = self.repository.count_active()
-        low_stock_products = self.repository.get_low_stock_products()
-        categories = self.repository.count_by_category()
+        stats = self.repository.get_inventory_stats(top=10)
         
         return {
-            "total_products": total_products,
-            "low_stock_count": len(low_stock_products),
-            "normal_stock_count": total_products - len(low_stock_products),
-            "categories_count": categories,
+            "total_products": stats["total"],
+            "low_stock_count": stats["low_stock"],
+            "normal_stock_count": stats["total"] - stats["low_stock"],
+            "categories_count": stats["categories"],
             "low_stock_products": [
                 {
                     "id": p.Id,
@@ -289,7 +456,7 @@ class ProductService:
                     "current_stock": int(p.Stock),
                     "min_stock": int(p.Min_Stock)
                 }
-                for p in low_stock_products[:10]  # Top 10
+                for p in stats["low_stock_products"]  # Top 10
             ]
         }
     
@@ -0,0 +1,69 @@
+"""
+Conteo de sentencias SQL para las pruebas.
+
+Compartido por los módulos test_*.py que verifican cuántas consultas
+emite un endpoint o una función (N+1, lotes, cachés, planes):
+
+    with ContadorConsultas() as consultas:
+        client.get("/tickets/")
+    assert len(consultas) == 2
+
+    with max_consultas(3, "GET /tickets/"):
+        client.get("/tickets/")
+
+Sin engine explícito se cuenta sobre el del proceso (database.engine).
+"""
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias SQL emitidas dentro del bloque with"""
+
+    def __init__(self, engine: Optional[Engine] = None):
+        if engine is None:
+            from database import engine
+        self.engine = engine
+        self.sentencias: List[str] = []
+        self.parametros: List[Any] = []
+
+    def _capturar(self, conn, cursor, statement, parameters, context, executemany):
+        self.sentencias.append(statement)
+        self.parametros.append(parameters)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._capturar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._capturar)
+
+    def __len__(self):
+        return len(self.sentencias)
+
+    def clear(self) -> None:
+        """Vuelve a contar desde cero sin salir del bloque"""
+        self.sentencias.clear()
+        self.parametros.clear()
+
+    def selects(self) -> List[Tuple[str, Any]]:
+        """(sentencia, parámetros) de cada SELECT emitido"""
+        return [
+            (statement, parameters)
+            for statement, parameters in zip(self.sentencias, self.parametros)
+            if statement.lstrip().upper().startswith("SELECT")
+        ]
+
+
+@contextmanager
+def max_consultas(limite: int, descripcion: str = "", engine: Optional[Engine] = None) -> Iterator[ContadorConsultas]:
+    """Falla si el bloque emite más de `limite` sentencias (las lista en el mensaje)"""
+    with ContadorConsultas(engine) as consultas:
+        yield consultas
+    assert len(consultas) <= limite, (
+        f"{descripcion}: {len(consultas)} consultas (máximo {limite})\n"
+        + "\n".join(consultas.sentencias)
+    )
@@ -1,16 +1,29 @@
 import bcrypt
-from sqlalchemy import or_, and_
+import csv
+import io
+import json
+from sqlalchemy import or_, and_, func
 from decimal import Decimal
 from sqlalchemy.exc import IntegrityError 
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import cast, String, Index
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import cast, String, Index, insert, update
 from models import Product, Cart, CartItem, Users, PriceHistory
-from schemas import ProductoCreate, ProductoUpdate
+from schemas import ProductoCreate, ProductoUpdate, BatchItemLine, CartItemSchema
 from fastapi import HTTPException
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
 from app.core.security import hash_password, verify_password
-from app.core.exceptions import NotFoundError
+from app.core.exceptions import ConflictError, NotFoundError
+from app.core.metrics import metrics
+from app.core.pagination import paginate_keyset
+from app.core.response_cache import response_cache
+from app.repositories.cart_store import CARRITO_NO_DISPONIBLE, cart_store
+from app.repositories.catalog_cache import catalog_cache
+from app.repositories.inventory_counters import inventory_counters
+from app.repositories.product_repository import ProductRepository
+
+# Productos por consulta IN en actualizaciones de precio en lote
+LOTE_PRECIOS = 1000
 
 # ------------------ Usuarios ------------------
 def get_user_by_username(db: Session, username: str) -> Users | None:
@@ -62,15 +75,8 @@ def buscar_productos(db: Session, query: str) -> list[Product]:
     if len(query) > 100:
         raise ValueError("Query demasiado largo")
     
-    # SQLAlchemy escapa automáticamente los parámetros
-    search_pattern = f"%{query}%"
-    return db.query(Product).filter(
-        or_(
-            Product.Product.ilike(search_pattern),
-            cast(Product.Code, String).ilike(search_pattern),
-            cast(Product.Barcode, String).ilike(search_pattern)
-        )
-    ).limit(100).all()
+    # Búsqueda por trigramas (pg_trgm o índice en memoria), ordenada por relevancia
+    return ProductRepository(db).search(query, limit=100)
 
 def crear_producto(db: Session, producto: ProductoCreate) -> Product:
     try:
@@ -78,6 +84,8 @@ def crear_producto(db: Session, producto: ProductoCreate) -> Product:
         db.add(nuevo)
         db.commit()
         db.refresh(nuevo)
+        catalog_cache.bump_version()
+        response_cache.invalidate("inventory")
         return nuevo
     except IntegrityError:
         db.rollback()
@@ -97,6 +105,9 @@ def actualizar_stock(db: Session, id: int, nuevo_stock: int) -> Product:
     producto.Stock = nuevo_stock
     db.commit()
     db.refresh(producto)
+    catalog_cache.discard([id])
+    inventory_counters.mark_dirty([id])
+    response_cache.invalidate("inventory")
     return producto
 
 def eliminar_producto(db: Session, id: int):
@@ -105,21 +116,17 @@ def eliminar_producto(db: Session, id: int):
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     producto.Activo = 0
     db.commit()
+    catalog_cache.bump_version()
+    response_cache.invalidate("inventory")
     return producto
 
 def resumen_inventario(db: Session) -> dict:
-    total = db.query(Product).filter(Product.Activo == 1).count()
-    bajo = db.query(Product).filter(
-        Product.Stock <= Product.Min_Stock, 
-        Product.Activo == 1
-    ).count()
-    normal = total - bajo
-    categorias = db.query(Product.Category).filter(Product.Activo == 1).distinct().count()
+    stats = ProductRepository(db).get_inventory_stats(top=0)
     return {
-        "TotalProductos": total,
-        "StockBajo": bajo,
-        "StockNormal": normal,
-        "Categorias": categorias
+        "TotalProductos": stats["total"],
+        "StockBajo": stats["low_stock"],
+        "StockNormal": stats["total"] - stats["low_stock"],
+        "Categorias": stats["categories"]
     }
 
 def actualizar_producto(db: Session, product_id: int, data: ProductoUpdate) -> Product | None:
@@ -131,6 +138,8 @@ def actualizar_producto(db: Session, product_id: int, data: ProductoUpdate) -> P
         setattr(producto, field, value)
     db.commit()
     db.refresh(producto)
+    catalog_cache.bump_version()
+    response_cache.invalidate("inventory")
     return producto
 
 # ------------------ Carritos ------------------
@@ -140,25 +149,57 @@ def crear_carrito(db: Session, user_id: int | None = None) -> Cart:
     db.add(cart)
     db.commit()
     db.refresh(cart)
+    cart_store.abrir(cart)
+    metrics.carts_opened.inc()
     return cart
 
 def obtener_carrito(db: Session, cart_id: int) -> Cart | None:
+    # Carritos abiertos en el almacén en memoria (CART_STORE=memory)
+    cart = cart_store.obtener(cart_id)
+    if cart is not None:
+        return cart
     return db.query(Cart).filter(Cart.id == cart_id).first()
 
-def buscar_producto(db: Session, product_id=None, code=None, barcode=None) -> Product | None:
-    q = db.query(Product).filter(Product.Activo == 1)
+def buscar_producto(db: Session, product_id=None, code=None, barcode=None, mode: str = "exact") -> Product | None:
+    """
+    Busca el producto escaneado.
+    
+    Siempre intenta primero una igualdad exacta (índices únicos de Code y
+    Barcode, vía caché del catálogo). Solo si mode == "prefix" y no hubo
+    coincidencia exacta, busca el código que empiece con el valor dado.
+    """
     if product_id:
-        return q.filter(Product.Id == product_id).first()
+        producto = catalog_cache.get_by_id(db, product_id)
+        return producto if producto is not None and producto.Activo == 1 else None
+    
     if code:
-        return q.filter(cast(Product.Code, String).ilike(f"%{code}%")).first()
-    if barcode:
-        return q.filter(cast(Product.Barcode, String).ilike(f"%{barcode}%")).first()
-    return None
+        column, value = Product.Code, str(code)
+        producto = catalog_cache.get_by_code(db, value)
+    elif barcode:
+        column, value = Product.Barcode, str(barcode)
+        producto = catalog_cache.get_by_barcode(db, value)
+    else:
+        return None
+    
+    if producto is not None and producto.Activo == 1:
+        return producto
+    
+    if mode != "prefix":
+        return None
+    
+    # Prefijo sin comodín inicial; el código más corto es la coincidencia más cercana
+    return (
+        db.query(Product)
+        .filter(Product.Activo == 1, column.startswith(value, autoescape=True))
+        .order_by(func.length(column), column)
+        .first()
+    )
 
 def agregar_item(db: Session, cart_id: int, product: Product, quantity: Decimal) -> CartItem:
     if product.Stock < float(quantity):
         raise HTTPException(status_code=400, detail="Stock insuficiente")
-    subtotal = float(product.Price) * float(quantity)
+    if cart_store.tiene(cart_id):
+        return cart_store.agregar(cart_id, [(product, quantity)])[0]
 
      # Verificar si el item ya existe en el carrito
     existing_item = db.query(CartItem).filter(
@@ -168,27 +209,137 @@ def agregar_item(db: Session, cart_id: int, product: Product, quantity: Decimal)
     
     if existing_item:
         # Actualizar cantidad existente
+        anterior = existing_item.subtotal
         existing_item.quantity += quantity
-        existing_item.subtotal = existing_item.price * existing_item.quantity
+        existing_item.subtotal = subtotal_item(existing_item.price, existing_item.quantity)
+        _ajustar_totales(db, cart_id, existing_item.subtotal - anterior)
         db.commit()
         db.refresh(existing_item)
         return existing_item
     
     # Crear nuevo item
-    subtotal = product.Price * quantity
     item = CartItem(
         cart_id=cart_id,
         product_id=product.Id,
         product_name=product.Product,
         price=product.Price,
         quantity=quantity,
-        subtotal=subtotal,
+        subtotal=subtotal_item(product.Price, quantity),
     )
     db.add(item)
+    _ajustar_totales(db, cart_id, item.subtotal, 1)
     db.commit()
     db.refresh(item)
     return item
 
+def agregar_items_en_lote(db: Session, cart_id: int, lineas: list[BatchItemLine]) -> tuple[list[dict], Decimal]:
+    """
+    Agrega al carrito todas las líneas escaneadas de una canasta.
+
+    Resuelve los productos en una sola consulta (igualdad exacta por Id,
+    código o código de barras), junta en memoria las líneas del mismo
+    producto y actualiza o inserta los CartItem con un solo commit.
+    Una línea inválida se reporta en su resultado sin afectar a las demás.
+    Devuelve (resultados por línea, nuevo total del carrito).
+    """
+    cart = cart_store.obtener(cart_id)
+    if cart is None:
+        cart = db.query(Cart).options(selectinload(Cart.items)).filter(Cart.id == cart_id).first()
+    if not cart or cart.status != "open":
+        raise HTTPException(status_code=404, detail="Carrito no disponible")
+
+    # Misma prioridad que buscar_producto: Id, luego código, luego código de barras
+    ids = {l.product_id for l in lineas if l.product_id}
+    codes = {str(l.code) for l in lineas if not l.product_id and l.code}
+    barcodes = {str(l.barcode) for l in lineas if not l.product_id and not l.code and l.barcode}
+    filtros = []
+    if ids:
+        filtros.append(Product.Id.in_(ids))
+    if codes:
+        filtros.append(Product.Code.in_(codes))
+    if barcodes:
+        filtros.append(Product.Barcode.in_(barcodes))
+    productos = db.query(Product).filter(Product.Activo == 1, or_(*filtros)).all() if filtros else []
+    por_id = {p.Id: p for p in productos}
+    por_code = {p.Code: p for p in productos}
+    por_barcode = {p.Barcode: p for p in productos}
+
+    agregado = {}  # cantidad del lote por producto, para validar el stock acumulado
+    aceptadas = []
+    resultados = []
+
+    for n, linea in enumerate(lineas):
+        if linea.product_id:
+            product = por_id.get(linea.product_id)
+        elif linea.code:
+            product = por_code.get(str(linea.code))
+        else:
+            product = por_barcode.get(str(linea.barcode)) if linea.barcode else None
+
+        error = None
+        if product is None:
+            error = "Producto no encontrado"
+        elif linea.quantity <= 0:
+            error = "La cantidad debe ser mayor a 0"
+        else:
+            cantidad = agregado.get(product.Id, Decimal("0")) + linea.quantity
+            if product.Stock is not None and product.Stock < cantidad:
+                error = "Stock insuficiente"
+
+        if error:
+            resultados.append({"line": n, "success": False, "error": error})
+            continue
+
+        agregado[product.Id] = cantidad
+        aceptadas.append((product, linea.quantity))
+        resultados.append({"line": n, "success": True, "product_id": product.Id})
+
+    if cart_store.tiene(cart_id):
+        # Carrito en memoria: una sola escritura al journal, sin tocar la BD
+        items = {item.product_id: item for item in cart_store.agregar(cart_id, aceptadas)}
+        total = calcular_total_carrito(db, cart_id)
+    else:
+        items, total = _escribir_items_en_lote(db, cart, aceptadas)
+
+    # La respuesta se arma antes del commit para no recargar cada item expirado
+    for resultado in resultados:
+        if resultado["success"]:
+            resultado["item"] = CartItemSchema.model_validate(items[resultado.pop("product_id")])
+    db.commit()
+    return resultados, total
+
+def _escribir_items_en_lote(db: Session, cart: Cart, aceptadas: list[tuple[Product, Decimal]]) -> tuple[dict, Decimal]:
+    """Actualiza los items existentes e inserta los nuevos (executemany); sin commit"""
+    items = {item.product_id: item for item in cart.items}
+    nuevos = {}  # filas de los productos que aún no están en el carrito
+    delta = Decimal("0")
+    for product, quantity in aceptadas:
+        if product.Id in items:
+            item = items[product.Id]
+            anterior = item.subtotal
+            item.quantity += quantity
+            item.subtotal = subtotal_item(item.price, item.quantity)
+            delta += item.subtotal - anterior
+        else:
+            fila = nuevos.setdefault(product.Id, {
+                "cart_id": cart.id,
+                "product_id": product.Id,
+                "product_name": product.Product,
+                "price": product.Price,
+                "quantity": Decimal("0"),
+            })
+            anterior = fila.get("subtotal", Decimal("0"))
+            fila["quantity"] += quantity
+            fila["subtotal"] = subtotal_item(fila["price"], fila["quantity"])
+            delta += fila["subtotal"] - anterior
+
+    db.flush()
+    if nuevos:
+        db.execute(insert(CartItem), list(nuevos.values()))
+    _ajustar_totales(db, cart.id, delta, len(nuevos))
+    items = {item.product_id: item for item in db.query(CartItem).filter(CartItem.cart_id == cart.id)}
+    return items, db.query(Cart.total).filter(Cart.id == cart.id).scalar()
+
 def actualizar_item(db: Session, item_id: int, quantity: Decimal) -> CartItem | None:
     item = db.query(CartItem).filter(CartItem.id == item_id).first()
     if not item:
@@ -197,8 +348,10 @@ def actualizar_item(db: Session, item_id: int, quantity: Decimal) -> CartItem |
     if quantity <= 0:
         raise HTTPException(status_code=400, detail="La cantidad debe ser mayor a 0")
     
+    anterior = item.subtotal
     item.quantity = quantity
-    item.subtotal = item.price * item.quantity
+    item.subtotal = subtotal_item(item.price, item.quantity)
+    _ajustar_totales(db, item.cart_id, item.subtotal - anterior)
     db.commit()
     db.refresh(item)
     return item
@@ -211,10 +364,14 @@ def resumen_carrito(db: Session, cart_id: int):
     if not cart:
         raise NotFoundError("Carrito", cart_id)
     
-    total = sum(i.subtotal for i in cart.items)
-    return {"cart": cart, "total": total}
+    return {"cart": cart, "total": cart.total}
 
 def eliminar_item_carrito(db: Session, cart_id: int, item_id: int):
+    if cart_store.tiene(cart_id):
+        if not cart_store.eliminar(cart_id, item_id):
+            raise HTTPException(status_code=404, detail="Item no encontrado")
+        return {"message": "Item eliminado"}
+
     item = db.query(CartItem).filter(
         CartItem.cart_id == cart_id, 
         CartItem.id == item_id
@@ -222,14 +379,20 @@ def eliminar_item_carrito(db: Session, cart_id: int, item_id: int):
     if not item:
         raise HTTPException(status_code=404, detail="Item no encontrado")
     
+    _ajustar_totales(db, cart_id, -item.subtotal, -1)
     db.delete(item)
     db.commit()
     return {"message": "Item eliminado"}
 
 def vaciar_carrito(db: Session, cart_id: int):
-    items = db.query(CartItem).filter(CartItem.cart_id == cart_id).all()
-    for item in items:
-        db.delete(item)
+    if cart_store.tiene(cart_id):
+        cart_store.vaciar(cart_id)
+        return {"message": "Carrito vaciado"}
+
+    db.query(CartItem).filter(CartItem.cart_id == cart_id).delete(synchronize_session=False)
+    db.query(Cart).filter(Cart.id == cart_id).update(
+        {Cart.total: 0, Cart.item_count: 0}, synchronize_session=False
+    )
     db.commit()
     return {"message": "Carrito vaciado"}
 
@@ -238,6 +401,10 @@ def cambiar_estado_carrito(db: Session, cart_id: int, new_status: str):
     if not cart:
         return None, "Carrito no encontrado"
     
+    # Al cerrarlo, los items en memoria se escriben en la misma transacción
+    if new_status != "open":
+        cart_store.escribir(db, cart_id)
+    
     cart.status = new_status
     now = datetime.utcnow()
 
@@ -248,29 +415,134 @@ def cambiar_estado_carrito(db: Session, cart_id: int, new_status: str):
     
     cart.updated_at = now
     
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        cart_store.liberar(cart_id)
+        raise
+    if new_status != "open":
+        cart_store.cerrar(cart_id)
     db.refresh(cart)
     return cart, None
 
 def actualizar_cantidad_item(db: Session, cart_id: int, item_id: int, new_qty: int):
+    if cart_store.tiene(cart_id):
+        cart = cart_store.obtener(cart_id)
+        if cart is None:
+            # Un checkout lo cerró entre tiene() y obtener()
+            raise ConflictError(CARRITO_NO_DISPONIBLE)
+        item = next((i for i in cart.items if i.id == item_id), None)
+        if not item:
+            return None, "Item no encontrado en el carrito"
+        product = catalog_cache.get_by_id(db, item.product_id)
+        if product is None:
+            return None, "Producto no disponible"
+        if product.Stock < new_qty:
+            return None, f"Stock insuficiente. Disponible: {product.Stock}"
+        return cart_store.cambiar_cantidad(cart_id, item_id, new_qty), None
+
     item = db.query(CartItem).filter(CartItem.cart_id == cart_id, CartItem.id == item_id).first()
     if not item:
         return None, "Item no encontrado en el carrito"
     if item.product.Stock < new_qty:
          return None, f"Stock insuficiente. Disponible: {item.product.Stock}"
+    anterior = item.subtotal
     item.quantity = new_qty
+    item.subtotal = subtotal_item(item.price, item.quantity)
+    _ajustar_totales(db, cart_id, item.subtotal - anterior)
     db.commit()
     db.refresh(item)
     return item, None
 
 def calcular_total_carrito(db: Session, cart_id: int):
-    items = db.query(CartItem).filter(CartItem.cart_id == cart_id).all()
-    total = sum(i.price * i.quantity for i in items)
-    return total
+    # Fuera del almacén (o recién cerrado por un checkout) el total está en BD
+    total = cart_store.total(cart_id)
+    if total is not None:
+        return total
+    # Lectura de una sola fila por llave primaria
+    return db.query(Cart.total).filter(Cart.id == cart_id).scalar() or Decimal("0")
+
+def subtotal_item(price, quantity) -> Decimal:
+    """Subtotal del renglón redondeado a centavos, igual que se guarda"""
+    return (Decimal(price) * Decimal(quantity)).quantize(Decimal("0.01"))
+
+def _ajustar_totales(db: Session, cart_id: int, total: Decimal, items: int = 0):
+    """Aplica el delta en SQL (total = total + delta) para no perder cambios concurrentes"""
+    db.query(Cart).filter(Cart.id == cart_id).update(
+        {Cart.total: Cart.total + total, Cart.item_count: Cart.item_count + items},
+        synchronize_session=False
+    )
 
-# NUEVA FUNCIÓN PARA PUNTO 5: Búsqueda avanzada
-def buscar_carritos_avanzado(db: Session, fecha_inicio: datetime = None, fecha_fin: datetime = None, min_total: float = None, status: str = None, item_name: str = None):
-    query = db.query(Cart).options(joinedload(Cart.items).joinedload(CartItem.product))
+def verificar_totales_carritos(db: Session, corregir: bool = False) -> list[dict]:
+    """
+    Recalcula total e item_count desde cart_items y reporta las diferencias
+    con lo guardado en cart. Con corregir=True también las corrige.
+    Los carritos abiertos en el almacén en memoria se omiten (sus items
+    se escriben en el siguiente volcado).
+    """
+    suma = (
+        db.query(
+            CartItem.cart_id.label("cart_id"),
+            func.sum(CartItem.subtotal).label("total"),
+            func.count(CartItem.id).label("item_count")
+        )
+        .group_by(CartItem.cart_id)
+        .subquery()
+    )
+    # Redondeo a centavos en ambos lados (SQLite guarda NUMERIC como REAL)
+    total_guardado = func.round(Cart.total, 2)
+    total_real = func.round(func.coalesce(suma.c.total, 0), 2)
+    renglones_real = func.coalesce(suma.c.item_count, 0)
+    filas = (
+        db.query(Cart.id, Cart.total, Cart.item_count, total_real, renglones_real)
+        .outerjoin(suma, suma.c.cart_id == Cart.id)
+        .filter(or_(total_guardado != total_real, Cart.item_count != renglones_real))
+        .order_by(Cart.id)
+        .all()
+    )
+
+    diferencias = [
+        {
+            "cart_id": cart_id,
+            "total": total,
+            "total_items": Decimal(str(total_items)).quantize(Decimal("0.01")),
+            "item_count": item_count,
+            "item_count_items": renglones
+        }
+        for cart_id, total, item_count, total_items, renglones in filas
+        if not cart_store.tiene(cart_id)
+    ]
+
+    if corregir and diferencias:
+        db.execute(update(Cart), [
+            {"id": d["cart_id"], "total": d["total_items"], "item_count": d["item_count_items"]}
+            for d in diferencias
+        ])
+        db.commit()
+    return diferencias
+
+# Búsqueda avanzada de carritos (filtros en SQL, paginada por cursor)
+def buscar_carritos_avanzado(
+    db: Session,
+    fecha_inicio: datetime = None,
+    fecha_fin: datetime = None,
+    min_total: float = None,
+    status: str = None,
+    item_name: str = None,
+    cursor: str | None = None,
+    limit: int = 50
+) -> tuple[list[Cart], str | None]:
+    """
+    Busca carritos por rango de fecha, estado, total mínimo o item contenido.
+
+    Todos los filtros van en SQL: el total mínimo sobre la columna
+    desnormalizada cart.total y el item con EXISTS sobre cart_items (sin
+    duplicar carritos). Pagina por cursor sobre cart.id, del más reciente
+    al más antiguo, y carga los items solo de la página (selectinload).
+    Regresa (carritos, next_cursor).
+    """
+    query = db.query(Cart).options(selectinload(Cart.items))
     
     if fecha_inicio:
         query = query.filter(Cart.created_at >= fecha_inicio)
@@ -278,20 +550,12 @@ def buscar_carritos_avanzado(db: Session, fecha_inicio: datetime = None, fecha_f
         query = query.filter(Cart.created_at <= fecha_fin)
     if status:
         query = query.filter(Cart.status == status)
-        
-    # Filtro por nombre de producto dentro del carrito
+    if min_total is not None:
+        query = query.filter(Cart.total >= min_total)
     if item_name:
-        query = query.join(Cart.items).join(CartItem.product).filter(Product.Product.ilike(f"%{item_name}%"))
+        query = query.filter(Cart.items.any(CartItem.product_name.ilike(f"%{item_name}%")))
     
-    carts = query.all()
-    
-    # Filtro por total (calculado, ya que el total a veces no se guarda en la tabla Cart hasta cerrar)
-    # Si tienes una columna 'total' en Cart, úsala en el query. Si no, filtra en Python:
-    if min_total is not None:
-        carts = [c for c in carts if sum(i.quantity * i.price_at_add for i in c.items) >= min_total]
-        
-    return carts
-
+    return paginate_keyset(query, [Cart.id], cursor, limit)
 
 #Precios
 def actualizar_precio(db: Session, product_id: int, new_price: float, reason: str | None = None):
@@ -324,21 +588,67 @@ def actualizar_precio(db: Session, product_id: int, new_price: float, reason: st
 
     db.commit()
     db.refresh(producto)
+    catalog_cache.bump_version()
+    response_cache.invalidate("inventory")
     return producto, None
 
 def actualizar_precios_en_lote(db: Session, items: list[dict]):
+    """Actualiza precios en lote en una sola transacción (una lectura, escrituras en bloque)"""
+    ids = list({int(item["Id"]) for item in items})
+    productos = {}
+    for i in range(0, len(ids), LOTE_PRECIOS):
+        for pid, price, activo in db.query(Product.Id, Product.Price, Product.Activo).filter(
+            Product.Id.in_(ids[i:i + LOTE_PRECIOS])
+        ):
+            productos[pid] = (price, activo)
+
+    # Precio vigente por producto, para que un Id repetido vea el cambio anterior
+    precios = {pid: price for pid, (price, _) in productos.items()}
+    cambios = {}
+    historial = []
     resultados = []
+    ahora = datetime.utcnow()
+
     for item in items:
         pid = int(item["Id"])
-        price = float(item["Price"])
-        reason = item.get("Reason")
-        producto, error = actualizar_precio(db, pid, price, reason)
+        new_price = Decimal(str(item["Price"])).quantize(Decimal("0.01"))
+        error = None
+
+        if pid not in productos:
+            error = "Producto no encontrado"
+        elif productos[pid][1] == 0:
+            error = "Producto inactivo"
+        elif new_price < 0:
+            error = "Precio no puede ser negativo"
+        elif round(precios[pid], 2) == new_price:
+            error = "El nuevo precio es igual al actual"
+
+        if error is None:
+            historial.append({
+                "product_id": pid,
+                "old_price": precios[pid],
+                "new_price": new_price,
+                "reason": item.get("Reason"),
+                "changed_at": ahora
+            })
+            precios[pid] = new_price
+            cambios[pid] = new_price
+
         resultados.append({
             "Id": pid,
             "Success": error is None,
-            "Error": error if error else None,
-            "NewPrice": producto.Price if producto else None
+            "Error": error,
+            "NewPrice": new_price if error is None else None
         })
+
+    if cambios:
+        # executemany: UPDATE por llave primaria e INSERT del historial
+        db.execute(update(Product), [{"Id": pid, "Price": price} for pid, price in cambios.items()])
+        db.execute(insert(PriceHistory), historial)
+        db.commit()
+        catalog_cache.bump_version()
+        response_cache.invalidate("inventory")
+
     return resultados
 
 def obtener_historial_precios(db: Session, product_id: int, limit: int = 50):
@@ -348,4 +658,65 @@ def obtener_historial_precios(db: Session, product_id: int, limit: int = 50):
         .order_by(PriceHistory.changed_at.desc())
         .limit(limit)
         .all()
-    )
\ No newline at end of file
+    )
+
+# ------------------ Exportación ------------------
+# Filas por lote leído de la BD y por bloque enviado al cliente
+LOTE_EXPORTACION = 1000
+
+COLUMNAS_PRODUCTO = ("Id", "Code", "Barcode", "Product", "Category", "Units", "Price", "Stock", "Min_Stock")
+COLUMNAS_HISTORIAL = ("id", "product_id", "old_price", "new_price", "reason", "changed_at")
+
+def exportar_productos(db: Session, formato: str = "csv"):
+    """Genera el catálogo activo como CSV o NDJSON, por bloques y sin cargarlo completo"""
+    query = (
+        db.query(*[getattr(Product, c) for c in COLUMNAS_PRODUCTO])
+        .filter(Product.Activo == 1)
+        .order_by(Product.Id)
+    )
+    return _exportar_filas(query, COLUMNAS_PRODUCTO, formato)
+
+def exportar_historial_precios(db: Session, formato: str = "csv", desde: datetime | None = None):
+    """Genera el historial de precios como CSV o NDJSON, por bloques"""
+    query = db.query(*[getattr(PriceHistory, c) for c in COLUMNAS_HISTORIAL])
+    if desde:
+        query = query.filter(PriceHistory.changed_at >= desde)
+    return _exportar_filas(query.order_by(PriceHistory.id), COLUMNAS_HISTORIAL, formato)
+
+def _exportar_filas(query, columnas: tuple, formato: str):
+    """Recorre la consulta con yield_per (cursor del lado del servidor) y emite texto"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # El encabezado sale antes de la primera lectura para que el cliente reciba bytes de inmediato
+    if formato == "csv":
+        writer.writerow(columnas)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    pendientes = 0
+    for fila in query.yield_per(LOTE_EXPORTACION):
+        valores = [_valor_exportado(v) for v in fila]
+        if formato == "csv":
+            writer.writerow(valores)
+        else:
+            buffer.write(json.dumps(dict(zip(columnas, valores)), ensure_ascii=False))
+            buffer.write("\n")
+
+        pendientes += 1
+        if pendientes == LOTE_EXPORTACION:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+
+    if pendientes:
+        yield buffer.getvalue()
+
+def _valor_exportado(valor):
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
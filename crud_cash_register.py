@@ -1,10 +1,13 @@
 from decimal import Decimal
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import case, func
 from fastapi import HTTPException
 from models import CashRegister, SaleTicket
 from schemas import OpenCashRegisterRequest, CloseCashRegisterRequest
+from app.core.pagination import paginate_keyset
+from app.core.response_cache import response_cache
+from app.core.time_window import day_window, within, business_today
 
 def abrir_caja(db: Session, user_id: int, data: OpenCashRegisterRequest) -> CashRegister:
     """Abre una nueva caja registradora"""
@@ -40,6 +43,7 @@ def abrir_caja(db: Session, user_id: int, data: OpenCashRegisterRequest) -> Cash
     db.add(caja)
     db.commit()
     db.refresh(caja)
+    response_cache.invalidate("cash_register")
     
     return caja
 
@@ -81,12 +85,15 @@ def cerrar_caja(
     
     db.commit()
     db.refresh(caja)
+    response_cache.invalidate("cash_register")
     
     return caja
 
 def obtener_caja(db: Session, cash_register_id: int) -> CashRegister:
     """Obtiene una caja por ID"""
-    caja = db.query(CashRegister).filter(CashRegister.id == cash_register_id).first()
+    caja = db.query(CashRegister).options(joinedload(CashRegister.user)).filter(
+        CashRegister.id == cash_register_id
+    ).first()
     if not caja:
         raise HTTPException(status_code=404, detail="Caja no encontrada")
     return caja
@@ -108,8 +115,30 @@ def listar_cajas(
     fecha_hasta: datetime | None = None
 ):
     """Lista cajas con filtros opcionales"""
-    query = db.query(CashRegister)
-    
+    query = _filtrar_cajas(
+        db.query(CashRegister).options(joinedload(CashRegister.user)),
+        status, user_id, fecha_desde, fecha_hasta
+    )
+    return query.order_by(CashRegister.opened_at.desc()).offset(skip).limit(limit).all()
+
+def listar_cajas_por_cursor(
+    db: Session,
+    cursor: str | None = None,
+    limit: int = 50,
+    status: str | None = None,
+    user_id: int | None = None,
+    fecha_desde: datetime | None = None,
+    fecha_hasta: datetime | None = None
+) -> tuple[list[CashRegister], str | None]:
+    """Lista cajas por cursor (opened_at, id); regresa (cajas, next_cursor)"""
+    query = _filtrar_cajas(
+        db.query(CashRegister).options(joinedload(CashRegister.user)),
+        status, user_id, fecha_desde, fecha_hasta
+    )
+    return paginate_keyset(query, [CashRegister.opened_at, CashRegister.id], cursor, limit)
+
+def _filtrar_cajas(query, status, user_id, fecha_desde, fecha_hasta):
+    """Aplica los filtros comunes de listado de cajas"""
     if status:
         query = query.filter(CashRegister.status == status)
     
@@ -122,7 +151,7 @@ def listar_cajas(
     if fecha_hasta:
         query = query.filter(CashRegister.opened_at <= fecha_hasta)
     
-    return query.order_by(CashRegister.opened_at.desc()).offset(skip).limit(limit).all()
+    return query
 
 def obtener_resumen_caja(db: Session, cash_register_id: int) -> dict:
     """Obtiene un resumen detallado de la caja"""
@@ -158,34 +187,44 @@ def obtener_resumen_caja(db: Session, cash_register_id: int) -> dict:
     }
 
 def obtener_ventas_del_dia(db: Session, fecha: datetime | None = None) -> dict:
-    """Obtiene el resumen de ventas del día"""
+    """Obtiene el resumen de ventas del día (día de negocio en la zona de la tienda)"""
     if not fecha:
-        fecha = datetime.utcnow().date()
-    
-    # Tickets del día
-    tickets = db.query(SaleTicket).filter(
-        func.date(SaleTicket.created_at) == fecha,
+        fecha = business_today()
+    ventana = day_window(fecha)
+    
+    # Tickets del día: un solo renglón con los totales (SUM ... FILTER vía CASE)
+    ventas = db.query(
+        func.count(SaleTicket.id).label("num_tickets"),
+        func.sum(SaleTicket.total).label("total"),
+        _suma_por_metodo("cash").label("efectivo"),
+        _suma_por_metodo("card").label("tarjeta"),
+        _suma_por_metodo("transfer").label("transferencia")
+    ).filter(
+        within(SaleTicket.created_at, ventana),
         SaleTicket.status == "completed"
-    ).all()
-    
-    total_ventas = sum(float(t.total) for t in tickets)
-    total_efectivo = sum(float(t.total) for t in tickets if t.payment_method == "cash")
-    total_tarjeta = sum(float(t.total) for t in tickets if t.payment_method == "card")
-    total_transferencia = sum(float(t.total) for t in tickets if t.payment_method == "transfer")
+    ).one()
     
     # Cajas del día
-    cajas = db.query(CashRegister).filter(
-        func.date(CashRegister.opened_at) == fecha
-    ).all()
+    cajas = db.query(
+        func.count(CashRegister.id).label("total"),
+        func.count(case((CashRegister.status == "open", 1))).label("abiertas"),
+        func.count(case((CashRegister.status == "closed", 1))).label("cerradas")
+    ).filter(
+        within(CashRegister.opened_at, ventana)
+    ).one()
     
     return {
         "fecha": fecha.isoformat(),
-        "num_tickets": len(tickets),
-        "total_ventas": total_ventas,
-        "ventas_efectivo": total_efectivo,
-        "ventas_tarjeta": total_tarjeta,
-        "ventas_transferencia": total_transferencia,
-        "num_cajas": len(cajas),
-        "cajas_abiertas": sum(1 for c in cajas if c.status == "open"),
-        "cajas_cerradas": sum(1 for c in cajas if c.status == "closed")
-    }
\ No newline at end of file
+        "num_tickets": ventas.num_tickets,
+        "total_ventas": float(ventas.total or 0),
+        "ventas_efectivo": float(ventas.efectivo or 0),
+        "ventas_tarjeta": float(ventas.tarjeta or 0),
+        "ventas_transferencia": float(ventas.transferencia or 0),
+        "num_cajas": cajas.total,
+        "cajas_abiertas": cajas.abiertas,
+        "cajas_cerradas": cajas.cerradas
+    }
+
+def _suma_por_metodo(metodo: str):
+    """SUM(total) solo de los tickets con ese método de pago"""
+    return func.sum(case((SaleTicket.payment_method == metodo, SaleTicket.total)))
\ No newline at end of file
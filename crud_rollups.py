@@ -0,0 +1,143 @@
+from decimal import Decimal
+from datetime import datetime, date, time, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import SaleTicket, SaleTicketItem, SalesRollupHourly, SalesRollupProductDaily
+
+# ------------------ Mantenimiento incremental ------------------
+def registrar_venta(db: Session, ticket: SaleTicket, items, signo: int = 1):
+    """
+    Suma (signo=1) o resta (signo=-1) un ticket en los rollups de ventas.
+    Se ejecuta dentro de la transacción del checkout o de la cancelación.
+    """
+    dia, hora = _cubeta(ticket.created_at)
+
+    _acumular(db, SalesRollupHourly, [{
+        "day": dia,
+        "hour": hora,
+        "payment_method": ticket.payment_method,
+        "user_id": ticket.user_id,
+        "num_tickets": signo,
+        "total": signo * Decimal(ticket.total)
+    }])
+
+    # Un renglón por producto: el ticket cuenta como una orden de cada producto
+    lineas: dict[int, list[Decimal]] = {}
+    for item in items:
+        linea = lineas.setdefault(item.product_id, [Decimal('0'), Decimal('0')])
+        linea[0] += Decimal(item.quantity)
+        linea[1] += Decimal(item.subtotal)
+
+    _acumular(db, SalesRollupProductDaily, [
+        {
+            "day": dia,
+            "product_id": product_id,
+            "quantity": signo * cantidad,
+            "revenue": signo * importe,
+            "num_orders": signo
+        }
+        # Mismo orden de Id que el bloqueo de productos del checkout
+        for product_id, (cantidad, importe) in sorted(lineas.items())
+    ])
+
+def _cubeta(momento: datetime) -> tuple[date, int]:
+    """Día y hora del rollup al que pertenece un ticket"""
+    return momento.date(), momento.hour
+
+def _acumular(db: Session, modelo, filas: list[dict]):
+    """UPSERT que suma las medidas de cada fila a la existente con la misma llave"""
+    if not filas:
+        return
+
+    llaves = [c.name for c in modelo.__table__.primary_key.columns]
+    medidas = [k for k in filas[0] if k not in llaves]
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert_dialecto = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert_dialecto(modelo).values(filas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=llaves,
+            set_={m: getattr(modelo, m) + getattr(stmt.excluded, m) for m in medidas}
+        )
+        db.execute(stmt)
+        return
+
+    # Otros motores: bloquear cada fila y sumarle las medidas
+    for fila in filas:
+        existente = db.query(modelo).filter_by(
+            **{k: fila[k] for k in llaves}
+        ).with_for_update().first()
+        if existente is None:
+            db.add(modelo(**fila))
+        else:
+            for m in medidas:
+                setattr(existente, m, getattr(existente, m) + fila[m])
+    db.flush()
+
+# ------------------ Reconstrucción ------------------
+def reconstruir_rollups(db: Session, desde: date | None = None, hasta: date | None = None) -> dict:
+    """
+    Recalcula los rollups a partir de sale_tickets (backfill o corrección).
+    Reemplaza solo los días del rango; sin rango reconstruye todo el historial.
+    """
+    filtros_hora = _rango_dias(SalesRollupHourly.day, desde, hasta)
+    filtros_producto = _rango_dias(SalesRollupProductDaily.day, desde, hasta)
+    filtros_ticket = [SaleTicket.status == "completed"]
+    if desde:
+        filtros_ticket.append(SaleTicket.created_at >= datetime.combine(desde, time.min))
+    if hasta:
+        filtros_ticket.append(SaleTicket.created_at < datetime.combine(hasta + timedelta(days=1), time.min))
+
+    db.execute(delete(SalesRollupHourly).where(*filtros_hora))
+    db.execute(delete(SalesRollupProductDaily).where(*filtros_producto))
+
+    horas: dict[tuple, list] = {}
+    tickets = db.query(
+        SaleTicket.created_at, SaleTicket.payment_method, SaleTicket.user_id, SaleTicket.total
+    ).filter(*filtros_ticket)
+    for created_at, payment_method, user_id, total in tickets.yield_per(5000):
+        llave = (*_cubeta(created_at), payment_method, user_id)
+        acumulado = horas.setdefault(llave, [0, Decimal('0')])
+        acumulado[0] += 1
+        acumulado[1] += total
+
+    productos: dict[tuple, list] = {}
+    lineas = db.query(
+        SaleTicket.created_at,
+        SaleTicketItem.product_id,
+        func.sum(SaleTicketItem.quantity),
+        func.sum(SaleTicketItem.subtotal)
+    ).join(SaleTicket, SaleTicketItem.ticket_id == SaleTicket.id).filter(
+        *filtros_ticket
+    ).group_by(SaleTicket.id, SaleTicket.created_at, SaleTicketItem.product_id)
+    for created_at, product_id, cantidad, importe in lineas.yield_per(5000):
+        llave = (_cubeta(created_at)[0], product_id)
+        acumulado = productos.setdefault(llave, [Decimal('0'), Decimal('0'), 0])
+        acumulado[0] += Decimal(cantidad)
+        acumulado[1] += Decimal(importe)
+        acumulado[2] += 1
+
+    if horas:
+        db.execute(insert(SalesRollupHourly), [
+            {"day": d, "hour": h, "payment_method": m, "user_id": u, "num_tickets": n, "total": t}
+            for (d, h, m, u), (n, t) in horas.items()
+        ])
+    if productos:
+        db.execute(insert(SalesRollupProductDaily), [
+            {"day": d, "product_id": p, "quantity": q, "revenue": r, "num_orders": n}
+            for (d, p), (q, r, n) in productos.items()
+        ])
+    db.commit()
+
+    return {"hourly_rows": len(horas), "product_rows": len(productos)}
+
+def _rango_dias(columna, desde: date | None, hasta: date | None) -> list:
+    filtros = []
+    if desde:
+        filtros.append(columna >= desde)
+    if hasta:
+        filtros.append(columna <= hasta)
+    return filtros
@@ -1,23 +1,63 @@
 from decimal import Decimal
-from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from datetime import datetime, date
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import insert, update, case, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from fastapi import HTTPException
-from models import SaleTicket, SaleTicketItem, Cart, CartItem, Product, CashRegister
+from models import SaleTicket, SaleTicketItem, Cart, CartItem, Product, CashRegister, TicketSequence
 from schemas import CreateTicketRequest
+from app.repositories.cart_store import cart_store
+from app.repositories.catalog_cache import catalog_cache
+from app.repositories.inventory_counters import inventory_counters
+from app.core.pagination import paginate_keyset
+from app.core.time_window import within
+from crud_rollups import registrar_venta
+from app.core.response_cache import response_cache
+from app.core.metrics import metrics
+
+# Estrategias de carga: el cajero en el mismo SELECT, las líneas en un solo SELECT ... IN
+CON_CAJERO = (joinedload(SaleTicket.cashier),)
+CON_DETALLE = (joinedload(SaleTicket.cashier), selectinload(SaleTicket.items))
 
 def generar_numero_ticket(db: Session) -> str:
     """Genera un número único de ticket: TKT-YYYYMMDD-NNNN"""
-    today = datetime.utcnow().strftime("%Y%m%d")
-    
-    # Contar tickets del día
-    count = db.query(SaleTicket).filter(
-        func.date(SaleTicket.created_at) == datetime.utcnow().date()
-    ).count()
+    today = datetime.utcnow().date()
+    consecutivo = _siguiente_consecutivo(db, today)
     
-    numero = f"TKT-{today}-{count + 1:04d}"
+    numero = f"TKT-{today.strftime('%Y%m%d')}-{consecutivo:04d}"
     return numero
 
+def _siguiente_consecutivo(db: Session, dia: date) -> int:
+    """
+    Incrementa y regresa el consecutivo del día con un solo UPSERT atómico.
+    
+    La fila del día queda bloqueada hasta el commit de la venta, así que dos
+    checkouts concurrentes nunca obtienen el mismo número y un rollback no
+    deja huecos en la numeración.
+    """
+    dialect = db.get_bind().dialect.name
+    
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert(TicketSequence).values(day=dia, last_value=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TicketSequence.day],
+            set_={"last_value": TicketSequence.last_value + 1}
+        ).returning(TicketSequence.last_value)
+        return db.execute(stmt).scalar_one()
+    
+    # Otros motores: bloquear la fila del día y actualizarla
+    secuencia = db.query(TicketSequence).filter(
+        TicketSequence.day == dia
+    ).with_for_update().first()
+    if not secuencia:
+        secuencia = TicketSequence(day=dia, last_value=0)
+        db.add(secuencia)
+    secuencia.last_value += 1
+    db.flush()
+    return secuencia.last_value
+
 def crear_ticket(
     db: Session, 
     data: CreateTicketRequest, 
@@ -26,31 +66,54 @@ def crear_ticket(
 ) -> SaleTicket:
     """Crea un ticket de venta a partir de un carrito"""
     
+    # Items pendientes del almacén en memoria, en la misma transacción de la venta;
+    # hasta cerrar() o liberar() el carrito no acepta más escaneos
+    cart_store.escribir(db, data.cart_id)
+    try:
+        ticket_id, vendidos = _registrar_venta_del_carrito(db, data, user_id, cash_register_id)
+    except Exception:
+        db.rollback()
+        cart_store.liberar(data.cart_id)
+        raise
+    cart_store.cerrar(data.cart_id)
+    metrics.tickets_created.inc(payment_method=data.payment_method)
+    catalog_cache.discard(vendidos)
+    inventory_counters.mark_dirty(vendidos)
+    response_cache.invalidate("sales", "inventory")
+    
+    # Recargar con el detalle que usa la respuesta (en lugar de refresh + lazy loads)
+    return obtener_ticket(db, ticket_id)
+
+def _registrar_venta_del_carrito(
+    db: Session,
+    data: CreateTicketRequest,
+    user_id: int,
+    cash_register_id: int | None
+) -> tuple[int, list[int]]:
+    """Valida el carrito y confirma la venta; regresa (Id del ticket, productos vendidos)"""
+    
     # Validar carrito
-    cart = db.query(Cart).filter(Cart.id == data.cart_id).first()
+    cart = db.query(Cart).options(selectinload(Cart.items)).filter(Cart.id == data.cart_id).first()
     if not cart:
+        metrics.checkout_failures.inc(reason="cart_not_found")
         raise HTTPException(status_code=404, detail="Carrito no encontrado")
     
     if cart.status != "open":
+        metrics.checkout_failures.inc(reason="cart_closed")
         raise HTTPException(status_code=400, detail="El carrito ya fue procesado")
     
     if not cart.items:
+        metrics.checkout_failures.inc(reason="empty_cart")
         raise HTTPException(status_code=400, detail="El carrito está vacío")
     
-    # Validar stock disponible
-    for item in cart.items:
-        producto = db.query(Product).filter(Product.Id == item.product_id).first()
-        if not producto:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Producto {item.product_name} no encontrado"
-            )
-        
-        if producto.Stock < float(item.quantity):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Stock insuficiente para {item.product_name}. Disponible: {producto.Stock}"
-            )
+    # Cargar y bloquear todos los productos del carrito en una sola consulta
+    cantidades = _cantidades_por_producto(cart.items)
+    productos = _bloquear_productos(db, cantidades.keys())
+    
+    # Validar stock disponible (reporta todas las líneas con problema)
+    fallidas = _validar_stock(cart.items, productos, cantidades)
+    if fallidas:
+        _error_stock(fallidas)
     
     # Calcular totales
     subtotal = sum(item.subtotal for item in cart.items)
@@ -60,6 +123,7 @@ def crear_ticket(
     change_given = None
     if data.payment_method == "cash" and data.amount_paid:
         if data.amount_paid < total:
+            metrics.checkout_failures.inc(reason="insufficient_payment")
             raise HTTPException(
                 status_code=400,
                 detail=f"Monto insuficiente. Total: ${total}, Recibido: ${data.amount_paid}"
@@ -90,23 +154,32 @@ def crear_ticket(
     db.add(ticket)
     db.flush()  # Para obtener el ID del ticket
     
-    # Crear items del ticket (snapshot)
-    for cart_item in cart.items:
-        producto = db.query(Product).filter(Product.Id == cart_item.product_id).first()
-        
-        ticket_item = SaleTicketItem(
-            ticket_id=ticket.id,
-            product_id=cart_item.product_id,
-            product_code=producto.Code,
-            product_name=cart_item.product_name,
-            unit_price=cart_item.price,
-            quantity=cart_item.quantity,
-            subtotal=cart_item.subtotal
-        )
-        db.add(ticket_item)
-        
-        # Reducir stock
-        producto.Stock -= int(float(cart_item.quantity))
+    # Crear items del ticket (snapshot) en un solo INSERT por lotes
+    db.execute(insert(SaleTicketItem), [
+        {
+            "ticket_id": ticket.id,
+            "product_id": cart_item.product_id,
+            "product_code": productos[cart_item.product_id].Code,
+            "product_name": cart_item.product_name,
+            "unit_price": cart_item.price,
+            "quantity": cart_item.quantity,
+            "subtotal": cart_item.subtotal
+        }
+        for cart_item in cart.items
+    ])
+    
+    # Reducir stock en un solo UPDATE condicional
+    sin_stock = _descontar_stock(db, cantidades)
+    if sin_stock:
+        fallidas = [
+            _linea_fallida(item, None, cantidades, "insufficient_stock")
+            for item in cart.items if item.product_id in sin_stock
+        ]
+        db.rollback()
+        _error_stock(fallidas)
+    
+    # Rollups de ventas del dashboard, en la misma transacción
+    registrar_venta(db, ticket, cart.items)
     
     # Marcar carrito como completado
     cart.status = "completed"
@@ -116,21 +189,116 @@ def crear_ticket(
     if cash_register_id:
         actualizar_caja_con_venta(db, cash_register_id, total, data.payment_method)
     
+    ticket_id = ticket.id
     db.commit()
-    db.refresh(ticket)
+    return ticket_id, list(cantidades)
+
+def _cantidades_por_producto(items) -> dict[int, Decimal]:
+    """Agrupa las cantidades de los items por producto"""
+    cantidades: dict[int, Decimal] = {}
+    for item in items:
+        cantidades[item.product_id] = cantidades.get(item.product_id, Decimal('0')) + Decimal(item.quantity)
+    return cantidades
+
+def _bloquear_productos(db: Session, product_ids) -> dict[int, Product]:
+    """
+    Carga los productos con un solo IN (...) y los bloquea (FOR UPDATE)
+    en orden de Id, para que dos ventas concurrentes no se bloqueen mutuamente.
+    """
+    productos = (
+        db.query(Product)
+        .filter(Product.Id.in_(sorted(product_ids)))
+        .order_by(Product.Id)
+        .with_for_update()
+        .all()
+    )
+    return {p.Id: p for p in productos}
+
+def _linea_fallida(item, producto: Product | None, cantidades: dict, reason: str) -> dict:
+    """Describe una línea del carrito que no pudo venderse"""
+    return {
+        "cart_item_id": item.id,
+        "product_id": item.product_id,
+        "product_name": item.product_name,
+        "requested": float(cantidades[item.product_id]),
+        "available": float(producto.Stock) if producto is not None else None,
+        "reason": reason
+    }
+
+def _validar_stock(items, productos: dict[int, Product], cantidades: dict[int, Decimal]) -> list[dict]:
+    """Regresa las líneas del carrito sin producto o sin stock suficiente"""
+    fallidas = []
+    for item in items:
+        producto = productos.get(item.product_id)
+        if producto is None:
+            fallidas.append(_linea_fallida(item, None, cantidades, "not_found"))
+        elif producto.Stock < cantidades[item.product_id]:
+            fallidas.append(_linea_fallida(item, producto, cantidades, "insufficient_stock"))
+    return fallidas
+
+def _error_stock(fallidas: list[dict]):
+    """
+    Lanza el error de stock con el detalle de cada línea fallida.
+    El checkout cuenta una vez por cada motivo presente en sus líneas
+    (not_found, insufficient_stock).
+    """
+    for reason in sorted({linea["reason"] for linea in fallidas}):
+        metrics.checkout_failures.inc(reason=reason)
+    raise HTTPException(
+        status_code=400,
+        detail={
+            "message": "Stock insuficiente o producto no encontrado en "
+                       f"{len(fallidas)} línea(s) del carrito",
+            "failed_lines": fallidas
+        }
+    )
+
+def _descontar_stock(db: Session, cantidades: dict[int, Decimal]) -> set[int]:
+    """
+    Descuenta el stock de todos los productos con un solo
+    UPDATE ... WHERE Stock >= cantidad.
     
-    return ticket
+    Regresa los Id de los productos que no se pudieron descontar.
+    """
+    cantidad = case(cantidades, value=Product.Id)
+    stmt = (
+        update(Product)
+        .where(Product.Id.in_(cantidades.keys()), Product.Stock >= cantidad)
+        .values(Stock=Product.Stock - cantidad)
+        .execution_options(synchronize_session=False)
+    )
+    
+    if db.get_bind().dialect.update_returning:
+        actualizados = set(db.execute(stmt.returning(Product.Id)).scalars())
+        return set(cantidades) - actualizados
+    
+    # Sin RETURNING solo sabemos cuántas filas cambiaron
+    if db.execute(stmt).rowcount == len(cantidades):
+        return set()
+    return set(cantidades)
+
+def _reponer_stock(db: Session, cantidades: dict[int, Decimal]):
+    """Devuelve el stock de varios productos con un solo UPDATE"""
+    if not cantidades:
+        return
+    cantidad = case(cantidades, value=Product.Id)
+    db.execute(
+        update(Product)
+        .where(Product.Id.in_(cantidades.keys()))
+        .values(Stock=Product.Stock + cantidad)
+        .execution_options(synchronize_session=False)
+    )
 
 def obtener_ticket(db: Session, ticket_id: int) -> SaleTicket:
     """Obtiene un ticket por ID"""
-    ticket = db.query(SaleTicket).filter(SaleTicket.id == ticket_id).first()
+    ticket = db.query(SaleTicket).options(*CON_DETALLE).filter(SaleTicket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket no encontrado")
     return ticket
 
 def obtener_ticket_por_numero(db: Session, ticket_number: str) -> SaleTicket:
     """Obtiene un ticket por número"""
-    ticket = db.query(SaleTicket).filter(
+    ticket = db.query(SaleTicket).options(*CON_DETALLE).filter(
         SaleTicket.ticket_number == ticket_number
     ).first()
     if not ticket:
@@ -144,7 +312,9 @@ def cancelar_ticket(
     user_id: int
 ) -> SaleTicket:
     """Cancela un ticket y devuelve el stock"""
-    ticket = db.query(SaleTicket).filter(SaleTicket.id == ticket_id).first()
+    ticket = db.query(SaleTicket).options(selectinload(SaleTicket.items)).filter(
+        SaleTicket.id == ticket_id
+    ).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket no encontrado")
     
@@ -152,15 +322,16 @@ def cancelar_ticket(
         raise HTTPException(status_code=400, detail="El ticket ya está cancelado")
     
     # Devolver stock
-    for item in ticket.items:
-        producto = db.query(Product).filter(Product.Id == item.product_id).first()
-        if producto:
-            producto.Stock += int(float(item.quantity))
+    cantidades = _cantidades_por_producto(ticket.items)
+    _reponer_stock(db, cantidades)
     
     # Actualizar caja registradora si existe
     if ticket.cash_register_id:
         revertir_venta_en_caja(db, ticket.cash_register_id, ticket.total, ticket.payment_method)
     
+    # Quitar la venta de los rollups (en la hora en que se registró)
+    registrar_venta(db, ticket, ticket.items, signo=-1)
+    
     # Marcar como cancelado
     ticket.status = "cancelled"
     ticket.cancelled_at = datetime.utcnow()
@@ -169,6 +340,9 @@ def cancelar_ticket(
     
     db.commit()
     db.refresh(ticket)
+    catalog_cache.discard(cantidades.keys())
+    inventory_counters.mark_dirty(cantidades.keys())
+    response_cache.invalidate("sales", "inventory")
     
     return ticket
 
@@ -181,8 +355,50 @@ def listar_tickets(
     fecha_hasta: datetime | None = None
 ):
     """Lista tickets con filtros opcionales"""
-    query = db.query(SaleTicket)
+    query = _filtrar_tickets(db.query(SaleTicket).options(*CON_CAJERO), status, fecha_desde, fecha_hasta)
+    return query.order_by(SaleTicket.created_at.desc()).offset(skip).limit(limit).all()
+
+def listar_tickets_por_cursor(
+    db: Session,
+    cursor: str | None = None,
+    limit: int = 50,
+    status: str | None = None,
+    fecha_desde: datetime | None = None,
+    fecha_hasta: datetime | None = None,
+    ventana: tuple[datetime, datetime] | None = None
+) -> tuple[list[SaleTicket], str | None]:
+    """Lista tickets por cursor (created_at, id); regresa (tickets, next_cursor)"""
+    query = _filtrar_tickets(db.query(SaleTicket).options(*CON_CAJERO), status, fecha_desde, fecha_hasta)
+    if ventana:
+        query = query.filter(within(SaleTicket.created_at, ventana))
+    return paginate_keyset(query, [SaleTicket.created_at, SaleTicket.id], cursor, limit)
+
+def resumen_tickets(db: Session, ventana: tuple[datetime, datetime]) -> dict:
+    """Totales de tickets en la ventana con un GROUP BY status, payment_method"""
+    filas = db.query(
+        SaleTicket.status,
+        SaleTicket.payment_method,
+        func.count(SaleTicket.id),
+        func.sum(SaleTicket.total)
+    ).filter(
+        within(SaleTicket.created_at, ventana)
+    ).group_by(SaleTicket.status, SaleTicket.payment_method).all()
     
+    resumen = {"total_tickets": 0, "completados": 0, "cancelados": 0,
+               "total_ventas": Decimal('0'), "por_metodo": {}}
+    for status, metodo, cantidad, total in filas:
+        resumen["total_tickets"] += cantidad
+        if status == "completed":
+            resumen["completados"] += cantidad
+            resumen["total_ventas"] += total
+            resumen["por_metodo"][metodo] = float(total)
+        elif status == "cancelled":
+            resumen["cancelados"] += cantidad
+    resumen["total_ventas"] = float(resumen["total_ventas"])
+    return resumen
+
+def _filtrar_tickets(query, status, fecha_desde, fecha_hasta):
+    """Aplica los filtros comunes de listado de tickets"""
     if status:
         query = query.filter(SaleTicket.status == status)
     
@@ -192,7 +408,7 @@ def listar_tickets(
     if fecha_hasta:
         query = query.filter(SaleTicket.created_at <= fecha_hasta)
     
-    return query.order_by(SaleTicket.created_at.desc()).offset(skip).limit(limit).all()
+    return query
 
 def actualizar_caja_con_venta(
     db: Session,
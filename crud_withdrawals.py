@@ -1,10 +1,15 @@
 from decimal import Decimal
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException
 from models import CashWithdrawal, CashRegister
 from schemas import CreateWithdrawalRequest
+from app.core.pagination import paginate_keyset
+from app.core.time_window import day_window, within
+from app.core.metrics import metrics
+
+# Todas las lecturas de retiros muestran el nombre del usuario: cargarlo en el mismo SELECT
+CON_USUARIO = (joinedload(CashWithdrawal.user),)
 
 def crear_retiro(
     db: Session,
@@ -56,13 +61,16 @@ def crear_retiro(
     
     db.commit()
     db.refresh(retiro)
+    metrics.withdrawals.inc(reason=data.reason)
     
     return retiro
 
 
 def obtener_retiro(db: Session, withdrawal_id: int) -> CashWithdrawal:
     """Obtiene un retiro por ID"""
-    retiro = db.query(CashWithdrawal).filter(CashWithdrawal.id == withdrawal_id).first()
+    retiro = db.query(CashWithdrawal).options(*CON_USUARIO).filter(
+        CashWithdrawal.id == withdrawal_id
+    ).first()
     if not retiro:
         raise HTTPException(status_code=404, detail="Retiro no encontrado")
     return retiro
@@ -77,6 +85,7 @@ def listar_retiros_de_caja(
     """Lista todos los retiros de una caja específica"""
     return (
         db.query(CashWithdrawal)
+        .options(*CON_USUARIO)
         .filter(CashWithdrawal.cash_register_id == cash_register_id)
         .order_by(CashWithdrawal.created_at.desc())
         .offset(skip)
@@ -85,19 +94,30 @@ def listar_retiros_de_caja(
     )
 
 
+def listar_retiros_de_caja_por_cursor(
+    db: Session,
+    cash_register_id: int,
+    cursor: str | None = None,
+    limit: int = 50
+) -> tuple[list[CashWithdrawal], str | None]:
+    """Lista los retiros de una caja por cursor (created_at, id); regresa (retiros, next_cursor)"""
+    query = db.query(CashWithdrawal).options(*CON_USUARIO).filter(
+        CashWithdrawal.cash_register_id == cash_register_id
+    )
+    return paginate_keyset(query, [CashWithdrawal.created_at, CashWithdrawal.id], cursor, limit)
+
+
 def listar_retiros_del_dia(
     db: Session,
     fecha: datetime | None = None,
     skip: int = 0,
     limit: int = 100
 ) -> list[CashWithdrawal]:
-    """Lista todos los retiros del día"""
-    if not fecha:
-        fecha = datetime.utcnow().date()
-    
+    """Lista todos los retiros del día (día de negocio en la zona de la tienda)"""
     return (
         db.query(CashWithdrawal)
-        .filter(func.date(CashWithdrawal.created_at) == fecha)
+        .options(*CON_USUARIO)
+        .filter(within(CashWithdrawal.created_at, day_window(fecha)))
         .order_by(CashWithdrawal.created_at.desc())
         .offset(skip)
         .limit(limit)
@@ -150,7 +170,7 @@ def verificar_limite_efectivo(db: Session, cash_register_id: int) -> dict:
 
 def obtener_resumen_retiros(db: Session, cash_register_id: int) -> dict:
     """Obtiene un resumen de todos los retiros de una caja"""
-    retiros = db.query(CashWithdrawal).filter(
+    retiros = db.query(CashWithdrawal).options(*CON_USUARIO).filter(
         CashWithdrawal.cash_register_id == cash_register_id
     ).all()
     
@@ -1,20 +1,98 @@
-from sqlalchemy import create_engine
+from functools import lru_cache
+from sqlalchemy import create_engine, BigInteger, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import IntegrityError
 from dotenv import load_dotenv
 load_dotenv()
 import os
+from app.core.config import get_database_settings
+from app.core.metrics import metrics
+from app.core import query_stats
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Drivers async equivalentes a los síncronos
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def to_async_url(url: str) -> str:
+    """postgresql(+psycopg2):// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://"""
+    url_obj = make_url(url)
+    return url_obj.set(drivername=ASYNC_DRIVERS.get(url_obj.get_backend_name(), url_obj.drivername)).render_as_string(
+        hide_password=False
+    )
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+def _opciones_pool(url: str, pool_size: int | None = None) -> dict:
+    """Opciones de create_engine según DatabaseSettings (variables DB_*)"""
+    config = get_database_settings()
+    url_obj = make_url(url)
+    opciones = {
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "pool_recycle": config.DB_POOL_RECYCLE
+    }
+    
+    # SQLite en memoria usa un pool de una conexión por hilo, sin tamaño
+    if not (url_obj.get_backend_name() == "sqlite" and url_obj.database in (None, "", ":memory:")):
+        opciones.update(
+            pool_size=pool_size or config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT
+        )
+    
+    if config.DB_STATEMENT_TIMEOUT_MS and url_obj.get_backend_name() == "postgresql":
+        if url_obj.get_driver_name() == "asyncpg":
+            opciones["connect_args"] = {"server_settings": {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            opciones["connect_args"] = {"options": f"-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}"}
+    
+    return opciones
+
+def create_db_engine(url: str, pool_size: int | None = None):
+    """Engine con el pool configurado en DatabaseSettings (variables DB_*)"""
+    return create_engine(url, **_opciones_pool(url, pool_size))
+
+engine = create_db_engine(DATABASE_URL)
+metrics.instrument_engine(engine, get_database_settings().DB_POOL_SLOW_CHECKOUT_MS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# SQLite solo autoincrementa llaves primarias declaradas como INTEGER
+# (necesario para correr pruebas y benchmarks sin Postgres)
+@compiles(BigInteger, "sqlite")
+def _bigint_sqlite(type_, compiler, **kw):
+    return "INTEGER"
+
+# ------------------ Engine async ------------------
+# Se crea al primer uso: importar la app no requiere asyncpg / aiosqlite
+@lru_cache()
+def get_async_engine():
+    """
+    Engine async (asyncpg en Postgres, aiosqlite en SQLite) con el mismo pool.
+    Los eventos viven en su sync_engine: ahí se instrumentan las métricas del
+    pool y el conteo de SQL por request, igual que en el engine síncrono.
+    """
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_opciones_pool(ASYNC_DATABASE_URL))
+    query_stats.install(async_engine.sync_engine)
+    metrics.instrument_engine(
+        async_engine.sync_engine, get_database_settings().DB_POOL_SLOW_CHECKOUT_MS, pool_name="async"
+    )
+    return async_engine
+
+@lru_cache()
+def get_async_session_factory() -> async_sessionmaker:
+    return async_sessionmaker(get_async_engine(), class_=AsyncSession, autoflush=False)
+
 # ------------------ Dependencia DB ------------------
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
@@ -1,9 +1,10 @@
 import schemas
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine
+from database import engine, SessionLocal
 from models import Base
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 
 # Importar routers
@@ -14,15 +15,31 @@ from routes.prices import router as price_router
 from routes.tickets import router as tickets_router
 from routes.cash_register import router as cash_register_router
 from routes.withdrawals import router as withdrawals_router
+from app.routes.dashboard import router as dashboard_router
 from app.core.exceptions import AppException
+from app.core import query_stats
+from app.core.metrics import metrics, metrics_middleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.repositories.cart_store import cart_store
+from app.services.cart_sweeper import cart_sweeper
 
 # Crear tablas
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Carritos en memoria (CART_STORE=memory): recuperar el journal y volcar periódicamente
+    cart_store.start(SessionLocal)
+    # Cancelar carritos abiertos abandonados (CART_SWEEP_INTERVAL_SECONDS=0 lo desactiva)
+    cart_sweeper.start(SessionLocal)
+    yield
+    cart_sweeper.stop()
+    cart_store.stop()
+
 app = FastAPI(
     title="API POS Sistema Completo",
     description="Sistema de Punto de Venta con autenticación, tickets y caja registradora",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan
 )
 
 origins = [
@@ -31,6 +48,13 @@ origins = [
     # y luego el dominio real cuando lo tengan
 ]
 
+# Estadísticas de SQL por request (log estructurado y headers X-DB-* en debug)
+query_stats.install(engine)
+app.middleware("http")(query_stats.query_stats_middleware)
+
+# Métricas en formato Prometheus (/metrics); el pool se instrumenta en database.py
+app.middleware("http")(metrics_middleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -48,6 +72,7 @@ app.include_router(price_router)
 app.include_router(tickets_router)
 app.include_router(cash_register_router)
 app.include_router(withdrawals_router)
+app.include_router(dashboard_router)
 
 @app.exception_handler(AppException)
 async def app_exception_handler(request: Request, exc: AppException):
@@ -79,4 +104,9 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "version": "3.0.0"}
\ No newline at end of file
+    return {"status": "healthy", "version": "3.0.0"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Métricas del proceso en formato de texto de Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
\ No newline at end of file
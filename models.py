@@ -1,5 +1,5 @@
 from decimal import Decimal
-from sqlalchemy import Column, Integer, String, NUMERIC, ForeignKey, BigInteger, Text, Index, DateTime
+from sqlalchemy import Column, Integer, String, NUMERIC, ForeignKey, BigInteger, Text, Index, DateTime, Date
 from datetime import datetime
 from database import Base
 from sqlalchemy.orm import relationship
@@ -43,8 +43,16 @@ class Cart(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) # Actualización general
     completed_at = Column(DateTime, nullable=True)
     cancelled_at = Column(DateTime, nullable=True)
+    # Desnormalizados: suma de subtotales y número de renglones, por deltas en crud
+    total = Column(NUMERIC(12, 2), nullable=False, default=0, server_default="0")
+    item_count = Column(Integer, nullable=False, default=0, server_default="0")
     items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan")
     user = relationship("Users", foreign_keys=[user_id])
+    
+    __table_args__ = (
+        # Barrido de carritos abiertos abandonados (status = 'open' AND updated_at < :limite)
+        Index('idx_cart_status_updated', 'status', 'updated_at'),
+    )
 
 
 class CartItem(Base):
@@ -62,6 +70,20 @@ class CartItem(Base):
     product = relationship("Product")
 
 
+class CartItemArchive(Base):
+    """Items de carritos abandonados que el barrido sacó de cart_items"""
+    __tablename__ = "cart_items_archive"
+
+    id = Column(BigInteger, primary_key=True)  # Id original en cart_items
+    cart_id = Column(BigInteger, nullable=False, index=True)
+    product_id = Column(BigInteger, nullable=False)
+    product_name = Column(Text, nullable=False)
+    price = Column(NUMERIC(10, 2), nullable=False)
+    quantity = Column(NUMERIC(10, 4), nullable=False)
+    subtotal = Column(NUMERIC(10, 2), nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
 class PriceHistory(Base):
     __tablename__ = "price_history"
 
@@ -191,4 +213,35 @@ class SaleTicketItem(Base):
     unit_price = Column(NUMERIC(10, 2), nullable=False)
     quantity = Column(NUMERIC(10, 4), nullable=False)
     subtotal = Column(NUMERIC(10, 2), nullable=False)
-    ticket = relationship("SaleTicket", back_populates="items")
\ No newline at end of file
+    ticket = relationship("SaleTicket", back_populates="items")
+
+
+class TicketSequence(Base):
+    """Consecutivo diario para los números de ticket (TKT-YYYYMMDD-NNNN)"""
+    __tablename__ = "ticket_sequences"
+
+    day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+
+
+class SalesRollupHourly(Base):
+    """Ventas completadas por hora, método de pago y cajero (pre-agregadas)"""
+    __tablename__ = "sales_rollup_hourly"
+
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    payment_method = Column(String, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    num_tickets = Column(Integer, nullable=False, default=0)
+    total = Column(NUMERIC(14, 2), nullable=False, default=Decimal('0.00'))
+
+
+class SalesRollupProductDaily(Base):
+    """Ventas completadas por día y producto (pre-agregadas)"""
+    __tablename__ = "sales_rollup_product_daily"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(BigInteger, primary_key=True, index=True)
+    quantity = Column(NUMERIC(14, 4), nullable=False, default=Decimal('0'))
+    revenue = Column(NUMERIC(14, 2), nullable=False, default=Decimal('0.00'))
+    num_orders = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,36 @@
+"""
+Reconstruye los rollups de ventas del dashboard a partir de sale_tickets.
+
+Usar para backfills (después de la migración, al importar historial) o para
+corregir los rollups de un rango. Conviene correrlo fuera del horario de venta:
+los días del rango se borran y se recalculan en una sola transacción.
+
+    python rebuild_sales_rollups.py
+    python rebuild_sales_rollups.py --desde 2026-01-01 --hasta 2026-01-31
+"""
+import argparse
+from datetime import date
+
+from database import SessionLocal
+import crud_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir rollups de ventas")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Primer día (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Último día (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        resultado = crud_rollups.reconstruir_rollups(db, args.desde, args.hasta)
+    finally:
+        db.close()
+
+    rango = f"{args.desde or 'inicio'} a {args.hasta or 'hoy'}"
+    print(f"✓ Rollups reconstruidos ({rango}): "
+          f"{resultado['hourly_rows']} filas por hora, {resultado['product_rows']} filas por producto")
+
+
+if __name__ == "__main__":
+    main()
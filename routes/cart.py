@@ -3,17 +3,19 @@ from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime
 from database import get_db
-from schemas import CartSchema, CartItemSchema, AddItemRequest
-from crud import crear_carrito, obtener_carrito, buscar_producto, agregar_item
+from schemas import CartSchema, CartItemSchema, AddItemRequest, AddItemsBatchRequest, AddItemsBatchResponse
+from crud import crear_carrito, obtener_carrito, buscar_producto, agregar_item, agregar_items_en_lote
 from models import Product, Cart
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-from schemas import CartSchema, CartUpdateStatus, CartUpdateQuantity
+from schemas import CartSchema, CartPagina, CartUpdateStatus, CartUpdateQuantity
 from crud import (
     eliminar_item_carrito, vaciar_carrito, cambiar_estado_carrito,
-    actualizar_cantidad_item, calcular_total_carrito, buscar_carritos_avanzado
+    actualizar_cantidad_item, calcular_total_carrito, buscar_carritos_avanzado,
+    verificar_totales_carritos
 )
+from app.core.security import require_admin
 
 
 router = APIRouter(prefix="/api/pos/carts", tags=["Carts"])
@@ -30,7 +32,13 @@ def agregar_item_endpoint(cart_id: int, data: AddItemRequest, db: Session = Depe
     if not cart or cart.status != "open":
         raise HTTPException(status_code=404, detail="Carrito no disponible")
 
-    product = buscar_producto(db, product_id=data.product_id, code=data.code, barcode=data.barcode)
+    product = buscar_producto(
+        db,
+        product_id=data.product_id,
+        code=data.code,
+        barcode=data.barcode,
+        mode=data.lookup_mode
+    )
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
@@ -40,14 +48,57 @@ def agregar_item_endpoint(cart_id: int, data: AddItemRequest, db: Session = Depe
     item = agregar_item(db, cart_id, product, data.quantity)
     return CartItemSchema.from_orm(item)
 
+# Agregar una canasta completa de escaneos en una sola transacción
+@router.post("/{cart_id}/items/lote", response_model=AddItemsBatchResponse)
+def agregar_items_lote_endpoint(cart_id: int, data: AddItemsBatchRequest, db: Session = Depends(get_db)):
+    resultados, total = agregar_items_en_lote(db, cart_id, data.items)
+    return {"cart_id": cart_id, "results": resultados, "total": total}
+
+# Búsqueda de carritos (antes de /{cart_id} para no quedar oculta)
+@router.get("/search", response_model=CartPagina)
+def buscar_carritos(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    status: Optional[str] = None,
+    product_name: Optional[str] = Query(None, description="Nombre del item vendido"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    limit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Busca carritos por rango de fecha, estado, monto mínimo o producto contenido.
+    Del más reciente al más antiguo, por páginas (`{"items", "next_cursor"}`).
+    """
+    carritos, next_cursor = buscar_carritos_avanzado(
+        db, 
+        fecha_inicio=start_date, 
+        fecha_fin=end_date, 
+        min_total=min_amount, 
+        status=status,
+        item_name=product_name,
+        cursor=cursor,
+        limit=limit
+    )
+    return CartPagina(items=carritos, next_cursor=next_cursor)
+
+# Integridad de los totales desnormalizados (antes de /{cart_id} para no quedar ocultas)
+@router.get("/integridad", dependencies=[Depends(require_admin)])
+def verificar_totales(db: Session = Depends(get_db)):
+    diferencias = verificar_totales_carritos(db)
+    return {"Diferencias": len(diferencias), "Carritos": diferencias}
+
+@router.post("/integridad/corregir", dependencies=[Depends(require_admin)])
+def corregir_totales(db: Session = Depends(get_db)):
+    diferencias = verificar_totales_carritos(db, corregir=True)
+    return {"Corregidos": len(diferencias), "Carritos": diferencias}
+
 @router.get("/{cart_id}", response_model=CartSchema)
 def obtener_carrito_endpoint(cart_id: int, db: Session = Depends(get_db)):
     cart = obtener_carrito(db, cart_id)
     if not cart:
         raise HTTPException(status_code=404, detail="Carrito no encontrado")
-    total = sum(i.subtotal for i in cart.items)
-    cart_schema = CartSchema.from_orm(cart)
-    return cart_schema.model_dump() | {"total": total}
+    return CartSchema.from_orm(cart)
 
 # Eliminar producto del carrito
 @router.delete("/{cart_id}/items/{item_id}")
@@ -90,31 +141,3 @@ def actualizar_cantidad(cart_id: int, item_id: int, data: CartUpdateQuantity, db
 def total_carrito(cart_id: int, db: Session = Depends(get_db)):
     total = calcular_total_carrito(db, cart_id)
     return {"Cart_Id": cart_id, "Total": total}
-
-#Nuevo Endpoint de Búsqueda
-@router.get("/search", response_model=List[CartSchema])
-def buscar_carritos(
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
-    min_amount: Optional[float] = None,
-    status: Optional[str] = None,
-    product_name: Optional[str] = Query(None, description="Nombre del item vendido"),
-    db: Session = Depends(get_db)
-):
-    """
-    Busca carritos por rango de fecha, estado, monto mínimo o producto contenido.
-    """
-    carritos = buscar_carritos_avanzado(
-        db, 
-        fecha_inicio=start_date, 
-        fecha_fin=end_date, 
-        min_total=min_amount, 
-        status=status,
-        item_name=product_name
-    )
-    
-    if not carritos:
-        return []
-        
-    # Convertir a esquema (o usar lista directa si Pydantic lo maneja)
-    return carritos
\ No newline at end of file
@@ -10,6 +10,7 @@ from schemas import (
     CashRegisterSummary
 )
 import crud_cash_register
+from app.core.response_cache import cached_response
 from datetime import datetime
 
 router = APIRouter(prefix="/cash-register", tags=["Caja Registradora"])
@@ -137,6 +138,8 @@ def list_cash_registers(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status: str | None = Query(None, regex="^(open|closed)$"),
+    paginacion: str = Query("offset", regex="^(offset|cursor)$"),
+    cursor: str | None = Query(None),
     db: Session = Depends(get_db),
     current_user: Users = Depends(get_current_user)
 ):
@@ -144,12 +147,27 @@ def list_cash_registers(
     Lista cajas registradoras con filtros opcionales.
     
     - **status**: open, closed
+    - **paginacion**: offset (lista) o cursor (`{"items", "next_cursor"}`)
+    - **cursor**: `next_cursor` de la página anterior (solo con paginacion=cursor)
     - Manager y admin pueden ver todas las cajas
     - Cajeros solo ven sus propias cajas
     """
     # Si no es admin/manager, solo mostrar sus cajas
     user_filter = None if current_user.Role in ["admin", "manager"] else current_user.ID
     
+    if paginacion == "cursor":
+        cajas, next_cursor = crud_cash_register.listar_cajas_por_cursor(
+            db,
+            cursor=cursor,
+            limit=limit,
+            status=status,
+            user_id=user_filter
+        )
+        return {
+            "items": [_resumen_caja(c) for c in cajas],
+            "next_cursor": next_cursor
+        }
+    
     cajas = crud_cash_register.listar_cajas(
         db,
         skip=skip,
@@ -158,25 +176,27 @@ def list_cash_registers(
         user_id=user_filter
     )
     
-    return [
-        CashRegisterSummary(
-            register_id=c.id,
-            cashier=c.user.Username,
-            opened_at=c.opened_at,
-            closed_at=c.closed_at,
-            status=c.status,
-            total_sales=c.total_sales,
-            total_cash=c.total_cash,
-            total_card=c.total_card,
-            total_transfer=c.total_transfer,
-            num_transactions=c.num_transactions,
-            difference=c.difference
-        )
-        for c in cajas
-    ]
+    return [_resumen_caja(c) for c in cajas]
+
+def _resumen_caja(c) -> CashRegisterSummary:
+    """Formato de una caja en los listados"""
+    return CashRegisterSummary(
+        register_id=c.id,
+        cashier=c.user.Username,
+        opened_at=c.opened_at,
+        closed_at=c.closed_at,
+        status=c.status,
+        total_sales=c.total_sales,
+        total_cash=c.total_cash,
+        total_card=c.total_card,
+        total_transfer=c.total_transfer,
+        num_transactions=c.num_transactions,
+        difference=c.difference
+    )
 
 # ==================== REPORTE DEL DÍA ====================
 @router.get("/reports/today", dependencies=[Depends(require_manager)])
+@cached_response("cash_register.report_today", tags=("sales", "cash_register"))
 def sales_report_today(
     db: Session = Depends(get_db),
     current_user: Users = Depends(get_current_user)
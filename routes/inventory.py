@@ -2,7 +2,10 @@
 Rutas de inventario usando el patrón Service Layer.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import io
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -10,10 +13,12 @@ from typing import List
 from database import get_db
 
 # Importar schemas de Pydantic
-from schemas import ProductoSchema, ProductoCreate, ProductoUpdate
+from schemas import ProductoSchema, ProductoCreate, ProductoUpdate, ProductoPagina
 
 # Importar el service
 from app.services.product_service import ProductService
+from app.services.product_import import iter_import_rows
+from app.repositories.catalog_cache import catalog_cache
 
 # Importar excepciones
 from app.core.exceptions import (
@@ -47,6 +52,27 @@ def obtener_inventario(
         raise HTTPException(status_code=e.status_code, detail=e.message)
 
 
+# ==================== LISTAR PRODUCTOS POR CURSOR ====================
+@router.get("/pagina", response_model=ProductoPagina)
+def obtener_inventario_por_cursor(
+    cursor: str | None = Query(None, description="Cursor de la página anterior"),
+    limit: int = Query(100, ge=1, le=500, description="Máximo de registros"),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene los productos activos por cursor (orden por Id).
+    
+    - **cursor**: `next_cursor` de la respuesta anterior (vacío para la primera página)
+    - **limit**: Máximo de registros a retornar (máx: 500)
+    """
+    try:
+        service = ProductService(db)
+        productos, next_cursor = service.get_products_page(cursor=cursor, limit=limit)
+        return ProductoPagina(items=productos, next_cursor=next_cursor)
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
 # ==================== BUSCAR PRODUCTOS ====================
 @router.get("/buscar", response_model=List[ProductoSchema])
 def buscar_productos(
@@ -114,6 +140,47 @@ def crear_producto(
         raise HTTPException(status_code=e.status_code, detail=e.message)
 
 
+# ==================== IMPORTAR PRODUCTOS ====================
+@router.post("/importar")
+async def importar_productos(
+    request: Request,
+    formato: str | None = Query(None, regex="^(csv|ndjson)$", description="csv o ndjson (por defecto según Content-Type)"),
+    actualizar_existentes: bool = Query(True, description="Actualizar productos con código existente"),
+    db: Session = Depends(get_db)
+):
+    """
+    Importa un catálogo completo enviado como cuerpo de la petición.
+    
+    - **Content-Type**: text/csv o application/x-ndjson
+    - Columnas / llaves: Code, Barcode, Product, Category, Units, Price, Stock, Min_Stock
+    - Regresa contadores y los errores por línea
+    """
+    if formato is None:
+        formato = "ndjson" if "ndjson" in request.headers.get("content-type", "") else "csv"
+    
+    # El cuerpo se recibe por partes; pasa a disco si supera 5 MB
+    with tempfile.SpooledTemporaryFile(max_size=5 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        
+        def importar():
+            stream = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+            try:
+                service = ProductService(db)
+                return service.import_products(
+                    iter_import_rows(stream, formato),
+                    update_existing=actualizar_existentes
+                )
+            finally:
+                stream.detach()
+        
+        try:
+            return await run_in_threadpool(importar)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="El archivo debe estar en UTF-8")
+
+
 # ==================== ACTUALIZAR PRODUCTO ====================
 @router.patch("/{product_id}", response_model=ProductoSchema)
 def actualizar_producto(
@@ -214,4 +281,18 @@ def resumen_inventario(db: Session = Depends(get_db)):
         resumen = service.get_inventory_summary()
         return resumen
     except AppException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
\ No newline at end of file
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
+# ==================== ESTADÍSTICAS DEL CACHÉ ====================
+@router.get("/cache/estadisticas")
+def estadisticas_cache():
+    """
+    Aciertos y fallos del caché del catálogo en este proceso.
+    
+    **Incluye:**
+    - Versión actual del catálogo
+    - Entradas en memoria
+    - Hits, misses y porcentaje de aciertos
+    """
+    return catalog_cache.stats()
\ No newline at end of file
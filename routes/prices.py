@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Product
 from schemas import (
     PrecioUpdate, PrecioBulkRequest, ProductoPrecioSchema, PriceHistorySchema
 )
-from crud import actualizar_precio, actualizar_precios_en_lote, obtener_historial_precios
+from crud import (
+    actualizar_precio, actualizar_precios_en_lote, obtener_historial_precios,
+    exportar_productos, exportar_historial_precios
+)
 
 router = APIRouter(prefix="/api/precios", tags=["Precios"])
 
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _respuesta_exportacion(contenido, formato: str, nombre: str) -> StreamingResponse:
+    return StreamingResponse(
+        contenido,
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
+
 # Listar productos con precio (para pantalla)
 @router.get("", response_model=list[ProductoPrecioSchema])
 def listar_precios(db: Session = Depends(get_db)):
@@ -20,6 +34,23 @@ def listar_precios(db: Session = Depends(get_db)):
     )
     return productos
 
+# Exportar catálogo (streaming, declarada antes de /{product_id})
+@router.get("/exportar")
+def exportar_catalogo(
+    formato: str = Query("csv", regex="^(csv|ndjson)$"),
+    db: Session = Depends(get_db)
+):
+    return _respuesta_exportacion(exportar_productos(db, formato), formato, "catalogo")
+
+# Exportar historial de precios (streaming)
+@router.get("/historial/exportar")
+def exportar_historial(
+    formato: str = Query("csv", regex="^(csv|ndjson)$"),
+    desde: datetime | None = Query(None, description="Solo cambios a partir de esta fecha"),
+    db: Session = Depends(get_db)
+):
+    return _respuesta_exportacion(exportar_historial_precios(db, formato, desde), formato, "historial_precios")
+
 # Obtener precio de un producto
 @router.get("/{product_id}", response_model=ProductoPrecioSchema)
 def obtener_precio(product_id: int, db: Session = Depends(get_db)):
@@ -42,7 +73,7 @@ def cambiar_precio(product_id: int, data: PrecioUpdate, db: Session = Depends(ge
 # Actualizar precios en lote
 @router.post("/lote")
 def cambiar_precios_lote(req: PrecioBulkRequest, db: Session = Depends(get_db)):
-    items = [i.model_dump(by_alias=True) for i in req.Items]
+    items = [i.model_dump(by_alias=True) for i in req.items]
     resultados = actualizar_precios_en_lote(db, items)
     return {"Resultados": resultados}
 
@@ -12,6 +12,7 @@ from schemas import (
 import crud_tickets
 import crud_cash_register
 from datetime import datetime
+from app.core.time_window import business_today, day_window
 
 router = APIRouter(prefix="/tickets", tags=["Tickets de Venta"])
 
@@ -42,7 +43,10 @@ def create_ticket(
         cash_register_id
     )
     
-    # Preparar respuesta
+    return respuesta_ticket(ticket)
+
+def respuesta_ticket(ticket) -> SaleTicketSchema:
+    """Ticket con sus líneas en el formato de respuesta (impresión/visualización)"""
     items_schema = [
         SaleTicketItemSchema(
             product_code=item.product_code,
@@ -81,33 +85,7 @@ def get_ticket(
     """Obtiene un ticket por ID (para impresión/visualización)"""
     ticket = crud_tickets.obtener_ticket(db, ticket_id)
     
-    items_schema = [
-        SaleTicketItemSchema(
-            product_code=item.product_code,
-            product_name=item.product_name,
-            unit_price=item.unit_price,
-            quantity=item.quantity,
-            subtotal=item.subtotal
-        )
-        for item in ticket.items
-    ]
-    
-    return SaleTicketSchema(
-        id=ticket.id,
-        ticket_number=ticket.ticket_number,
-        subtotal=ticket.subtotal,
-        tax=ticket.tax,
-        discount=ticket.discount,
-        total=ticket.total,
-        payment_method=ticket.payment_method,
-        payment_reference=ticket.payment_reference,
-        amount_paid=ticket.amount_paid,
-        change_given=ticket.change_given,
-        status=ticket.status,
-        created_at=ticket.created_at,
-        cashier_name=ticket.cashier.Username,
-        items=items_schema
-    )
+    return respuesta_ticket(ticket)
 
 # ==================== OBTENER POR NÚMERO ====================
 @router.get("/number/{ticket_number}", response_model=SaleTicketSchema)
@@ -119,33 +97,7 @@ def get_ticket_by_number(
     """Obtiene un ticket por número (ej: TKT-20231207-0001)"""
     ticket = crud_tickets.obtener_ticket_por_numero(db, ticket_number)
     
-    items_schema = [
-        SaleTicketItemSchema(
-            product_code=item.product_code,
-            product_name=item.product_name,
-            unit_price=item.unit_price,
-            quantity=item.quantity,
-            subtotal=item.subtotal
-        )
-        for item in ticket.items
-    ]
-    
-    return SaleTicketSchema(
-        id=ticket.id,
-        ticket_number=ticket.ticket_number,
-        subtotal=ticket.subtotal,
-        tax=ticket.tax,
-        discount=ticket.discount,
-        total=ticket.total,
-        payment_method=ticket.payment_method,
-        payment_reference=ticket.payment_reference,
-        amount_paid=ticket.amount_paid,
-        change_given=ticket.change_given,
-        status=ticket.status,
-        created_at=ticket.created_at,
-        cashier_name=ticket.cashier.Username,
-        items=items_schema
-    )
+    return respuesta_ticket(ticket)
 
 # ==================== CANCELAR TICKET ====================
 @router.patch("/{ticket_id}/cancel", dependencies=[Depends(require_admin)])
@@ -179,6 +131,8 @@ def list_tickets(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status: str | None = Query(None, regex="^(completed|cancelled)$"),
+    paginacion: str = Query("offset", regex="^(offset|cursor)$"),
+    cursor: str | None = Query(None),
     db: Session = Depends(get_db),
     current_user: Users = Depends(get_current_user)
 ):
@@ -188,7 +142,21 @@ def list_tickets(
     - **status**: completed, cancelled
     - **skip**: número de registros a saltar
     - **limit**: máximo de registros a retornar
+    - **paginacion**: offset (lista) o cursor (`{"items", "next_cursor"}`)
+    - **cursor**: `next_cursor` de la página anterior (solo con paginacion=cursor)
     """
+    if paginacion == "cursor":
+        tickets, next_cursor = crud_tickets.listar_tickets_por_cursor(
+            db,
+            cursor=cursor,
+            limit=limit,
+            status=status
+        )
+        return {
+            "items": [_ticket_listado(t) for t in tickets],
+            "next_cursor": next_cursor
+        }
+    
     tickets = crud_tickets.listar_tickets(
         db,
         skip=skip,
@@ -196,42 +164,53 @@ def list_tickets(
         status=status
     )
     
-    return [
-        {
-            "id": t.id,
-            "ticket_number": t.ticket_number,
-            "total": float(t.total),
-            "payment_method": t.payment_method,
-            "status": t.status,
-            "created_at": t.created_at,
-            "cashier": t.cashier.Username
-        }
-        for t in tickets
-    ]
+    return [_ticket_listado(t) for t in tickets]
+
+def _ticket_listado(t):
+    """Formato de un ticket en los listados"""
+    return {
+        "id": t.id,
+        "ticket_number": t.ticket_number,
+        "total": float(t.total),
+        "payment_method": t.payment_method,
+        "status": t.status,
+        "created_at": t.created_at,
+        "cashier": t.cashier.Username
+    }
 
 # ==================== TICKETS DEL DÍA ====================
 @router.get("/reports/today")
 def tickets_today(
+    incluir_tickets: bool = Query(True, description="Incluir una página del detalle"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="next_cursor de la página anterior del detalle"),
     db: Session = Depends(get_db),
     current_user: Users = Depends(get_current_user)
 ):
-    """Resumen de tickets del día actual"""
-    tickets = crud_tickets.listar_tickets(
-        db,
-        fecha_desde=datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    )
+    """
+    Resumen de tickets del día actual.
     
-    completed = [t for t in tickets if t.status == "completed"]
-    cancelled = [t for t in tickets if t.status == "cancelled"]
+    Los totales se calculan en SQL sobre todos los tickets del día; el
+    detalle es opcional y se pagina por cursor (`next_cursor`).
+    """
+    hoy = business_today()
+    ventana = day_window(hoy)
+    resumen = crud_tickets.resumen_tickets(db, ventana)
     
-    total_ventas = sum(float(t.total) for t in completed)
+    tickets, next_cursor = [], None
+    if incluir_tickets:
+        tickets, next_cursor = crud_tickets.listar_tickets_por_cursor(
+            db, cursor=cursor, limit=limit, ventana=ventana
+        )
     
     return {
-        "fecha": datetime.utcnow().date().isoformat(),
-        "total_tickets": len(tickets),
-        "completados": len(completed),
-        "cancelados": len(cancelled),
-        "total_ventas": total_ventas,
+        "fecha": hoy.isoformat(),
+        "total_tickets": resumen["total_tickets"],
+        "completados": resumen["completados"],
+        "cancelados": resumen["cancelados"],
+        "total_ventas": resumen["total_ventas"],
+        "por_metodo": resumen["por_metodo"],
+        "next_cursor": next_cursor,
         "tickets": [
             {
                 "id": t.id,
@@ -7,6 +7,7 @@ from schemas import CreateWithdrawalRequest, CashWithdrawalSchema
 import crud_withdrawals
 import crud_cash_register
 from datetime import datetime
+from app.core.time_window import business_today
 
 router = APIRouter(prefix="/withdrawals", tags=["Retiros de Efectivo"])
 
@@ -93,10 +94,17 @@ def get_withdrawal(
 def get_my_withdrawals(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    paginacion: str = Query("offset", regex="^(offset|cursor)$"),
+    cursor: str | None = Query(None),
     db: Session = Depends(get_db),
     current_user: Users = Depends(get_current_user)
 ):
-    """Lista los retiros de la caja abierta del usuario actual"""
+    """
+    Lista los retiros de la caja abierta del usuario actual.
+    
+    - **paginacion**: offset o cursor (agrega `next_cursor` a la respuesta)
+    - **cursor**: `next_cursor` de la página anterior (solo con paginacion=cursor)
+    """
     caja_abierta = crud_cash_register.obtener_caja_abierta(db, current_user.ID)
     
     if not caja_abierta:
@@ -105,12 +113,21 @@ def get_my_withdrawals(
             "withdrawals": []
         }
     
-    retiros = crud_withdrawals.listar_retiros_de_caja(
-        db,
-        caja_abierta.id,
-        skip=skip,
-        limit=limit
-    )
+    next_cursor = None
+    if paginacion == "cursor":
+        retiros, next_cursor = crud_withdrawals.listar_retiros_de_caja_por_cursor(
+            db,
+            caja_abierta.id,
+            cursor=cursor,
+            limit=limit
+        )
+    else:
+        retiros = crud_withdrawals.listar_retiros_de_caja(
+            db,
+            caja_abierta.id,
+            skip=skip,
+            limit=limit
+        )
     
     return {
         "cash_register_id": caja_abierta.id,
@@ -127,7 +144,8 @@ def get_my_withdrawals(
                 "user": r.user.Username
             }
             for r in retiros
-        ]
+        ],
+        "next_cursor": next_cursor
     }
 
 
@@ -189,7 +207,7 @@ def get_today_withdrawals(
     total_retirado = sum(float(r.amount) for r in retiros)
     
     return {
-        "fecha": datetime.utcnow().date().isoformat(),
+        "fecha": business_today().isoformat(),
         "total_withdrawals": len(retiros),
         "total_amount": total_retirado,
         "withdrawals": [
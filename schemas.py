@@ -1,5 +1,5 @@
 from decimal import Decimal
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 
@@ -59,12 +59,18 @@ class ProductoSchema(BaseModel):
     Category: str = Field(..., alias="Category")
     Units: str = Field(..., alias="Units")
     Price: Decimal = Field(..., alias="Price")
-    Stock: int = Field(..., alias="Stock")
-    Min_Stock: int = Field(..., alias="Min_Stock")
+    Stock: Decimal = Field(..., alias="Stock")
+    Min_Stock: Decimal = Field(..., alias="Min_Stock")
     Activo: int = Field(..., alias="Activo")
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
 
+class ProductoPagina(BaseModel):
+    """Página de productos con paginación por cursor"""
+    items: List[ProductoSchema]
+    next_cursor: str | None = None
+
+
 class ProductoUpdate(BaseModel):
     product: str | None = Field(None, alias="Product")
     code: str | int | None = Field(None, alias="Code")
@@ -85,6 +91,8 @@ class AddItemRequest(BaseModel):
     code: str | None = None
     barcode: str | None = None
     quantity: Decimal = Decimal('1.0')
+    # exact: solo igualdad (escáner); prefix: si no hay igualdad, busca por prefijo
+    lookup_mode: Literal["exact", "prefix"] = "exact"
 
 
 class CartItemSchema(BaseModel):
@@ -97,15 +105,47 @@ class CartItemSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BatchItemLine(BaseModel):
+    product_id: int | None = None
+    code: str | None = None
+    barcode: str | None = None
+    quantity: Decimal = Decimal('1.0')
+
+
+class AddItemsBatchRequest(BaseModel):
+    # Líneas escaneadas en orden; se busca por igualdad exacta (Id, código o barras)
+    items: list[BatchItemLine] = Field(..., min_length=1, max_length=500)
+
+
+class BatchItemResult(BaseModel):
+    line: int
+    success: bool
+    error: str | None = None
+    item: CartItemSchema | None = None
+
+
+class AddItemsBatchResponse(BaseModel):
+    cart_id: int
+    results: list[BatchItemResult]
+    total: Decimal
+
+
 class CartSchema(BaseModel):
     id: int
     status: str
     created_at: datetime | None
     items: list[CartItemSchema] = []
     total: Decimal | None = None
+    item_count: int | None = None
     model_config = ConfigDict(from_attributes=True)
 
 
+class CartPagina(BaseModel):
+    """Página de carritos con paginación por cursor"""
+    items: List[CartSchema]
+    next_cursor: str | None = None
+
+
 class CartUpdateStatus(BaseModel):
     status: str = Field(..., alias="Status")
     model_config = ConfigDict(populate_by_name=True)
@@ -0,0 +1,86 @@
+"""
+Prueba del engine async (database.get_async_engine).
+
+Consultas sobre AsyncSession (aiosqlite) con las mismas métricas de pool
+(pool="async") y el mismo conteo de SQL por request que el engine síncrono.
+
+aiosqlite está en requirements.txt. Sin él la prueba se omite en local,
+pero en CI (variable CI definida) falla en lugar de omitirse en silencio.
+
+    python test_async_engine.py
+    python -m pytest test_async_engine.py
+"""
+import asyncio
+import os
+import tempfile
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "async_engine.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-async-" + "x" * 32)
+
+import pytest
+
+if os.getenv("CI"):
+    import aiosqlite  # noqa: F401
+else:
+    pytest.importorskip("aiosqlite")
+
+from sqlalchemy import select
+
+import main  # crea las tablas
+from app.core import query_stats
+from app.core.metrics import metrics
+from database import ASYNC_DATABASE_URL, SessionLocal, get_async_engine, get_async_session_factory
+from models import Product
+
+
+def preparar():
+    db = SessionLocal()
+    db.add(Product(
+        Code="AE1", Barcode="750AE1", Product="Producto async", Category="Abarrotes",
+        Units="Pza", Price=Decimal("12.50"), Stock=Decimal(10), Min_Stock=Decimal(1)
+    ))
+    db.commit()
+    db.close()
+
+
+preparar()
+
+
+async def buscar_con_estadisticas(code: str):
+    """Consulta async dentro de un "request" con sus estadísticas de SQL"""
+    stats = query_stats.RequestQueryStats()
+    token = query_stats._current.set(stats)
+    try:
+        async with get_async_session_factory()() as db:
+            producto = await db.scalar(select(Product).where(Product.Code == code))
+    finally:
+        query_stats._current.reset(token)
+    return producto, stats
+
+
+def test_consultas_async():
+    assert ASYNC_DATABASE_URL.startswith("sqlite+aiosqlite://")
+    producto, _ = asyncio.run(buscar_con_estadisticas("AE1"))
+    assert producto.Product == "Producto async"
+    assert asyncio.run(buscar_con_estadisticas("NO-EXISTE"))[0] is None
+
+
+def test_engine_async_instrumentado():
+    _, stats = asyncio.run(buscar_con_estadisticas("AE1"))
+    assert stats.statements == 1
+
+    texto = metrics.render()
+    assert 'pos_db_pool_checkout_seconds_count{pool="async"}' in texto
+    assert 'pos_db_pool_checked_out{pool="async"} 0' in texto
+    assert 'pos_db_pool_checked_out{pool="sync"}' in texto
+    assert texto.count("# TYPE pos_db_pool_checked_out gauge") == 1
+    asyncio.run(get_async_engine().dispose())
+
+
+if __name__ == "__main__":
+    test_consultas_async()
+    print("✅ Consultas sobre AsyncSession")
+    test_engine_async_instrumentado()
+    print("✅ El engine async publica métricas de pool y conteo de SQL")
@@ -0,0 +1,106 @@
+"""
+Prueba de POST /api/pos/carts/{cart_id}/items/lote (canasta completa en una transacción).
+
+Verifica resultados por línea, duplicados juntados, stock acumulado, el
+total del carrito y que el número de consultas no crezca con las líneas.
+
+    python test_cart_batch.py
+    python -m pytest test_cart_batch.py
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "cart_batch.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-lote-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+
+import main
+from contador_consultas import ContadorConsultas
+from database import SessionLocal
+from models import CartItem, Product
+
+client = TestClient(main.app)
+
+
+def preparar():
+    db = SessionLocal()
+    db.add_all([
+        Product(
+            Code=f"LT{i}", Barcode=f"750LT{i}", Product=f"Producto lote {i}", Category="Abarrotes",
+            Units="Pza", Price=Decimal("10.00") + i, Stock=Decimal(5), Min_Stock=Decimal(1)
+        )
+        for i in range(60)
+    ])
+    db.commit()
+    ids = [p.Id for p in db.query(Product).filter(Product.Code.like("LT%")).order_by(Product.Id)]
+    db.close()
+    return ids
+
+
+IDS = preparar()
+
+
+def test_lote_resultados_por_linea():
+    cart_id = client.post("/api/pos/carts").json()["id"]
+    # Un item previo del mismo producto se actualiza, no se duplica
+    assert client.post(f"/api/pos/carts/{cart_id}/items", json={"barcode": "750LT0", "quantity": "1"}).status_code == 200
+
+    lineas = [
+        {"barcode": "750LT0", "quantity": "2"},
+        {"code": "LT1"},
+        {"product_id": IDS[2], "quantity": "3"},
+        {"barcode": "750LT0", "quantity": "1"},
+        {"barcode": "NOEXISTE"},
+        {"code": "LT1", "quantity": "0"},
+        {"product_id": IDS[2], "quantity": "3"},
+    ]
+    respuesta = client.post(f"/api/pos/carts/{cart_id}/items/lote", json={"items": lineas})
+    assert respuesta.status_code == 200, respuesta.text
+    resultados = respuesta.json()["results"]
+
+    assert [r["success"] for r in resultados] == [True, True, True, True, False, False, False]
+    assert resultados[4]["error"] == "Producto no encontrado"
+    assert resultados[5]["error"] == "La cantidad debe ser mayor a 0"
+    # 3 + 3 del mismo producto superan el stock de 5
+    assert resultados[6]["error"] == "Stock insuficiente"
+    assert Decimal(str(resultados[3]["item"]["quantity"])) == 4
+    assert resultados[0]["item"]["id"] == resultados[3]["item"]["id"]
+
+    # 4 x 10 + 1 x 11 + 3 x 12
+    assert Decimal(str(respuesta.json()["total"])) == Decimal("87.00")
+    total = client.get(f"/api/pos/carts/{cart_id}/total").json()["Total"]
+    assert Decimal(str(total)) == Decimal("87.00")
+
+    db = SessionLocal()
+    assert db.query(CartItem).filter(CartItem.cart_id == cart_id).count() == 3
+    db.close()
+
+
+def test_lote_consultas_constantes():
+    def canasta(n):
+        cart_id = client.post("/api/pos/carts").json()["id"]
+        lineas = [{"product_id": pid} for pid in IDS[:n]]
+        with ContadorConsultas() as consultas:
+            respuesta = client.post(f"/api/pos/carts/{cart_id}/items/lote", json={"items": lineas})
+        assert respuesta.status_code == 200, respuesta.text
+        assert all(r["success"] for r in respuesta.json()["results"])
+        return len(consultas)
+
+    # El INSERT de los items nuevos va en bloque: 5 o 60 líneas, mismas consultas
+    assert canasta(60) == canasta(5)
+
+
+def test_lote_carrito_no_disponible():
+    respuesta = client.post("/api/pos/carts/999999/items/lote", json={"items": [{"code": "LT1"}]})
+    assert respuesta.status_code == 404
+    assert client.post("/api/pos/carts/1/items/lote", json={"items": []}).status_code == 422
+
+
+if __name__ == "__main__":
+    test_lote_resultados_por_linea()
+    test_lote_consultas_constantes()
+    test_lote_carrito_no_disponible()
+    print("✅ Canasta en lote: resultados por línea, total y consultas constantes")
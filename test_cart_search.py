@@ -0,0 +1,121 @@
+"""
+Prueba de GET /api/pos/carts/search: filtros en SQL y paginación por cursor.
+
+Recorre todas las páginas sin repetir ni perder carritos y verifica que
+cada página cueste las mismas consultas sin importar cuántos carritos haya.
+
+    python test_cart_search.py
+    python -m pytest test_cart_search.py
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "cart_search.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-busqueda-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+import main
+from contador_consultas import ContadorConsultas
+from database import SessionLocal
+from models import Cart, CartItem, Product
+
+client = TestClient(main.app)
+# Fechas que no usa ningún otro módulo de pruebas: las búsquedas se acotan a
+# este rango para no contar carritos ajenos cuando todos comparten la BD
+INICIO = datetime(2001, 1, 1)
+PROPIOS = {"start_date": INICIO.isoformat(), "end_date": (INICIO + timedelta(days=129)).isoformat()}
+
+
+def preparar():
+    """130 carritos: total = 10 * (i % 13), uno de cada 5 con 'Leche', uno de cada 4 cancelado"""
+    db = SessionLocal()
+    producto = Product(Code="BS1", Barcode="750BS1", Product="Genérico", Category="Abarrotes",
+                       Units="Pza", Price=Decimal("10.00"), Stock=Decimal(1000), Min_Stock=Decimal(1))
+    db.add(producto)
+    db.flush()
+    for i in range(130):
+        unidades = i % 13
+        cart = Cart(
+            status="cancelled" if i % 4 == 0 else "completed",
+            created_at=INICIO + timedelta(days=i),
+            total=Decimal(10 * unidades), item_count=1 if unidades else 0
+        )
+        db.add(cart)
+        db.flush()
+        if unidades:
+            db.execute(insert(CartItem), [{
+                "cart_id": cart.id, "product_id": producto.Id,
+                "product_name": "Leche entera" if i % 5 == 0 else "Genérico",
+                "price": Decimal("10.00"), "quantity": Decimal(unidades), "subtotal": Decimal(10 * unidades)
+            }])
+    db.commit()
+    db.close()
+
+
+preparar()
+
+
+def recorrer(params: dict, limit: int = 20) -> tuple[list[dict], int]:
+    """Todas las páginas de la búsqueda sobre los carritos de esta prueba; regresa (carritos, páginas)"""
+    carritos, cursor, paginas = [], None, 0
+    while True:
+        pagina = client.get("/api/pos/carts/search", params={
+            **PROPIOS, **params, "limit": limit, **({"cursor": cursor} if cursor else {})
+        })
+        assert pagina.status_code == 200, pagina.text
+        datos = pagina.json()
+        carritos.extend(datos["items"])
+        paginas += 1
+        cursor = datos["next_cursor"]
+        if not cursor:
+            return carritos, paginas
+
+
+def test_paginas_completas_sin_repetir():
+    carritos, paginas = recorrer({})
+    ids = [c["id"] for c in carritos]
+    assert len(ids) == 130 == len(set(ids)) and paginas == 7
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_filtros_en_sql():
+    carritos, _ = recorrer({"min_amount": 100})
+    assert carritos and all(Decimal(str(c["total"])) >= 100 for c in carritos)
+    assert len(carritos) == sum(1 for i in range(130) if 10 * (i % 13) >= 100)
+
+    carritos, _ = recorrer({"status": "cancelled", "product_name": "leche"})
+    esperados = [i for i in range(130) if i % 4 == 0 and i % 5 == 0 and i % 13]
+    assert len(carritos) == len(esperados)
+    assert all(any("Leche" in item["product_name"] for item in c["items"]) for c in carritos)
+
+    desde, hasta = INICIO + timedelta(days=10), INICIO + timedelta(days=19)
+    carritos, _ = recorrer({"start_date": desde.isoformat(), "end_date": hasta.isoformat()}, limit=3)
+    assert len(carritos) == 10
+
+
+def test_consultas_por_pagina_constantes():
+    with ContadorConsultas() as consultas:
+        client.get("/api/pos/carts/search", params={"limit": 5})
+        chica = len(consultas)
+        consultas.clear()
+        client.get("/api/pos/carts/search", params={"limit": 100})
+        grande = len(consultas)
+    # Página de carritos + un SELECT ... IN de sus items
+    assert chica == grande == 2
+
+
+def test_cursor_invalido():
+    assert client.get("/api/pos/carts/search", params={"cursor": "no-es-cursor"}).status_code == 422
+
+
+if __name__ == "__main__":
+    test_paginas_completas_sin_repetir()
+    test_filtros_en_sql()
+    test_consultas_por_pagina_constantes()
+    test_cursor_invalido()
+    print("✅ Búsqueda de carritos: filtros en SQL y paginación por cursor")
@@ -0,0 +1,264 @@
+"""
+Prueba del almacén write-behind de carritos (CART_STORE=memory).
+
+Los items de un carrito abierto no tocan cart_items hasta el checkout,
+la cancelación o el volcado; el journal recupera las canastas al reiniciar.
+
+Cada prueba usa su propio CartStore (journal en un directorio temporal) en
+lugar de la instancia del proceso, así no depende de las variables
+CART_STORE_* ni de qué módulo de pruebas importó la app primero.
+
+    python test_cart_store.py
+    python -m pytest test_cart_store.py
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from decimal import Decimal
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cart_store.db')}"
+os.environ.setdefault("SECRET_KEY", "prueba-carritos-" + "x" * 32)
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import crud
+import crud_tickets
+from app.repositories.cart_store import CartStore
+from app.repositories.catalog_cache import catalog_cache
+from app.services import cart_sweeper
+from database import SessionLocal
+from models import Cart, CartItem, Product
+
+# Módulos que toman la instancia compartida con "from ... import cart_store"
+USAN_CART_STORE = (crud, crud_tickets, cart_sweeper, main)
+
+
+def preparar():
+    db = SessionLocal()
+    crud.create_user(db, "cajero_memoria", "1234")
+    db.add_all([
+        Product(
+            Code=f"CM{i}", Barcode=f"750CM{i}", Product=f"Producto memoria {i}", Category="Abarrotes",
+            Units="Pza", Price=Decimal("10.00") * (i + 1), Stock=Decimal(50), Min_Stock=Decimal(1)
+        )
+        for i in range(3)
+    ])
+    db.commit()
+    db.close()
+
+
+preparar()
+
+
+@contextmanager
+def almacen_en_memoria(journal_path: str):
+    """
+    CartStore propio en los módulos que lo usan y la app con su lifespan
+    (recupera el journal, arranca y al salir detiene el volcado y el barrido).
+    """
+    store = CartStore(enabled=True, journal_path=journal_path)
+    anteriores = [(modulo, modulo.cart_store) for modulo in USAN_CART_STORE]
+    for modulo in USAN_CART_STORE:
+        modulo.cart_store = store
+    try:
+        with TestClient(main.app) as client:
+            token = client.post("/users/login", json={"Username": "cajero_memoria", "Password": "1234"}).json()["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
+            yield store, client
+    finally:
+        for modulo, anterior in anteriores:
+            modulo.cart_store = anterior
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "cart_journal.log")
+
+
+@pytest.fixture
+def almacen(journal):
+    with almacen_en_memoria(journal) as (store, client):
+        yield store, client
+
+
+def items_en_bd(cart_id: int) -> dict:
+    db = SessionLocal()
+    items = {i.product_name: i.quantity for i in db.query(CartItem).filter(CartItem.cart_id == cart_id)}
+    db.close()
+    return items
+
+
+def llenar_carrito(client) -> int:
+    cart_id = client.post("/api/pos/carts").json()["id"]
+    assert client.post(f"/api/pos/carts/{cart_id}/items", json={"barcode": "750CM0", "quantity": "2"}).status_code == 200
+    lote = client.post(f"/api/pos/carts/{cart_id}/items/lote", json={"items": [
+        {"code": "CM1"}, {"code": "CM2"}, {"barcode": "750CM0"}
+    ]})
+    assert lote.status_code == 200, lote.text
+    return cart_id
+
+
+def test_items_en_memoria_hasta_el_checkout(almacen):
+    store, client = almacen
+    cart_id = llenar_carrito(client)
+    cart = client.get(f"/api/pos/carts/{cart_id}").json()
+    por_codigo = {i["product_name"]: i for i in cart["items"]}
+    assert Decimal(str(por_codigo["Producto memoria 0"]["quantity"])) == 3
+
+    # Cambiar cantidad y quitar un item por su Id local
+    item_1 = por_codigo["Producto memoria 1"]["id"]
+    item_2 = por_codigo["Producto memoria 2"]["id"]
+    assert client.patch(f"/api/pos/carts/{cart_id}/items/{item_1}", json={"Quantity": "4"}).status_code == 200
+    assert client.delete(f"/api/pos/carts/{cart_id}/items/{item_2}").status_code == 200
+    assert client.delete(f"/api/pos/carts/{cart_id}/items/999").status_code in (400, 404)
+
+    total = client.get(f"/api/pos/carts/{cart_id}/total").json()["Total"]
+    assert Decimal(str(total)) == Decimal("110.00")  # 3 x 10 + 4 x 20
+    assert items_en_bd(cart_id) == {}
+
+    ticket = client.post("/tickets/", json={"CartId": cart_id, "PaymentMethod": "card"})
+    assert ticket.status_code == 201, ticket.text
+    assert Decimal(str(ticket.json()["total"])) == Decimal("110.00")
+    assert items_en_bd(cart_id) == {"Producto memoria 0": 3, "Producto memoria 1": 4}
+    assert not store.tiene(cart_id)
+
+    db = SessionLocal()
+    assert db.query(Cart).filter(Cart.id == cart_id).one().status == "completed"
+    db.close()
+
+
+def test_cancelacion_y_volcado_periodico(almacen):
+    store, client = almacen
+    cancelado = llenar_carrito(client)
+    pendiente = llenar_carrito(client)
+
+    respuesta = client.patch(f"/api/pos/carts/{cancelado}/estado", json={"Status": "cancelled"})
+    assert respuesta.status_code == 200 and respuesta.json()["status"] == "cancelled"
+    assert len(items_en_bd(cancelado)) == 3
+    assert not store.tiene(cancelado)
+
+    assert items_en_bd(pendiente) == {}
+    assert store.flush() >= 1
+    assert len(items_en_bd(pendiente)) == 3
+    assert store.stats()["dirty_carts"] == 0
+    # Sigue abierto en memoria después del volcado
+    assert store.tiene(pendiente)
+
+
+def test_volcado_no_pisa_un_carrito_cobrado(almacen):
+    store, client = almacen
+    cart_id = llenar_carrito(client)
+
+    # Un cobro confirmado entre la foto del volcado y su escritura
+    db = SessionLocal()
+    db.query(Cart).filter(Cart.id == cart_id).update(
+        {Cart.status: "completed", Cart.total: Decimal("10.00"), Cart.item_count: 1}
+    )
+    producto = db.query(Product).filter(Product.Code == "CM0").one()
+    db.add(CartItem(cart_id=cart_id, product_id=producto.Id, product_name="Vendido", price=Decimal("10.00"),
+                    quantity=Decimal("1"), subtotal=Decimal("10.00")))
+    db.commit()
+    db.close()
+
+    assert store.flush() == 0
+    assert items_en_bd(cart_id) == {"Vendido": 1}
+    db = SessionLocal()
+    assert db.query(Cart.total).filter(Cart.id == cart_id).scalar() == Decimal("10.00")
+    db.close()
+    assert not store.tiene(cart_id)
+
+
+def test_sin_cambios_mientras_se_cierra(almacen):
+    store, client = almacen
+    cart_id = llenar_carrito(client)
+
+    # Mientras sus items van en la transacción de un cobro, el escaneo se rechaza
+    db = SessionLocal()
+    store.escribir(db, cart_id)
+    escaneo = client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "CM2"})
+    assert escaneo.status_code == 409, escaneo.text
+    db.rollback()
+    db.close()
+    store.liberar(cart_id)
+    assert client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "CM2"}).status_code == 200
+
+    # Un cobro rechazado libera el carrito y conserva todos sus items
+    fallido = client.post("/tickets/", json={"CartId": cart_id, "PaymentMethod": "cash", "AmountPaid": "1"})
+    assert fallido.status_code == 400
+    assert client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "CM2"}).status_code == 200
+    ticket = client.post("/tickets/", json={"CartId": cart_id, "PaymentMethod": "card"})
+    assert ticket.status_code == 201, ticket.text
+    assert items_en_bd(cart_id)["Producto memoria 2"] == 3
+
+
+def test_carrito_cerrado_entre_lecturas(almacen):
+    store, client = almacen
+    cart_id = llenar_carrito(client)
+    item_id = store.obtener(cart_id).items[0].id
+    assert client.post("/tickets/", json={"CartId": cart_id, "PaymentMethod": "card"}).status_code == 201
+
+    # tiene() respondió antes de que el checkout cerrara el carrito
+    store.tiene = lambda _cart_id: True
+    try:
+        cambio = client.patch(f"/api/pos/carts/{cart_id}/items/{item_id}", json={"Quantity": "1"})
+        total = client.get(f"/api/pos/carts/{cart_id}/total")
+    finally:
+        del store.tiene
+    assert cambio.status_code == 409, cambio.text
+    assert total.status_code == 200 and Decimal(str(total.json()["Total"])) == Decimal("80.00")
+
+
+def test_producto_borrado_no_rompe_el_cambio_de_cantidad(almacen):
+    store, client = almacen
+    db = SessionLocal()
+    temporal = Product(Code="CMX", Barcode="750CMX", Product="Temporal", Category="Abarrotes",
+                       Units="Pza", Price=Decimal("5.00"), Stock=Decimal(10), Min_Stock=Decimal(1))
+    db.add(temporal)
+    db.commit()
+    temporal_id = temporal.Id
+    db.close()
+
+    cart_id = client.post("/api/pos/carts").json()["id"]
+    item = client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "CMX"}).json()
+    db = SessionLocal()
+    db.query(Product).filter(Product.Id == temporal_id).delete()
+    db.commit()
+    db.close()
+    catalog_cache.discard([temporal_id])
+
+    cambio = client.patch(f"/api/pos/carts/{cart_id}/items/{item['id']}", json={"Quantity": "2"})
+    assert cambio.status_code == 400 and cambio.json()["detail"] == "Producto no disponible"
+    assert client.patch(f"/api/pos/carts/{cart_id}/estado", json={"Status": "cancelled"}).status_code == 200
+
+
+def test_journal_recupera_canastas(journal):
+    with almacen_en_memoria(journal) as (store, client):
+        cart_id = llenar_carrito(client)
+        client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "CM2", "quantity": "5"})
+        primer_item = store.obtener(cart_id).items[0].id
+
+        # Caída a mitad de una escritura: la última línea queda incompleta
+        with open(journal, "a", encoding="utf-8") as archivo:
+            archivo.write('{"op":"item","cart":')
+
+        # Un proceso nuevo con el mismo journal recupera y escribe el carrito
+        reiniciado = CartStore(enabled=True, journal_path=journal)
+        reiniciado.start(SessionLocal, interval=0)
+        assert reiniciado.tiene(cart_id)
+        assert items_en_bd(cart_id) == {"Producto memoria 0": 3, "Producto memoria 1": 1, "Producto memoria 2": 6}
+        assert reiniciado.obtener(cart_id).items[0].id == primer_item
+        reiniciado.stop()
+
+
+if __name__ == "__main__":
+    for prueba in (
+        test_items_en_memoria_hasta_el_checkout, test_cancelacion_y_volcado_periodico,
+        test_volcado_no_pisa_un_carrito_cobrado, test_sin_cambios_mientras_se_cierra,
+        test_carrito_cerrado_entre_lecturas, test_producto_borrado_no_rompe_el_cambio_de_cantidad
+    ):
+        with almacen_en_memoria(os.path.join(tempfile.mkdtemp(), "cart_journal.log")) as almacen:
+            prueba(almacen)
+    test_journal_recupera_canastas(os.path.join(tempfile.mkdtemp(), "cart_journal.log"))
+    print("✅ Carritos en memoria: checkout, cancelación, volcado, cierre, carreras y recuperación del journal")
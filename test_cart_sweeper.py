@@ -0,0 +1,168 @@
+"""
+Prueba del barrido de carritos abiertos abandonados (app/services/cart_sweeper.py).
+
+Cancela por lotes solo los carritos abiertos inactivos, archiva sus items
+si se pide, respeta la actividad en memoria y publica los contadores.
+
+    python test_cart_sweeper.py
+    python -m pytest test_cart_sweeper.py
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIR, 'cart_sweeper.db')}"
+os.environ.setdefault("SECRET_KEY", "prueba-barrido-" + "x" * 32)
+
+from sqlalchemy import insert
+
+import main  # crea las tablas
+from app.core.metrics import metrics
+from app.repositories.cart_store import cart_store
+from app.services import cart_sweeper as modulo
+from app.services.cart_sweeper import CartSweeper
+from database import SessionLocal
+from models import Cart, CartItem, CartItemArchive, Product
+
+HACE_5_HORAS = datetime.utcnow() - timedelta(hours=5)
+
+
+def crear_producto() -> int:
+    db = SessionLocal()
+    producto = Product(Code="SW1", Barcode="750SW1", Product="Barrido", Category="Abarrotes",
+                       Units="Pza", Price=Decimal("5.00"), Stock=Decimal(1000), Min_Stock=Decimal(1))
+    db.add(producto)
+    db.commit()
+    product_id = producto.Id
+    db.close()
+    return product_id
+
+
+PRODUCT_ID = crear_producto()
+
+
+def crear_carritos(cantidad: int, status: str = "open", updated_at: datetime = HACE_5_HORAS) -> list[int]:
+    """Carritos con dos items cada uno y la última actividad indicada"""
+    db = SessionLocal()
+    ids = []
+    for _ in range(cantidad):
+        cart = Cart(status=status, created_at=updated_at, updated_at=updated_at, total=Decimal("15.00"), item_count=2)
+        db.add(cart)
+        db.flush()
+        ids.append(cart.id)
+    db.execute(insert(CartItem), [
+        {"cart_id": cart_id, "product_id": PRODUCT_ID, "product_name": "Barrido",
+         "price": Decimal("5.00"), "quantity": Decimal(q), "subtotal": Decimal(5 * q)}
+        for cart_id in ids for q in (1, 2)
+    ])
+    db.commit()
+    db.close()
+    return ids
+
+
+def estados(ids: list[int]) -> dict:
+    db = SessionLocal()
+    resultado = {
+        cart_id: (status, db.query(CartItem).filter(CartItem.cart_id == cart_id).count())
+        for cart_id, status in db.query(Cart.id, Cart.status).filter(Cart.id.in_(ids))
+    }
+    db.close()
+    return resultado
+
+
+def contador(nombre: str) -> float:
+    """Valor actual del contador (sin muestras todavía = 0)"""
+    linea = next((l for l in metrics.render().splitlines() if l.startswith(nombre + " ")), f"{nombre} 0")
+    return float(linea.split()[1])
+
+
+def test_cancela_por_lotes_y_archiva():
+    abandonados = crear_carritos(7)
+    recientes = crear_carritos(2, updated_at=datetime.utcnow())
+    cobrados = crear_carritos(2, status="completed")
+    barridos_antes = contador("pos_carts_swept_total")
+
+    sweeper = CartSweeper(idle_minutes=60, batch_size=3, archive=True)
+    assert sweeper.barrer(SessionLocal, dry_run=True)["candidates"] == 7
+
+    # max_lotes acota el trabajo de una corrida
+    parcial = sweeper.barrer(SessionLocal, max_lotes=1)
+    assert parcial["carts"] == 3 and parcial["batches"] == 1
+
+    resumen = sweeper.barrer(SessionLocal)
+    assert resumen["carts"] == 4 and resumen["batches"] == 2 and resumen["items_archived"] == 8
+
+    assert set(estados(abandonados).values()) == {("cancelled", 0)}
+    assert set(estados(recientes).values()) == {("open", 2)}
+    assert set(estados(cobrados).values()) == {("completed", 2)}
+
+    db = SessionLocal()
+    assert db.query(CartItemArchive).filter(CartItemArchive.cart_id.in_(abandonados)).count() == 14
+    assert {c.total for c in db.query(Cart).filter(Cart.id.in_(abandonados))} == {0}
+    db.close()
+
+    assert contador("pos_carts_swept_total") == barridos_antes + 7
+    assert contador("pos_cart_items_archived_total") >= 14
+    assert sweeper.barrer(SessionLocal)["carts"] == 0
+
+
+def test_sin_archivo_conserva_items():
+    abandonados = crear_carritos(2)
+    modulo.main(["--idle-minutes", "60", "--batch", "10"])
+    assert set(estados(abandonados).values()) == {("cancelled", 2)}
+
+
+def test_respeta_actividad_en_memoria():
+    cart_store.enabled = True
+    cart_store.journal_path = os.path.join(DIR, "cart_journal.log")
+    try:
+        (cart_id,) = crear_carritos(1)
+        db = SessionLocal()
+        cart = db.query(Cart).filter(Cart.id == cart_id).one()
+        cart_store.abrir(cart)
+        producto = db.query(Product).filter(Product.Id == PRODUCT_ID).one()
+        db.close()
+
+        # En BD parece inactivo, pero acaba de recibir un item en memoria
+        cart_store.agregar(cart_id, [(producto, Decimal("3"))])
+        sweeper = CartSweeper(idle_minutes=60, batch_size=10, archive=True)
+        sweeper.barrer(SessionLocal)
+        assert cart_store.tiene(cart_id) and estados([cart_id])[cart_id][0] == "open"
+
+        # Inactivo también en memoria: se escribe, se archiva y sale del almacén
+        cart_store.backend.get(cart_id).updated_at = HACE_5_HORAS
+        assert sweeper.barrer(SessionLocal)["carts"] == 1
+        assert not cart_store.tiene(cart_id)
+        db = SessionLocal()
+        archivados = db.query(CartItemArchive).filter(CartItemArchive.cart_id == cart_id).all()
+        db.close()
+        assert [a.quantity for a in archivados] == [Decimal("3")]
+    finally:
+        cart_store.enabled = False
+
+
+def test_carrito_cerrado_durante_el_lote():
+    cart_store.enabled = True
+    cart_store.journal_path = os.path.join(DIR, "cart_journal.log")
+    cerrado, abandonado = crear_carritos(2)
+    # tiene() respondió antes de que un checkout sacara el carrito del almacén
+    cart_store.tiene = lambda cart_id: cart_id == cerrado
+    try:
+        resumen = CartSweeper(idle_minutes=60, batch_size=10, archive=False).barrer(SessionLocal)
+    finally:
+        del cart_store.tiene
+        cart_store.enabled = False
+
+    # El carrito en carrera se omite y el resto del lote sí se cancela
+    assert resumen["carts"] == 1
+    assert estados([cerrado, abandonado]) == {cerrado: ("open", 2), abandonado: ("cancelled", 2)}
+
+
+if __name__ == "__main__":
+    test_cancela_por_lotes_y_archiva()
+    test_sin_archivo_conserva_items()
+    test_respeta_actividad_en_memoria()
+    test_carrito_cerrado_durante_el_lote()
+    print("✅ Barrido de carritos abandonados: lotes, archivo, memoria y métricas")
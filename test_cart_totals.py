@@ -0,0 +1,127 @@
+"""
+Prueba de total e item_count desnormalizados en cart.
+
+Cada cambio de items ajusta los totales por delta; /total es una lectura
+por llave primaria y el verificador de integridad detecta y corrige diferencias.
+
+    python test_cart_totals.py
+    python -m pytest test_cart_totals.py
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "cart_totals.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-totales-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+
+import main
+import crud
+from contador_consultas import ContadorConsultas
+from database import SessionLocal
+from models import Cart, CartItem, Product
+
+client = TestClient(main.app)
+
+
+def preparar():
+    db = SessionLocal()
+    crud.create_user(db, "admin_totales", "1234", role="admin")
+    db.add_all([
+        Product(Code="TT1", Barcode="750TT1", Product="Granel", Category="Abarrotes",
+                Units="Kg", Price=Decimal("12.99"), Stock=Decimal(100), Min_Stock=Decimal(1)),
+        Product(Code="TT2", Barcode="750TT2", Product="Pieza", Category="Abarrotes",
+                Units="Pza", Price=Decimal("7.50"), Stock=Decimal(100), Min_Stock=Decimal(1)),
+    ])
+    db.commit()
+    db.close()
+    token = client.post("/users/login", json={"Username": "admin_totales", "Password": "1234"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+HEADERS = preparar()
+
+
+def totales(cart_id: int):
+    """(guardado, recalculado) de total e item_count"""
+    db = SessionLocal()
+    cart = db.query(Cart).filter(Cart.id == cart_id).one()
+    suma, renglones = db.query(
+        func.coalesce(func.sum(CartItem.subtotal), 0), func.count(CartItem.id)
+    ).filter(CartItem.cart_id == cart_id).one()
+    db.close()
+    return (Decimal(str(cart.total)), cart.item_count), (Decimal(str(suma)).quantize(Decimal("0.01")), renglones)
+
+
+def test_deltas_en_cada_cambio():
+    cart_id = client.post("/api/pos/carts").json()["id"]
+    item = client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "TT1", "quantity": "0.333"}).json()
+    client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "TT1", "quantity": "0.333"})
+    client.post(f"/api/pos/carts/{cart_id}/items/lote", json={"items": [{"code": "TT2", "quantity": "3"}, {"code": "TT1"}]})
+    guardado, real = totales(cart_id)
+    assert guardado == real == (Decimal("44.14"), 2)  # 1.666 x 12.99 + 3 x 7.50
+
+    client.patch(f"/api/pos/carts/{cart_id}/items/{item['id']}", json={"Quantity": "2"})
+    guardado, real = totales(cart_id)
+    assert guardado == real == (Decimal("48.48"), 2)
+
+    pieza = next(i for i in client.get(f"/api/pos/carts/{cart_id}").json()["items"] if i["product_name"] == "Pieza")
+    client.delete(f"/api/pos/carts/{cart_id}/items/{pieza['id']}")
+    guardado, real = totales(cart_id)
+    assert guardado == real == (Decimal("25.98"), 1)
+
+    respuesta = client.get(f"/api/pos/carts/{cart_id}").json()
+    assert Decimal(str(respuesta["total"])) == Decimal("25.98") and respuesta["item_count"] == 1
+
+    client.delete(f"/api/pos/carts/{cart_id}/items")
+    assert totales(cart_id) == ((Decimal("0.00"), 0), (Decimal("0.00"), 0))
+
+
+def test_total_por_llave_primaria():
+    cart_id = client.post("/api/pos/carts").json()["id"]
+    client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "TT2", "quantity": "2"})
+
+    with ContadorConsultas() as consultas:
+        total = client.get(f"/api/pos/carts/{cart_id}/total").json()["Total"]
+
+    assert Decimal(str(total)) == Decimal("15.00")
+    assert len(consultas) == 1 and "cart_items" not in consultas.sentencias[0]
+
+    # La búsqueda filtra por la columna total en SQL
+    db = SessionLocal()
+    encontrados, _ = crud.buscar_carritos_avanzado(db, min_total=15)
+    assert cart_id in [c.id for c in encontrados]
+    assert cart_id not in [c.id for c in crud.buscar_carritos_avanzado(db, min_total=15.01)[0]]
+    db.close()
+
+
+def test_verificador_de_integridad():
+    cart_id = client.post("/api/pos/carts").json()["id"]
+    client.post(f"/api/pos/carts/{cart_id}/items", json={"code": "TT2", "quantity": "4"})
+
+    # Diferencia introducida por fuera de crud
+    db = SessionLocal()
+    db.query(Cart).filter(Cart.id == cart_id).update({Cart.total: Decimal("1.00"), Cart.item_count: 7})
+    db.commit()
+    db.close()
+
+    assert client.get("/api/pos/carts/integridad").status_code in (401, 403)
+    reporte = client.get("/api/pos/carts/integridad", headers=HEADERS).json()
+    assert [c["cart_id"] for c in reporte["Carritos"]] == [cart_id]
+    assert Decimal(str(reporte["Carritos"][0]["total_items"])) == Decimal("30.00")
+
+    corregidos = client.post("/api/pos/carts/integridad/corregir", headers=HEADERS).json()
+    assert corregidos["Corregidos"] == 1
+    guardado, real = totales(cart_id)
+    assert guardado == real == (Decimal("30.00"), 1)
+    assert client.get("/api/pos/carts/integridad", headers=HEADERS).json()["Diferencias"] == 0
+
+
+if __name__ == "__main__":
+    test_deltas_en_cada_cambio()
+    test_total_por_llave_primaria()
+    test_verificador_de_integridad()
+    print("✅ Totales de carrito por delta, /total por llave primaria e integridad")
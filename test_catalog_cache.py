@@ -0,0 +1,128 @@
+"""
+Prueba del caché del catálogo (app.repositories.catalog_cache).
+
+Aciertos sin SQL, invalidación por versión, descarte por producto, TTL y
+que una copia del caché no pise el estado que la sesión ya tiene cargado.
+
+    python test_catalog_cache.py
+    python -m pytest test_catalog_cache.py
+"""
+import os
+import tempfile
+import time
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "catalog_cache.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import update
+
+from app.repositories.catalog_cache import CatalogCache
+from contador_consultas import ContadorConsultas
+from database import Base, SessionLocal, engine
+from models import Product
+
+
+def preparar() -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    producto = Product(Code="CC1", Barcode="750CC1", Product="Catálogo", Category="Abarrotes",
+                       Units="Pza", Price=Decimal("10.00"), Stock=Decimal(20), Min_Stock=Decimal(1))
+    db.add(producto)
+    db.commit()
+    product_id = producto.Id
+    db.close()
+    return product_id
+
+
+PRODUCT_ID = preparar()
+
+
+def cambiar_en_bd(**valores):
+    """Cambio hecho por fuera del caché (otra sesión)"""
+    db = SessionLocal()
+    db.execute(update(Product).where(Product.Id == PRODUCT_ID).values(**valores))
+    db.commit()
+    db.close()
+
+
+def consultas(funcion) -> tuple:
+    """(resultado, número de sentencias SQL que emitió)"""
+    with ContadorConsultas() as sentencias:
+        resultado = funcion()
+    return resultado, len(sentencias)
+
+
+def test_acierto_sin_sql_y_descarte_por_producto():
+    cache = CatalogCache()
+    db = SessionLocal()
+    cache.get_by_code(db, "CC1")
+    db.close()
+
+    db = SessionLocal()
+    producto, sql = consultas(lambda: cache.get_by_barcode(db, "750CC1"))
+    assert sql == 0 and producto.Id == PRODUCT_ID
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    db.close()
+
+    # Movimiento de stock: solo se descarta ese producto
+    cambiar_en_bd(Stock=Decimal(7))
+    cache.discard([PRODUCT_ID])
+    db = SessionLocal()
+    producto, sql = consultas(lambda: cache.get_by_id(db, PRODUCT_ID))
+    assert sql == 1 and producto.Stock == 7
+    db.close()
+
+
+def test_version_invalida_todo_el_catalogo():
+    cache = CatalogCache()
+    db = SessionLocal()
+    cache.get_by_id(db, PRODUCT_ID)
+    db.close()
+
+    cambiar_en_bd(Price=Decimal("12.50"))
+    version = cache.bump_version()
+    assert cache.stats()["version"] == version == 1 and cache.stats()["entries"] == 0
+
+    db = SessionLocal()
+    assert cache.get_by_code(db, "CC1").Price == Decimal("12.50")
+    db.close()
+
+
+def test_ttl_vence_las_entradas():
+    cache = CatalogCache(ttl_seconds=0.05)
+    db = SessionLocal()
+    cache.get_by_id(db, PRODUCT_ID)
+    cambiar_en_bd(Product="Catálogo renombrado")
+    time.sleep(0.1)
+    producto, sql = consultas(lambda: cache.get_by_id(db, PRODUCT_ID))
+    assert sql == 1 and producto.Product == "Catálogo renombrado"
+    db.close()
+
+
+def test_copia_del_cache_no_pisa_la_sesion():
+    cache = CatalogCache()
+    db = SessionLocal()
+    cache.get_by_id(db, PRODUCT_ID)
+    db.close()
+
+    # La entrada queda vieja; la sesión carga la fila actual
+    cambiar_en_bd(Stock=Decimal(3))
+    db = SessionLocal()
+    cargado = db.get(Product, PRODUCT_ID)
+    desde_cache = cache.get_by_id(db, PRODUCT_ID)
+    assert desde_cache is cargado and cargado.Stock == 3
+
+    # Sin la fila en la sesión, la copia se adjunta sin SQL y sin cambios pendientes
+    db.expunge(cargado)
+    producto, sql = consultas(lambda: cache.get_by_id(db, PRODUCT_ID))
+    assert sql == 0 and producto in db and not db.dirty
+    db.close()
+
+
+if __name__ == "__main__":
+    test_acierto_sin_sql_y_descarte_por_producto()
+    test_version_invalida_todo_el_catalogo()
+    test_ttl_vence_las_entradas()
+    test_copia_del_cache_no_pisa_la_sesion()
+    print("✅ Caché del catálogo: aciertos, versión, descarte, TTL y estado de la sesión")
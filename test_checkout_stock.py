@@ -0,0 +1,200 @@
+"""
+Prueba del descuento de stock del checkout (crud_tickets).
+
+El UPDATE ... WHERE Stock >= cantidad no deja el stock en negativo aunque
+la validación haya leído un stock que ya cambió, el error 400 describe
+cada línea fallida (failed_lines) y, con dos carritos compitiendo por las
+últimas piezas, exactamente uno se cobra.
+
+    python test_checkout_stock.py
+    python -m pytest test_checkout_stock.py
+"""
+import os
+import tempfile
+import threading
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "checkout_stock.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-stock-" + "x" * 32)
+
+import pytest
+from fastapi import HTTPException
+
+import crud
+import crud_tickets
+from app.core.metrics import metrics
+from database import Base, SessionLocal, engine
+from models import Cart, CartItem, Product
+from schemas import CreateTicketRequest
+
+
+def preparar() -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_id = crud.create_user(db, "cajero_stock", "1234").ID
+    db.close()
+    return user_id
+
+
+USER_ID = preparar()
+
+
+def crear_producto(code: str, stock: int) -> int:
+    db = SessionLocal()
+    producto = Product(Code=code, Barcode=f"750{code}", Product=f"Stock {code}", Category="Abarrotes",
+                       Units="Pza", Price=Decimal("10.00"), Stock=Decimal(stock), Min_Stock=Decimal(1))
+    db.add(producto)
+    db.commit()
+    product_id = producto.Id
+    db.close()
+    return product_id
+
+
+def crear_carrito(lineas: list[tuple[int, int]]) -> int:
+    """Carrito abierto con (product_id, cantidad) por línea"""
+    db = SessionLocal()
+    cart = Cart(status="open", user_id=USER_ID)
+    cart.items = [
+        CartItem(product_id=product_id, product_name=f"Producto {product_id}", price=Decimal("10.00"),
+                 quantity=Decimal(cantidad), subtotal=Decimal("10.00") * cantidad)
+        for product_id, cantidad in lineas
+    ]
+    cart.total = sum(item.subtotal for item in cart.items)
+    cart.item_count = len(cart.items)
+    db.add(cart)
+    db.commit()
+    cart_id = cart.id
+    db.close()
+    return cart_id
+
+
+def cobrar(cart_id: int):
+    db = SessionLocal()
+    try:
+        return crud_tickets.crear_ticket(db, CreateTicketRequest(CartId=cart_id, PaymentMethod="card"), USER_ID)
+    finally:
+        db.close()
+
+
+def stock(product_id: int) -> Decimal:
+    db = SessionLocal()
+    valor = db.query(Product.Stock).filter(Product.Id == product_id).scalar()
+    db.close()
+    return Decimal(valor)
+
+
+def estado(cart_id: int) -> str:
+    db = SessionLocal()
+    valor = db.query(Cart.status).filter(Cart.id == cart_id).scalar()
+    db.close()
+    return valor
+
+
+def fallos(reason: str) -> float:
+    return metrics.checkout_failures.collect().get((reason,), 0)
+
+
+def test_update_condicional_solo_descuenta_con_stock():
+    suficiente = crear_producto("SK1", 5)
+    escaso = crear_producto("SK2", 1)
+
+    db = SessionLocal()
+    sin_stock = crud_tickets._descontar_stock(db, {suficiente: Decimal(3), escaso: Decimal(2)})
+    assert sin_stock == {escaso}
+    db.rollback()
+    db.close()
+    assert (stock(suficiente), stock(escaso)) == (5, 1)
+
+    db = SessionLocal()
+    assert crud_tickets._descontar_stock(db, {suficiente: Decimal(5)}) == set()
+    db.commit()
+    db.close()
+    assert stock(suficiente) == 0
+
+
+def test_failed_lines_describe_cada_linea():
+    con_stock = crear_producto("SK3", 10)
+    escaso = crear_producto("SK4", 2)
+    inexistente = con_stock + 100000
+    cart_id = crear_carrito([(con_stock, 1), (escaso, 3), (inexistente, 1)])
+    antes = {reason: fallos(reason) for reason in ("insufficient_stock", "not_found")}
+
+    with pytest.raises(HTTPException) as error:
+        cobrar(cart_id)
+
+    assert error.value.status_code == 400
+    lineas = {linea["product_id"]: linea for linea in error.value.detail["failed_lines"]}
+    assert set(lineas) == {escaso, inexistente}
+    assert (lineas[escaso]["reason"], lineas[escaso]["requested"], lineas[escaso]["available"]) == (
+        "insufficient_stock", 3, 2
+    )
+    assert (lineas[inexistente]["reason"], lineas[inexistente]["available"]) == ("not_found", None)
+    assert "2 línea(s)" in error.value.detail["message"]
+    assert (stock(con_stock), stock(escaso), estado(cart_id)) == (10, 2, "open")
+
+    # Cada motivo presente cuenta una vez; solo "no encontrado" no cuenta como falta de stock
+    assert fallos("insufficient_stock") == antes["insufficient_stock"] + 1
+    assert fallos("not_found") == antes["not_found"] + 1
+    solo_inexistente = crear_carrito([(inexistente, 1)])
+    with pytest.raises(HTTPException):
+        cobrar(solo_inexistente)
+    assert fallos("insufficient_stock") == antes["insufficient_stock"] + 1
+    assert fallos("not_found") == antes["not_found"] + 2
+
+
+def test_lectura_vieja_no_deja_stock_negativo():
+    producto = crear_producto("SK5", 4)
+    primero = crear_carrito([(producto, 3)])
+    segundo = crear_carrito([(producto, 3)])
+    cobrar(primero)
+
+    # La validación vio 4 piezas (como si leyera antes que el primer cobro):
+    # el UPDATE condicional es el que rechaza la venta
+    validar = crud_tickets._validar_stock
+    crud_tickets._validar_stock = lambda *args: []
+    try:
+        with pytest.raises(HTTPException) as error:
+            cobrar(segundo)
+    finally:
+        crud_tickets._validar_stock = validar
+
+    assert error.value.status_code == 400
+    assert [linea["reason"] for linea in error.value.detail["failed_lines"]] == ["insufficient_stock"]
+    assert (stock(producto), estado(segundo)) == (1, "open")
+
+
+def test_dos_carritos_por_las_ultimas_piezas():
+    producto = crear_producto("SK6", 4)
+    carritos = [crear_carrito([(producto, 3)]) for _ in range(2)]
+    salida = threading.Barrier(len(carritos))
+    resultados = {}
+
+    def intentar(cart_id):
+        salida.wait()
+        try:
+            cobrar(cart_id)
+            resultados[cart_id] = 201
+        except HTTPException as error:
+            resultados[cart_id] = error.status_code
+
+    hilos = [threading.Thread(target=intentar, args=(cart_id,)) for cart_id in carritos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(resultados.values()) == [201, 400]
+    assert stock(producto) == 1
+    assert sorted(estado(cart_id) for cart_id in carritos) == ["completed", "open"]
+
+
+if __name__ == "__main__":
+    test_update_condicional_solo_descuenta_con_stock()
+    print("✅ UPDATE ... WHERE Stock >= cantidad solo descuenta con stock suficiente")
+    test_failed_lines_describe_cada_linea()
+    print("✅ failed_lines describe cada línea y el motivo cuenta en las métricas")
+    test_lectura_vieja_no_deja_stock_negativo()
+    print("✅ Una validación con stock viejo no deja el stock en negativo")
+    test_dos_carritos_por_las_ultimas_piezas()
+    print("✅ Dos carritos por las últimas piezas: exactamente uno se cobra")
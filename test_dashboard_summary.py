@@ -0,0 +1,143 @@
+"""
+Prueba de las consultas en paralelo del resumen del dashboard
+(app.routes.dashboard._run_concurrently).
+
+En paralelo dan los mismos resultados que una tras otra sobre la misma
+sesión, y con debug=true el resumen agrega timings_ms con el tiempo de
+cada consulta y el total.
+
+    python test_dashboard_summary.py
+    python -m pytest test_dashboard_summary.py
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIR, 'dashboard_summary.db')}"
+os.environ.setdefault("SECRET_KEY", "prueba-dashboard-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import crud_rollups
+import main
+from app.core.response_cache import response_cache
+from app.repositories.product_repository import ProductRepository
+from app.routes import dashboard
+from database import Base, get_db
+from models import Product, SaleTicket, SalesRollupHourly
+
+# BD propia: el resumen suma todas las ventas y todo el inventario
+engine = create_engine(f"sqlite:///{os.path.join(DIR, 'resumen.db')}")
+ResumenSession = sessionmaker(bind=engine)
+
+CONSULTAS = {"current_sales", "previous_sales", "payment_methods", "inventory"}
+
+
+def preparar() -> None:
+    Base.metadata.create_all(bind=engine)
+    ahora = datetime.utcnow()
+    with ResumenSession() as db:
+        crud.create_user(db, "gerente_resumen", "1234", role="admin")
+        db.add_all([
+            Product(Code=f"DS{i}", Barcode=f"750DS{i}", Product=f"Producto {i}", Category=f"Categoría {i % 3}",
+                    Units="Pza", Price=Decimal("10.00"), Stock=Decimal(i), Min_Stock=Decimal(3))
+            for i in range(8)
+        ])
+        # Ventas de hoy hacia atrás, dentro y fuera de cada período
+        db.execute(insert(SaleTicket), [
+            {"ticket_number": f"DS-{i}", "cart_id": i + 1, "user_id": 1,
+             "subtotal": Decimal(10 + i), "total": Decimal(10 + i),
+             "payment_method": ("cash", "card", "transfer")[i % 3],
+             "status": "cancelled" if i % 5 == 0 else "completed",
+             "created_at": ahora - timedelta(hours=7 * i)}
+            for i in range(160)
+        ])
+        db.commit()
+        crud_rollups.reconstruir_rollups(db)
+
+
+preparar()
+
+
+def get_db_resumen():
+    db = ResumenSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def secuencial(db, queries):
+    """Las mismas consultas una tras otra sobre la sesión de la petición"""
+    return {name: query(db) for name, query in queries.items()}, {}
+
+
+def resumenes(period: str, debug: bool = False) -> dict:
+    """Resumen en paralelo y en secuencia (sin caché ni generated_at)"""
+    main.app.dependency_overrides[get_db] = get_db_resumen
+    try:
+        client = TestClient(main.app)
+        token = client.post("/users/login", json={"Username": "gerente_resumen", "Password": "1234"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        params = {"period": period, "debug": debug}
+
+        response_cache.clear()
+        paralelo = client.get("/dashboard/summary", params=params, headers=headers).json()
+        response_cache.clear()
+        en_paralelo = dashboard._run_concurrently
+        dashboard._run_concurrently = secuencial
+        try:
+            en_secuencia = client.get("/dashboard/summary", params=params, headers=headers).json()
+        finally:
+            dashboard._run_concurrently = en_paralelo
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+        response_cache.clear()
+
+    for resumen in (paralelo, en_secuencia):
+        resumen.pop("generated_at")
+    return paralelo, en_secuencia
+
+
+def test_paralelo_igual_que_secuencial():
+    with ResumenSession() as db:
+        queries = {
+            "tickets": lambda s: s.query(func.count(SaleTicket.id)).scalar(),
+            "por_metodo": lambda s: sorted(s.query(
+                SalesRollupHourly.payment_method, func.sum(SalesRollupHourly.total)
+            ).group_by(SalesRollupHourly.payment_method).all()),
+            "inventory": lambda s: ProductRepository(s).get_inventory_stats(top=3),
+        }
+        resultados, tiempos = dashboard._run_concurrently(db, queries)
+        assert resultados == secuencial(db, queries)[0]
+        assert resultados["tickets"] == 160
+        assert set(tiempos) == set(queries) | {"total"}
+
+    for period in ("today", "week", "month", "year"):
+        paralelo, en_secuencia = resumenes(period)
+        assert paralelo == en_secuencia
+        assert "timings_ms" not in paralelo
+    assert paralelo["transactions"]["total"] == 128
+    assert paralelo["inventory"] == {"total_products": 8, "low_stock_items": 4, "stock_health": 50.0}
+
+
+def test_debug_agrega_timings_ms():
+    paralelo, _ = resumenes("month", debug=True)
+    tiempos = paralelo.pop("timings_ms")
+    assert set(tiempos) == CONSULTAS | {"total"}
+    assert all(isinstance(ms, float) and ms >= 0 for ms in tiempos.values())
+    # El total abarca a todas las consultas
+    assert tiempos["total"] >= max(tiempos[name] for name in CONSULTAS)
+    assert paralelo == resumenes("month")[0]
+
+
+if __name__ == "__main__":
+    test_paralelo_igual_que_secuencial()
+    print("✅ Las consultas en paralelo dan lo mismo que en secuencia")
+    test_debug_agrega_timings_ms()
+    print("✅ debug=true agrega timings_ms por consulta y el total")
@@ -0,0 +1,184 @@
+"""
+Prueba de los contadores de inventario en memoria (app.repositories.inventory_counters)
+con INVENTORY_COUNTERS activo.
+
+Un cobro o una edición de stock mete o saca el producto de low_stock vía
+mark_dirty sin recargar todo, un cambio de versión del catálogo sí recarga,
+y ProductRepository.get_inventory_stats responde lo mismo que la consulta
+agregada.
+
+    python test_inventory_counters.py
+    python -m pytest test_inventory_counters.py
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIR, 'inventory_counters.db')}"
+os.environ.setdefault("SECRET_KEY", "prueba-contadores-" + "x" * 32)
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+import crud
+import crud_tickets
+from app.repositories.catalog_cache import catalog_cache
+from app.repositories.inventory_counters import inventory_counters
+from app.repositories.product_repository import ProductRepository
+from database import Base
+from models import Cart, CartItem, Product
+from schemas import CreateTicketRequest
+
+# Inventario propio: los contadores suman todo el catálogo activo
+engine = create_engine(f"sqlite:///{os.path.join(DIR, 'inventario.db')}")
+
+CATALOGO = [
+    # (Code, Category, Stock, Min_Stock, Activo)
+    ("IC1", "Abarrotes", 5, 2, 1),
+    ("IC2", "Abarrotes", 1, 3, 1),
+    ("IC3", "Lácteos", 4, 4, 1),
+    ("IC4", "Lácteos", 20, 5, 1),
+    ("IC5", "Limpieza", 0, 2, 0),
+]
+
+
+def preparar() -> tuple[dict, int]:
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        productos = [
+            Product(Code=code, Barcode=f"750{code}", Product=f"Producto {code}", Category=categoria,
+                    Units="Pza", Price=Decimal("10.00"), Stock=Decimal(stock), Min_Stock=Decimal(minimo),
+                    Activo=activo)
+            for code, categoria, stock, minimo, activo in CATALOGO
+        ]
+        db.add_all(productos)
+        db.commit()
+        user_id = crud.create_user(db, "cajero_contadores", "1234").ID
+        return {p.Code: p.Id for p in productos}, user_id
+
+
+IDS, USER_ID = preparar()
+
+
+class Recargas:
+    """Cuenta las recargas completas de la instancia compartida"""
+
+    def __init__(self):
+        self.total = 0
+        self._original = inventory_counters._reload
+
+    def __call__(self, db):
+        self.total += 1
+        self._original(db)
+
+
+def setup_function():
+    inventory_counters.enabled = True
+    inventory_counters.ttl_seconds = 3600
+    inventory_counters._version = None
+    inventory_counters._reload = Recargas()
+
+
+def teardown_function():
+    del inventory_counters._reload
+    inventory_counters.enabled = False
+    inventory_counters._version = None
+
+
+def estadisticas(top: int = 10) -> dict:
+    """get_inventory_stats comparable: filas de stock bajo como tuplas"""
+    with Session(engine) as db:
+        stats = ProductRepository(db).get_inventory_stats(top)
+    stats["low_stock_products"] = [tuple(p) for p in stats["low_stock_products"]]
+    return stats
+
+
+def con_consulta_agregada(top: int = 10) -> dict:
+    inventory_counters.enabled = False
+    try:
+        return estadisticas(top)
+    finally:
+        inventory_counters.enabled = True
+
+
+def bajos() -> set[str]:
+    por_id = {v: k for k, v in IDS.items()}
+    return {por_id[p[0]] for p in estadisticas()["low_stock_products"]}
+
+
+def cobrar(product_id: int, cantidad: int) -> None:
+    with Session(engine) as db:
+        cart = Cart(status="open", user_id=USER_ID)
+        cart.items = [CartItem(product_id=product_id, product_name="Producto", price=Decimal("10.00"),
+                               quantity=Decimal(cantidad), subtotal=Decimal("10.00") * cantidad)]
+        cart.total = cart.items[0].subtotal
+        cart.item_count = 1
+        db.add(cart)
+        db.commit()
+        crud_tickets.crear_ticket(db, CreateTicketRequest(CartId=cart.id, PaymentMethod="cash"), USER_ID)
+
+
+def cambiar_stock(product_id: int, stock: int) -> None:
+    with Session(engine) as db:
+        crud.actualizar_stock(db, product_id, stock)
+
+
+def test_cobro_y_edicion_de_stock_sin_recargar():
+    assert bajos() == {"IC2", "IC3"}
+    assert inventory_counters._reload.total == 1
+
+    # Cobrar 3 de 5 deja IC1 en su mínimo: entra a stock bajo
+    cobrar(IDS["IC1"], 3)
+    assert bajos() == {"IC1", "IC2", "IC3"}
+    assert estadisticas() == con_consulta_agregada()
+
+    # Surtir IC2 lo saca
+    cambiar_stock(IDS["IC2"], 10)
+    assert bajos() == {"IC1", "IC3"}
+    assert estadisticas() == con_consulta_agregada()
+
+    assert inventory_counters._reload.total == 1
+    assert not inventory_counters._dirty
+
+
+def test_cambio_de_version_del_catalogo_recarga():
+    inicial = estadisticas()
+
+    # Un cambio sin mark_dirty (p. ej. otro proceso) no se ve hasta recargar
+    with Session(engine) as db:
+        db.execute(update(Product).where(Product.Id == IDS["IC4"]).values(Stock=Decimal(1)))
+        db.commit()
+    assert estadisticas() == inicial
+    assert inventory_counters._reload.total == 1
+
+    catalog_cache.bump_version()
+    actual = estadisticas()
+    assert inventory_counters._reload.total == 2
+    assert actual["low_stock"] == inicial["low_stock"] + 1
+    assert IDS["IC4"] in [p[0] for p in actual["low_stock_products"]]
+    assert actual == con_consulta_agregada()
+
+
+def test_igual_que_la_consulta_agregada():
+    for top in (10, 2, 0):
+        contadores = estadisticas(top)
+        assert contadores == con_consulta_agregada(top)
+    # Solo el catálogo activo: IC5 no cuenta ni su categoría
+    assert contadores["total"] == 4
+    assert contadores["categories"] == 2
+    assert contadores["low_stock_products"] == []
+
+
+if __name__ == "__main__":
+    for prueba, mensaje in (
+        (test_cobro_y_edicion_de_stock_sin_recargar, "Cobro y edición de stock actualizan low_stock sin recargar"),
+        (test_cambio_de_version_del_catalogo_recarga, "Un cambio de versión del catálogo recarga los contadores"),
+        (test_igual_que_la_consulta_agregada, "Los contadores coinciden con la consulta agregada"),
+    ):
+        setup_function()
+        try:
+            prueba()
+        finally:
+            teardown_function()
+        print(f"✅ {mensaje}")
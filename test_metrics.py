@@ -0,0 +1,146 @@
+"""
+Prueba del registro de métricas (app.core.metrics) y de /metrics.
+
+    python test_metrics.py
+    python -m pytest test_metrics.py
+"""
+import os
+import tempfile
+import threading
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "metrics.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-de-metricas-" + "x" * 32)
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+import crud_tickets
+from database import SessionLocal
+from schemas import CreateTicketRequest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as SATimeoutError
+from app.core.config import get_database_settings
+from app.core.metrics import Counter, Histogram, MetricsRegistry
+from database import create_db_engine, engine
+
+client = TestClient(main.app)
+
+
+def test_contadores_por_hilo_se_suman():
+    contador = Counter("prueba_total", "Prueba", labels=("reason",))
+
+    def trabajar():
+        for _ in range(10000):
+            contador.inc(reason="a")
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert contador.collect() == {("a",): 80000}
+    assert 'prueba_total{reason="a"} 80000' in contador.render()
+
+
+def test_histograma_acumulado():
+    histograma = Histogram("prueba_seconds", "Prueba", buckets=(0.1, 1.0))
+    for valor in (0.05, 0.5, 0.5, 3.0):
+        histograma.observe(valor)
+
+    lineas = histograma.render()
+    assert 'prueba_seconds_bucket{le="0.1"} 1' in lineas
+    assert 'prueba_seconds_bucket{le="1.0"} 3' in lineas
+    assert 'prueba_seconds_bucket{le="+Inf"} 4' in lineas
+    assert "prueba_seconds_count 4" in lineas
+
+
+def valor(texto: str, serie: str) -> float:
+    """Valor de una serie en el texto de /metrics (0 si aún no aparece)"""
+    for linea in texto.splitlines():
+        if linea.rsplit(" ", 1)[0] == serie:
+            return float(linea.rsplit(" ", 1)[1])
+    return 0
+
+
+def test_endpoint_metrics():
+    # Los contadores son del proceso: otras pruebas de la corrida también los mueven
+    series = (
+        'pos_http_request_duration_seconds_count{method="GET",route="/health",status="200"}',
+        "pos_carts_opened_total",
+        'pos_checkout_failures_total{reason="cart_not_found"}',
+    )
+    antes = client.get("/metrics").text
+
+    client.get("/health")
+    client.post("/api/pos/carts")
+
+    db = SessionLocal()
+    with pytest.raises(HTTPException):
+        crud_tickets.crear_ticket(db, CreateTicketRequest(CartId=999999, PaymentMethod="cash"), 1)
+    db.close()
+
+    respuesta = client.get("/metrics")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    texto = respuesta.text
+    for serie in series:
+        assert valor(texto, serie) == valor(antes, serie) + 1, serie
+    assert 'pos_db_pool_checkout_seconds_count{pool="sync"}' in texto
+    assert "# TYPE pos_db_pool_size gauge" in texto
+
+
+def test_pool_configurado_y_timeouts_contados():
+    assert engine.pool.size() == get_database_settings().DB_POOL_SIZE
+    assert create_db_engine(f"sqlite:///{DB_PATH}", pool_size=3).pool.size() == 3
+
+    pool_chico = create_engine(f"sqlite:///{DB_PATH}", pool_size=1, max_overflow=0, pool_timeout=0.05)
+    registro = MetricsRegistry()
+    registro.instrument_engine(pool_chico, slow_checkout_ms=10)
+
+    conexion = pool_chico.connect()
+    with pytest.raises(SATimeoutError):
+        pool_chico.connect()
+    conexion.close()
+
+    assert registro.pool_timeouts.collect() == {("sync",): 1}
+    assert 'pos_db_pool_checkout_seconds_count{pool="sync"} 2' in registro.render()
+    pool_chico.dispose()
+
+
+def test_dispose_conserva_la_instrumentacion():
+    pool_chico = create_engine(f"sqlite:///{DB_PATH}", pool_size=1, max_overflow=0, pool_timeout=0.05)
+    registro = MetricsRegistry()
+    registro.instrument_engine(pool_chico)
+    pool_chico.connect().close()
+
+    # dispose() crea un pool nuevo: se sigue midiendo y los gauges leen ese pool
+    pool_chico.dispose()
+    conexion = pool_chico.connect()
+    with pytest.raises(SATimeoutError):
+        pool_chico.connect()
+
+    texto = registro.render()
+    assert registro.pool_timeouts.collect() == {("sync",): 1}
+    assert 'pos_db_pool_checkout_seconds_count{pool="sync"} 3' in texto
+    assert 'pos_db_pool_checked_out{pool="sync"} 1' in texto
+    conexion.close()
+    assert 'pos_db_pool_checked_out{pool="sync"} 0' in registro.render()
+    pool_chico.dispose()
+
+
+if __name__ == "__main__":
+    test_contadores_por_hilo_se_suman()
+    print("✅ Los contadores por hilo se suman al exportar")
+    test_histograma_acumulado()
+    print("✅ Histograma con cubetas acumuladas, suma y conteo")
+    test_endpoint_metrics()
+    print("✅ /metrics en formato de texto de Prometheus")
+    test_pool_configurado_y_timeouts_contados()
+    print("✅ Pool configurado desde DB_* y timeouts de checkout contados")
+    test_dispose_conserva_la_instrumentacion()
+    print("✅ La instrumentación del pool sobrevive a engine.dispose()")
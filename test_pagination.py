@@ -0,0 +1,198 @@
+"""
+Prueba de la paginación por cursor (app.core.pagination.paginate_keyset) y de
+paginacion=cursor en tickets, cajas, retiros y /api/inventario/pagina.
+
+Recorrer todas las páginas con next_cursor regresa cada fila una vez y en
+orden, aun con varias filas en el mismo created_at; la última página trae
+next_cursor null y un cursor mal formado responde 422.
+
+    python test_pagination.py
+    python -m pytest test_pagination.py
+"""
+import base64
+import os
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIR, 'pagination.db')}"
+os.environ.setdefault("SECRET_KEY", "prueba-paginacion-" + "x" * 32)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import main
+from app.core.exceptions import ValidationError
+from app.core.pagination import decode_cursor, encode_cursor, paginate_keyset
+from database import Base, get_db
+from models import CashRegister, CashWithdrawal, Product, SaleTicket
+
+# BD propia: los recorridos comparan contra todas las filas de cada tabla
+engine = create_engine(f"sqlite:///{os.path.join(DIR, 'paginas.db')}")
+PaginaSession = sessionmaker(bind=engine)
+
+INICIO = datetime(2026, 3, 2, 9, 0, 0, 250000)
+
+
+def momentos(n: int) -> list[datetime]:
+    """Grupos de tres filas con el mismo instante (empates en created_at)"""
+    return [INICIO + timedelta(minutes=i // 3) for i in range(n)]
+
+
+def preparar() -> int:
+    Base.metadata.create_all(bind=engine)
+    with PaginaSession() as db:
+        user_id = crud.create_user(db, "gerente_paginas", "1234", role="admin").ID
+        db.execute(insert(CashRegister), [
+            {"user_id": user_id, "opened_at": momento, "status": "closed"}
+            for momento in momentos(13)
+        ])
+        caja = CashRegister(user_id=user_id, opened_at=INICIO - timedelta(days=1), status="open")
+        db.add(caja)
+        db.flush()
+        db.execute(insert(SaleTicket), [
+            {"ticket_number": f"PG-{i}", "cart_id": i + 1, "user_id": user_id, "subtotal": Decimal("10.00"),
+             "total": Decimal("10.00"), "payment_method": "cash", "status": "completed", "created_at": momento}
+            for i, momento in enumerate(momentos(23))
+        ])
+        db.execute(insert(CashWithdrawal), [
+            {"cash_register_id": caja.id, "user_id": user_id, "amount": Decimal("50.00"), "reason": "Pago",
+             "cash_before": Decimal("500.00"), "cash_after": Decimal("450.00"), "created_at": momento}
+            for momento in momentos(11)
+        ])
+        db.add_all([
+            Product(Code=f"PG{i}", Barcode=f"750PG{i}", Product=f"Producto {i}", Category="Abarrotes",
+                    Units="Pza", Price=Decimal("10.00"), Stock=Decimal(5), Min_Stock=Decimal(1),
+                    Activo=0 if i == 4 else 1)
+            for i in range(12)
+        ])
+        db.commit()
+        return user_id
+
+
+USER_ID = preparar()
+
+
+def get_db_paginas():
+    db = PaginaSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def esperado(modelo, fecha, **filtros) -> list[int]:
+    """Ids en el orden de la llave (fecha, id) descendente"""
+    with PaginaSession() as db:
+        filas = db.query(modelo.id, fecha).filter_by(**filtros).all()
+    return [id_ for id_, _ in sorted(filas, key=lambda f: (f[1], f[0]), reverse=True)]
+
+
+def recorrer_consulta(limit: int, descending: bool = True) -> tuple[list[int], int]:
+    ids, cursor, paginas = [], None, 0
+    with PaginaSession() as db:
+        while True:
+            filas, cursor = paginate_keyset(
+                db.query(SaleTicket), [SaleTicket.created_at, SaleTicket.id], cursor, limit, descending
+            )
+            ids += [t.id for t in filas]
+            paginas += 1
+            assert len(filas) == limit or cursor is None
+            if cursor is None:
+                return ids, paginas
+
+
+def test_paginate_keyset_recorre_sin_duplicados_ni_huecos():
+    todos = esperado(SaleTicket, SaleTicket.created_at)
+    for limit in (1, 3, 4, 5, 22, 23, 50):
+        ids, paginas = recorrer_consulta(limit)
+        assert ids == todos
+        # 23 filas exactas en 23 o en 1 página: sin página extra vacía
+        assert paginas == max(1, -(-len(todos) // limit))
+
+    ids, _ = recorrer_consulta(5, descending=False)
+    assert ids == todos[::-1]
+
+
+def test_ultima_pagina_sin_next_cursor():
+    with PaginaSession() as db:
+        filas, cursor = paginate_keyset(db.query(SaleTicket), [SaleTicket.created_at, SaleTicket.id], None, 23)
+        assert (len(filas), cursor) == (23, None)
+        vacia, cursor = paginate_keyset(
+            db.query(SaleTicket).filter(SaleTicket.status == "cancelled"),
+            [SaleTicket.created_at, SaleTicket.id]
+        )
+        assert (vacia, cursor) == ([], None)
+
+
+def test_cursor_mal_formado():
+    columnas = [SaleTicket.created_at, SaleTicket.id]
+    valido = encode_cursor([INICIO, 7])
+    assert decode_cursor(valido, columnas) == [INICIO, 7]
+
+    sin_fecha = base64.urlsafe_b64encode(b'["ayer", 7]').decode()
+    for cursor in ("no-es-base64!", "e30", encode_cursor([7]), encode_cursor(["x", "y", "z"]), sin_fecha):
+        with pytest.raises(ValidationError) as error:
+            decode_cursor(cursor, columnas)
+        assert error.value.status_code == 422
+
+
+def recorrer_ruta(client, ruta: str, clave: str, campo: str, headers: dict, **params) -> list[int]:
+    ids, cursor = [], None
+    while True:
+        if cursor:
+            params["cursor"] = cursor
+        pagina = client.get(ruta, params=params, headers=headers)
+        assert pagina.status_code == 200
+        cuerpo = pagina.json()
+        ids += [fila[campo] for fila in cuerpo[clave]]
+        cursor = cuerpo["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_rutas_con_paginacion_por_cursor():
+    main.app.dependency_overrides[get_db] = get_db_paginas
+    try:
+        client = TestClient(main.app)
+        token = client.post("/users/login", json={"Username": "gerente_paginas", "Password": "1234"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        por_cursor = {"paginacion": "cursor", "limit": 4}
+
+        tickets = recorrer_ruta(client, "/tickets/", "items", "id", headers, **por_cursor)
+        cajas = recorrer_ruta(client, "/cash-register/", "items", "register_id", headers, status="closed", **por_cursor)
+        retiros = recorrer_ruta(client, "/withdrawals/me/current", "withdrawals", "id", headers, **por_cursor)
+        productos = recorrer_ruta(client, "/api/inventario/pagina", "items", "Id", headers, limit=5)
+
+        invalidos = [
+            client.get("/tickets/", params={"paginacion": "cursor", "cursor": "roto"}, headers=headers),
+            client.get("/cash-register/", params={"paginacion": "cursor", "cursor": "roto"}, headers=headers),
+            client.get("/withdrawals/me/current", params={"paginacion": "cursor", "cursor": "roto"}, headers=headers),
+            client.get("/api/inventario/pagina", params={"cursor": "roto"}),
+        ]
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+
+    assert tickets == esperado(SaleTicket, SaleTicket.created_at)
+    assert cajas == esperado(CashRegister, CashRegister.opened_at, status="closed")
+    assert retiros == esperado(CashWithdrawal, CashWithdrawal.created_at)
+    with PaginaSession() as db:
+        activos = [id_ for (id_,) in db.query(Product.Id).filter(Product.Activo == 1).order_by(Product.Id)]
+    assert productos == activos and len(activos) == 11
+
+    assert [r.status_code for r in invalidos] == [422] * 4
+
+
+if __name__ == "__main__":
+    test_paginate_keyset_recorre_sin_duplicados_ni_huecos()
+    print("✅ paginate_keyset recorre todas las filas sin duplicados ni huecos, con empates")
+    test_ultima_pagina_sin_next_cursor()
+    print("✅ La última página trae next_cursor None")
+    test_cursor_mal_formado()
+    print("✅ Un cursor mal formado es un error de validación (422)")
+    test_rutas_con_paginacion_por_cursor()
+    print("✅ Tickets, cajas, retiros e inventario paginan por cursor")
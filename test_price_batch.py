@@ -0,0 +1,119 @@
+"""
+Prueba de la actualización de precios en lote (crud.actualizar_precios_en_lote).
+
+Un Id repetido ve el cambio anterior, los productos inactivos o inexistentes
+y los precios iguales se reportan por línea, y la lectura se parte en
+bloques de LOTE_PRECIOS Ids.
+
+    python test_price_batch.py
+    python -m pytest test_price_batch.py
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "price_batch.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+import crud
+from contador_consultas import ContadorConsultas
+from database import Base, SessionLocal, engine
+from models import PriceHistory, Product
+
+
+def crear_productos(prefijo: str, cantidad: int, activo: int = 1) -> list[int]:
+    """Productos con códigos propios: en una corrida completa la BD es compartida"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    productos = [
+        Product(Code=f"{prefijo}{i}", Barcode=f"750{prefijo}{i}", Product=f"Precio {prefijo}{i}",
+                Category="Abarrotes", Units="Pza", Price=Decimal("10.00"), Stock=Decimal(5),
+                Min_Stock=Decimal(1), Activo=activo)
+        for i in range(cantidad)
+    ]
+    db.add_all(productos)
+    db.commit()
+    ids = [p.Id for p in productos]
+    db.close()
+    return ids
+
+
+def precios_e_historial(ids: list[int]) -> tuple[dict, list]:
+    db = SessionLocal()
+    precios = dict(db.query(Product.Id, Product.Price).filter(Product.Id.in_(ids)))
+    historial = [
+        (h.product_id, h.old_price, h.new_price, h.reason)
+        for h in db.query(PriceHistory).filter(PriceHistory.product_id.in_(ids)).order_by(PriceHistory.id)
+    ]
+    db.close()
+    return precios, historial
+
+
+def actualizar(items: list[dict]) -> list[dict]:
+    db = SessionLocal()
+    try:
+        return crud.actualizar_precios_en_lote(db, items)
+    finally:
+        db.close()
+
+
+def test_repetidos_inactivos_inexistentes_e_iguales():
+    activo, otro = crear_productos("PLA", 2)
+    (inactivo,) = crear_productos("PLI", 1, activo=0)
+    inexistente = max(activo, otro, inactivo) + 1000
+
+    resultados = actualizar([
+        {"Id": activo, "Price": "12.00", "Reason": "primero"},
+        {"Id": activo, "Price": "15.50", "Reason": "segundo"},
+        {"Id": activo, "Price": "15.50"},
+        {"Id": otro, "Price": "10"},
+        {"Id": inactivo, "Price": "20.00"},
+        {"Id": inexistente, "Price": "20.00"},
+        {"Id": otro, "Price": "-1"},
+    ])
+
+    assert [(r["Id"], r["Success"], r["Error"]) for r in resultados] == [
+        (activo, True, None),
+        (activo, True, None),
+        # Igual al precio que dejó la línea anterior, no al de la BD
+        (activo, False, "El nuevo precio es igual al actual"),
+        (otro, False, "El nuevo precio es igual al actual"),
+        (inactivo, False, "Producto inactivo"),
+        (inexistente, False, "Producto no encontrado"),
+        (otro, False, "Precio no puede ser negativo"),
+    ]
+    assert [r["NewPrice"] for r in resultados[:2]] == [Decimal("12.00"), Decimal("15.50")]
+
+    precios, historial = precios_e_historial([activo, otro, inactivo])
+    assert precios == {activo: Decimal("15.50"), otro: Decimal("10.00"), inactivo: Decimal("10.00")}
+    # Cada cambio registra el precio que dejó el anterior
+    assert historial == [
+        (activo, Decimal("10.00"), Decimal("12.00"), "primero"),
+        (activo, Decimal("12.00"), Decimal("15.50"), "segundo"),
+    ]
+
+
+def test_lectura_por_bloques_de_lote_precios():
+    ids = crear_productos("PLB", 5)
+    original = crud.LOTE_PRECIOS
+    crud.LOTE_PRECIOS = 2
+    try:
+        with ContadorConsultas() as consultas:
+            resultados = actualizar([{"Id": pid, "Price": f"{11 + n}.00"} for n, pid in enumerate(ids)])
+    finally:
+        crud.LOTE_PRECIOS = original
+    lecturas = [statement for statement, _ in consultas.selects() if '"Master_Data"' in statement]
+
+    # 5 Ids en bloques de 2: tres lecturas, y ningún producto se queda sin leer
+    assert len(lecturas) == 3
+    assert all(r["Success"] for r in resultados)
+    precios, historial = precios_e_historial(ids)
+    assert precios == {pid: Decimal(f"{11 + n}.00") for n, pid in enumerate(ids)}
+    assert len(historial) == 5
+
+
+if __name__ == "__main__":
+    test_repetidos_inactivos_inexistentes_e_iguales()
+    print("✅ Precios en lote: Ids repetidos, inactivos, inexistentes e iguales")
+    test_lectura_por_bloques_de_lote_precios()
+    print("✅ Precios en lote: lectura por bloques de LOTE_PRECIOS")
@@ -0,0 +1,167 @@
+"""
+Prueba de la exportación del catálogo y del historial de precios
+(crud.exportar_productos / exportar_historial_precios y las rutas
+/api/precios/exportar y /api/precios/historial/exportar).
+
+Encabezado y filas del CSV, una línea JSON por fila en NDJSON, el filtro
+desde del historial y el envío por bloques de LOTE_EXPORTACION filas.
+
+    python test_price_export.py
+    python -m pytest test_price_export.py
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+
+DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIR, 'price_export.db')}"
+os.environ.setdefault("SECRET_KEY", "prueba-exportacion-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import main
+from database import Base, get_db
+from models import PriceHistory, Product
+
+# Catálogo propio: la exportación recorre todas las filas
+engine = create_engine(f"sqlite:///{os.path.join(DIR, 'exportacion.db')}")
+ExportSession = sessionmaker(bind=engine)
+
+CATALOGO = [
+    # (Code, Product, Price, Activo)
+    ("EX1", "Café, molido", "45.50", 1),
+    ("EX2", 'Leche "entera"', "23.00", 1),
+    ("EX3", "Jabón", "18.75", 0),
+]
+CAMBIOS = [
+    # (Code, old_price, new_price, reason, changed_at)
+    ("EX1", "40.00", "42.00", "Proveedor", datetime(2026, 1, 5, 9, 30)),
+    ("EX1", "42.00", "45.50", None, datetime(2026, 2, 1, 12, 0)),
+    ("EX2", "21.00", "23.00", "Ajuste", datetime(2026, 2, 3, 8, 15)),
+]
+
+
+def preparar() -> dict:
+    Base.metadata.create_all(bind=engine)
+    with ExportSession() as db:
+        productos = [
+            Product(Code=code, Barcode=f"750{code}", Product=nombre, Category="Abarrotes", Units="Pza",
+                    Price=Decimal(precio), Stock=Decimal(7), Min_Stock=Decimal(2), Activo=activo)
+            for code, nombre, precio, activo in CATALOGO
+        ]
+        db.add_all(productos)
+        db.flush()
+        ids = {p.Code: p.Id for p in productos}
+        db.execute(insert(PriceHistory), [
+            {"product_id": ids[code], "old_price": Decimal(antes), "new_price": Decimal(despues),
+             "reason": motivo, "changed_at": momento}
+            for code, antes, despues, motivo, momento in CAMBIOS
+        ])
+        db.commit()
+        return ids
+
+
+IDS = preparar()
+
+
+def get_db_exportacion():
+    db = ExportSession()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def exportar(funcion, *args) -> str:
+    with ExportSession() as db:
+        return "".join(funcion(db, *args))
+
+
+def test_csv_del_catalogo():
+    filas = list(csv.reader(io.StringIO(exportar(crud.exportar_productos, "csv"))))
+    assert filas[0] == list(crud.COLUMNAS_PRODUCTO)
+    # Solo activos, en orden de Id; comas y comillas quedan escapadas
+    assert filas[1:] == [
+        [str(IDS["EX1"]), "EX1", "750EX1", "Café, molido", "Abarrotes", "Pza", "45.50", "7.0000", "2.0000"],
+        [str(IDS["EX2"]), "EX2", "750EX2", 'Leche "entera"', "Abarrotes", "Pza", "23.00", "7.0000", "2.0000"],
+    ]
+
+
+def test_ndjson_del_historial():
+    lineas = exportar(crud.exportar_historial_precios, "ndjson").splitlines()
+    registros = [json.loads(linea) for linea in lineas]
+    assert [list(r) for r in registros] == [list(crud.COLUMNAS_HISTORIAL)] * len(CAMBIOS)
+    assert registros[0] == {
+        "id": registros[0]["id"], "product_id": IDS["EX1"], "old_price": "40.00", "new_price": "42.00",
+        "reason": "Proveedor", "changed_at": "2026-01-05T09:30:00"
+    }
+    assert [r["reason"] for r in registros] == [c[3] for c in CAMBIOS]
+
+
+def test_filtro_desde_del_historial():
+    desde = datetime(2026, 2, 1, 12, 0)
+    filas = list(csv.reader(io.StringIO(exportar(crud.exportar_historial_precios, "csv", desde))))
+    assert filas[0] == list(crud.COLUMNAS_HISTORIAL)
+    # El límite es inclusivo
+    assert [(f[2], f[3], f[5]) for f in filas[1:]] == [
+        ("42.00", "45.50", "2026-02-01T12:00:00"),
+        ("21.00", "23.00", "2026-02-03T08:15:00"),
+    ]
+    assert exportar(crud.exportar_historial_precios, "ndjson", datetime(2027, 1, 1)) == ""
+
+
+def test_bloques_de_exportacion():
+    lote = crud.LOTE_EXPORTACION
+    crud.LOTE_EXPORTACION = 2
+    try:
+        with ExportSession() as db:
+            bloques = list(crud.exportar_historial_precios(db, "csv"))
+    finally:
+        crud.LOTE_EXPORTACION = lote
+    # Encabezado solo, un bloque de 2 filas y el resto
+    assert [len(b.splitlines()) for b in bloques] == [1, 2, 1]
+
+
+def test_rutas_de_exportacion():
+    main.app.dependency_overrides[get_db] = get_db_exportacion
+    try:
+        client = TestClient(main.app)
+        catalogo = client.get("/api/precios/exportar")
+        historial = client.get(
+            "/api/precios/historial/exportar", params={"formato": "ndjson", "desde": "2026-02-02T00:00:00"}
+        )
+        invalido = client.get("/api/precios/exportar", params={"formato": "xml"})
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+
+    assert catalogo.status_code == 200
+    assert catalogo.headers["content-type"] == "text/csv; charset=utf-8"
+    assert catalogo.headers["content-disposition"] == 'attachment; filename="catalogo.csv"'
+    assert catalogo.text == exportar(crud.exportar_productos, "csv")
+
+    assert historial.status_code == 200
+    assert historial.headers["content-type"] == "application/x-ndjson"
+    assert historial.headers["content-disposition"] == 'attachment; filename="historial_precios.ndjson"'
+    assert [json.loads(l)["reason"] for l in historial.text.splitlines()] == ["Ajuste"]
+
+    assert invalido.status_code == 422
+
+
+if __name__ == "__main__":
+    test_csv_del_catalogo()
+    print("✅ CSV del catálogo: encabezado y filas de productos activos")
+    test_ndjson_del_historial()
+    print("✅ NDJSON del historial: un objeto por línea")
+    test_filtro_desde_del_historial()
+    print("✅ Filtro desde del historial")
+    test_bloques_de_exportacion()
+    print("✅ Envío por bloques de LOTE_EXPORTACION filas")
+    test_rutas_de_exportacion()
+    print("✅ Rutas de exportación: tipo de contenido, nombre de archivo y formato")
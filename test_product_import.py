@@ -0,0 +1,74 @@
+"""
+Prueba de la importación de productos por lotes (ProductService.import_products).
+
+    python test_product_import.py
+    python -m pytest test_product_import.py
+"""
+import io
+import os
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "product_import.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from database import Base, SessionLocal, engine
+from models import Product
+from app.services.product_service import ProductService
+from app.services.product_import import iter_import_rows
+
+ENCABEZADO = "Code,Barcode,Product,Category,Units,Price,Stock,Min_Stock\n"
+
+
+def importar(texto: str, formato: str = "csv", **kwargs) -> dict:
+    db = SessionLocal()
+    try:
+        return ProductService(db).import_products(
+            iter_import_rows(io.StringIO(texto), formato), **kwargs
+        )
+    finally:
+        db.close()
+
+
+def test_alta_actualizacion_y_errores_por_linea():
+    Base.metadata.create_all(bind=engine)
+
+    # Lotes de 2 filas para pasar por varios commits; códigos con prefijo
+    # propio porque en una corrida completa la BD la comparten todas las pruebas
+    reporte = importar(ENCABEZADO + "".join([
+        "PIA1,PIB1,Arroz blanco,Abarrotes,Kg,25.50,10,2\n",
+        "PIA2,PIB2,Frijol negro,Abarrotes,Kg,30,10,2\n",
+        "PIA2,PIB9,Frijol repetido,Abarrotes,Kg,30,10,2\n",
+        "PIA3,PIB1,Barcode ajeno,Abarrotes,Kg,30,10,2\n",
+        "PIA4,PIB4,Precio negativo,Abarrotes,Kg,-1,10,2\n",
+        "PIA5,PIB5,Azúcar,Abarrotes,Kg,28,10,2\n",
+    ]), batch_size=2)
+
+    assert reporte["created"] == 3
+    assert [e["line"] for e in reporte["errors"]] == [4, 5, 6]
+
+    reporte = importar(ENCABEZADO + "PIA1,PIB1,Arroz integral,Abarrotes,Kg,27,10,2\n")
+    assert (reporte["created"], reporte["updated"]) == (0, 1)
+
+    db = SessionLocal()
+    arroz = db.query(Product).filter(Product.Code == "PIA1").one()
+    assert arroz.Product == "Arroz integral"
+    assert db.query(Product).filter(Product.Code.startswith("PIA")).count() == 3
+    db.close()
+
+
+def test_ndjson_sin_actualizar_existentes():
+    Base.metadata.create_all(bind=engine)
+
+    fila = '{"Code":"PIN1","Barcode":"PINB1","Product":"Leche","Category":"Lacteos","Units":"L","Price":22,"Stock":5,"Min_Stock":1}\n'
+    assert importar(fila, "ndjson")["created"] == 1
+
+    reporte = importar(fila + "{roto\n", "ndjson", update_existing=False)
+    assert reporte["created"] == reporte["updated"] == 0
+    assert reporte["failed"] == 2
+
+
+if __name__ == "__main__":
+    test_alta_actualizacion_y_errores_por_linea()
+    print("✅ Alta y actualización en lotes con errores por línea")
+    test_ndjson_sin_actualizar_existentes()
+    print("✅ NDJSON reporta duplicados y líneas inválidas")
@@ -0,0 +1,106 @@
+"""
+Prueba de la búsqueda de productos con el índice de trigramas en memoria
+(app.repositories.search_index), el respaldo de pg_trgm fuera de PostgreSQL.
+
+Acentos y mayúsculas, errores de captura, orden por relevancia (código o
+barcode exacto primero), solo productos activos, y que código y barcode
+coinciden completos o como subcadena, no por parecido.
+
+    python test_product_search.py
+    python -m pytest test_product_search.py
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIR, 'product_search.db')}"
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.repositories.search_index import NgramIndex, normalize_text
+from database import Base
+from models import Product
+
+# Catálogo propio: el índice del proceso refleja la BD compartida
+engine = create_engine(f"sqlite:///{os.path.join(DIR, 'catalogo.db')}")
+
+CATALOGO = [
+    # (Code, Barcode, Product, Activo)
+    ("C001", "7500001", "Pechuga de Pollo Ñandú", 1),
+    ("C002", "7500002", "Pechuga ahumada", 1),
+    ("C003", "7500003", "Leche Entera", 1),
+    ("C004", "7500004", "Café Molido", 1),
+    ("C005", "7500005", "Café Soluble", 0),
+    ("CAFE", "7500006", "Granos tostados", 1),
+]
+
+
+def preparar() -> dict:
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        productos = [
+            Product(Code=code, Barcode=barcode, Product=nombre, Category="Abarrotes", Units="Pza",
+                    Price=Decimal("10.00"), Stock=Decimal(5), Min_Stock=Decimal(1), Activo=activo)
+            for code, barcode, nombre, activo in CATALOGO
+        ]
+        db.add_all(productos)
+        db.commit()
+        return {p.Code: p.Id for p in productos}
+
+
+IDS = preparar()
+
+
+def buscar(texto: str) -> list[str]:
+    """Códigos encontrados, en orden de relevancia"""
+    por_id = {v: k for k, v in IDS.items()}
+    with Session(engine) as db:
+        return [por_id[product_id] for product_id, _ in NgramIndex().search(db, texto)]
+
+
+def test_ignora_acentos_y_mayusculas():
+    assert normalize_text("  Pechuga  ÑANDÚ ") == "pechuga nandu"
+    assert buscar("PECHUGA NANDU")[0] == "C001"
+    assert buscar("pollo ñandú")[0] == "C001"
+    assert "C004" in buscar("CAFÉ molido")
+
+
+def test_tolera_errores_de_captura():
+    assert buscar("leche entra") == ["C003"]
+    assert set(buscar("pechga")) == {"C001", "C002"}
+    assert buscar("xyzw") == []
+
+
+def test_codigo_y_barcode_exactos_primero():
+    # "cafe" es el código de un producto y parte del nombre de otro
+    assert buscar("cafe") == ["CAFE", "C004"]
+    assert buscar("7500006")[0] == "CAFE"
+
+
+def test_codigo_y_barcode_no_coinciden_por_parecido():
+    # Comparten el prefijo "750" y "C00", pero solo uno coincide
+    assert buscar("7500003") == ["C003"]
+    assert buscar("C004") == ["C004"]
+    # Como subcadena sí coinciden, igual que contains() en PostgreSQL
+    assert set(buscar("75000")) == {"C001", "C002", "C003", "C004", "CAFE"}
+
+
+def test_solo_productos_activos():
+    assert "C005" not in buscar("cafe soluble")
+    assert buscar("7500005") == []
+    assert buscar("C005") == []
+
+
+if __name__ == "__main__":
+    test_ignora_acentos_y_mayusculas()
+    print("✅ Búsqueda sin acentos ni mayúsculas")
+    test_tolera_errores_de_captura()
+    print("✅ Búsqueda tolerante a errores de captura")
+    test_codigo_y_barcode_exactos_primero()
+    print("✅ Código o barcode exacto primero")
+    test_codigo_y_barcode_no_coinciden_por_parecido()
+    print("✅ Código y barcode: exacto o subcadena, sin parecido")
+    test_solo_productos_activos()
+    print("✅ Solo productos activos")
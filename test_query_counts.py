@@ -0,0 +1,143 @@
+"""
+Prueba del número de consultas SQL por endpoint (N+1).
+
+Cada endpoint de tickets, retiros y cajas debe emitir un número fijo de
+sentencias sin importar cuántos renglones regresa: se mide con pocos
+datos, se agregan más tickets y retiros (de otros cajeros) y se vuelve
+a medir contra el mismo límite.
+
+    python test_query_counts.py
+    python -m pytest test_query_counts.py
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "query_counts.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-de-consultas-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+
+import main
+from contador_consultas import max_consultas
+from database import SessionLocal
+from models import Product
+from schemas import CreateTicketRequest, CreateWithdrawalRequest, OpenCashRegisterRequest
+import crud
+import crud_cash_register
+import crud_tickets
+import crud_withdrawals
+
+client = TestClient(main.app)
+
+
+def verificar_consultas(metodo: str, url: str, limite: int, **kwargs):
+    """Llama al endpoint y falla si emite más de `limite` sentencias"""
+    with max_consultas(limite, f"{metodo} {url}"):
+        respuesta = client.request(metodo, url, headers=ESTADO["headers"], **kwargs)
+    assert respuesta.status_code < 300, respuesta.text
+    return respuesta
+
+
+ESTADO = {}
+
+
+def preparar():
+    """Administrador con caja abierta, productos y un primer lote de ventas"""
+    if ESTADO:
+        return
+    db = SessionLocal()
+    admin = crud.create_user(db, "admin_consultas", "admin123", "admin")
+    caja = crud_cash_register.abrir_caja(db, admin.ID, OpenCashRegisterRequest(InitialCash=Decimal("100000")))
+    productos = []
+    for i in range(5):
+        producto = Product(
+            Code=f"QC{i}", Barcode=f"QCB{i}", Product=f"Producto {i}", Category="Abarrotes",
+            Units="Pza", Price=Decimal(10 + i), Stock=Decimal(10000), Min_Stock=Decimal(1)
+        )
+        db.add(producto)
+        productos.append(producto)
+    db.commit()
+    caja_id, producto_ids = caja.id, [p.Id for p in productos]
+    db.close()
+
+    token = client.post(
+        "/users/login", json={"Username": "admin_consultas", "Password": "admin123"}
+    ).json()["access_token"]
+    ESTADO.update(
+        headers={"Authorization": f"Bearer {token}"},
+        caja_id=caja_id,
+        producto_ids=producto_ids,
+        cajeros=0
+    )
+    agregar_ventas(3)
+
+
+def agregar_ventas(cantidad: int):
+    """Tickets y retiros de cajeros distintos (cada uno es un usuario por cargar)"""
+    db = SessionLocal()
+    for _ in range(cantidad):
+        ESTADO["cajeros"] += 1
+        cajero = crud.create_user(db, f"cajero_qc_{ESTADO['cajeros']}", "1234")
+        cart = crud.crear_carrito(db, cajero.ID)
+        for product_id in ESTADO["producto_ids"][:3]:
+            crud.agregar_item(db, cart.id, db.get(Product, product_id), Decimal(1))
+        ticket = crud_tickets.crear_ticket(
+            db, CreateTicketRequest(CartId=cart.id, PaymentMethod="cash"), cajero.ID, ESTADO["caja_id"]
+        )
+        ESTADO["ticket"] = (ticket.id, ticket.ticket_number)
+        retiro = crud_withdrawals.crear_retiro(
+            db, ESTADO["caja_id"], cajero.ID, CreateWithdrawalRequest(Amount=Decimal(1), Reason="deposit")
+        )
+        ESTADO["retiro_id"] = retiro.id
+    db.close()
+
+
+def endpoints() -> list[tuple[str, str, int]]:
+    """(método, url, máximo de sentencias); el usuario autenticado cuenta como una"""
+    ticket_id, ticket_number = ESTADO["ticket"]
+    caja_id = ESTADO["caja_id"]
+    return [
+        ("GET", "/tickets/", 2),
+        ("GET", "/tickets/?paginacion=cursor", 2),
+        ("GET", f"/tickets/{ticket_id}", 3),
+        ("GET", f"/tickets/number/{ticket_number}", 3),
+        ("GET", "/tickets/reports/today", 3),
+        ("GET", "/withdrawals/me/current", 3),
+        ("GET", f"/withdrawals/{ESTADO['retiro_id']}", 2),
+        ("GET", f"/withdrawals/cash-register/{caja_id}/summary", 2),
+        ("GET", "/withdrawals/reports/today", 2),
+        ("GET", "/cash-register/", 2),
+        ("GET", f"/cash-register/{caja_id}/summary", 4),
+    ]
+
+
+def test_lecturas_con_consultas_fijas():
+    preparar()
+    for metodo, url, limite in endpoints():
+        verificar_consultas(metodo, url, limite)
+
+    # Diez veces más renglones, mismo límite
+    agregar_ventas(30)
+    for metodo, url, limite in endpoints():
+        verificar_consultas(metodo, url, limite)
+
+
+def test_crear_ticket_sin_lazy_loads():
+    preparar()
+    db = SessionLocal()
+    cart_id = crud.crear_carrito(db, 1).id
+    for product_id in ESTADO["producto_ids"]:
+        crud.agregar_item(db, cart_id, db.get(Product, product_id), Decimal(1))
+    db.close()
+
+    respuesta = verificar_consultas("POST", "/tickets/", 16, json={"CartId": cart_id, "PaymentMethod": "card"})
+    assert len(respuesta.json()["items"]) == len(ESTADO["producto_ids"])
+
+
+if __name__ == "__main__":
+    test_lecturas_con_consultas_fijas()
+    print("✅ Las lecturas de tickets, retiros y cajas emiten un número fijo de consultas")
+    test_crear_ticket_sin_lazy_loads()
+    print("✅ Crear un ticket no carga líneas ni cajero de forma perezosa")
@@ -0,0 +1,117 @@
+"""
+Prueba de las estadísticas de SQL por request (app.core.query_stats).
+
+    python test_query_stats.py
+    python -m pytest test_query_stats.py
+"""
+import json
+import logging
+import os
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "query_stats.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-de-estadisticas-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+
+import main
+import crud
+from app.core import query_stats
+from app.core.response_cache import response_cache
+from database import SessionLocal, engine
+
+client = TestClient(main.app)
+URL = "/api/inventario/resumen/estadisticas"
+
+
+class Capturar(logging.Handler):
+    """Guarda las líneas JSON del logger pos.sql"""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.lineas = []
+
+    def emit(self, record):
+        self.lineas.append(json.loads(record.getMessage()))
+
+    def __enter__(self):
+        query_stats.logger.addHandler(self)
+        query_stats.logger.setLevel(logging.DEBUG)
+        return self
+
+    def __exit__(self, *exc):
+        query_stats.logger.removeHandler(self)
+
+
+def test_headers_y_log_por_request():
+    query_stats.QUERY_STATS_HEADERS = True
+    try:
+        with Capturar() as log:
+            respuesta = client.get(URL)
+    finally:
+        query_stats.QUERY_STATS_HEADERS = False
+
+    assert respuesta.status_code == 200
+    assert int(respuesta.headers["X-DB-Statements"]) >= 1
+    assert float(respuesta.headers["X-DB-Time-Ms"]) >= float(respuesta.headers["X-DB-Slowest-Ms"])
+
+    linea = [l for l in log.lineas if l["event"] == "request_sql"][-1]
+    assert linea["path"] == URL and linea["status"] == 200
+    assert linea["statements"] == int(respuesta.headers["X-DB-Statements"])
+    assert linea["slowest_statement"].lstrip().upper().startswith("SELECT")
+
+    # Sin modo debug no hay headers
+    assert "X-DB-Statements" not in client.get(URL).headers
+
+
+def test_consultas_lentas_con_plan():
+    query_stats.SLOW_QUERY_MS, query_stats.SLOW_QUERY_EXPLAIN = 0, True
+    try:
+        with Capturar() as log:
+            client.get(URL)
+    finally:
+        query_stats.SLOW_QUERY_MS, query_stats.SLOW_QUERY_EXPLAIN = 200, False
+
+    lentas = [l for l in log.lineas if l["event"] == "slow_query"]
+    assert lentas
+    assert all(l["plan"] for l in lentas if l["statement"].lstrip().upper().startswith("SELECT"))
+
+
+def test_sentencia_fallida_no_deja_inicios():
+    with engine.connect() as conn:
+        for _ in range(3):
+            try:
+                conn.exec_driver_sql("SELECT * FROM tabla_que_no_existe")
+            except Exception:
+                conn.rollback()
+        assert conn.info.get("query_start") == []
+
+
+def test_consultas_en_paralelo_cuentan_en_el_request():
+    db = SessionLocal()
+    crud.create_user(db, "gerente_estadisticas", "1234", role="admin")
+    db.close()
+    token = client.post("/users/login", json={"Username": "gerente_estadisticas", "Password": "1234"}).json()["access_token"]
+
+    response_cache.clear()
+    query_stats.QUERY_STATS_HEADERS = True
+    try:
+        respuesta = client.get("/dashboard/summary", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        query_stats.QUERY_STATS_HEADERS = False
+
+    assert respuesta.status_code == 200, respuesta.text
+    # Usuario del token + las 4 consultas del resumen, que corren en otros hilos
+    assert int(respuesta.headers["X-DB-Statements"]) >= 5
+
+
+if __name__ == "__main__":
+    test_headers_y_log_por_request()
+    print("✅ Sentencias, tiempo y consulta más lenta por request (headers y log)")
+    test_consultas_lentas_con_plan()
+    print("✅ Las consultas lentas se registran con su plan")
+    test_sentencia_fallida_no_deja_inicios()
+    print("✅ Una sentencia fallida no deja su inicio en la conexión")
+    test_consultas_en_paralelo_cuentan_en_el_request()
+    print("✅ Las consultas en paralelo del dashboard cuentan en el request")
@@ -0,0 +1,92 @@
+"""
+Prueba de la invalidación del caché de respuestas (app.core.response_cache).
+
+/dashboard/summary guarda el estado del inventario con la etiqueta
+"inventory": un cambio de stock, de producto o de precio debe descartarlo
+en lugar de esperar al TTL.
+
+    python test_response_cache.py
+    python -m pytest test_response_cache.py
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "response_cache.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "prueba-cache-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+
+import main
+import crud
+from app.core.response_cache import response_cache
+from database import SessionLocal
+from models import Product
+
+client = TestClient(main.app)
+
+
+def preparar():
+    db = SessionLocal()
+    crud.create_user(db, "gerente_cache", "1234", role="admin")
+    producto = Product(Code="RC1", Barcode="750RC1", Product="Cacheado", Category="Abarrotes",
+                       Units="Pza", Price=Decimal("10.00"), Stock=Decimal(100), Min_Stock=Decimal(5))
+    db.add(producto)
+    db.commit()
+    product_id = producto.Id
+    db.close()
+    token = client.post("/users/login", json={"Username": "gerente_cache", "Password": "1234"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}, product_id
+
+
+HEADERS, PRODUCT_ID = preparar()
+
+
+def inventario() -> dict:
+    respuesta = client.get("/dashboard/summary", headers=HEADERS)
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()["inventory"]
+
+
+def test_cambio_de_stock_invalida_el_resumen():
+    antes = inventario()
+    aciertos = response_cache.stats()["hits"]
+    assert inventario() == antes
+    assert response_cache.stats()["hits"] == aciertos + 1
+
+    # ProductService.update_stock (ruta de inventario)
+    assert client.patch(f"/api/inventario/{PRODUCT_ID}/stock", params={"nuevo_stock": 1}).status_code == 200
+    assert inventario()["low_stock_items"] == antes["low_stock_items"] + 1
+
+    # crud.actualizar_stock
+    db = SessionLocal()
+    crud.actualizar_stock(db, PRODUCT_ID, 100)
+    db.close()
+    assert inventario()["low_stock_items"] == antes["low_stock_items"]
+
+
+def test_alta_y_precios_invalidan_el_resumen():
+    antes = inventario()
+
+    nuevo = client.post("/api/inventario", json={
+        "Code": "RC2", "Barcode": "750RC2", "Product": "Nuevo", "Category": "Abarrotes",
+        "Units": "Pza", "Price": "5.00", "Stock": 10, "Min_Stock": 1
+    })
+    assert nuevo.status_code == 201, nuevo.text
+    assert inventario()["total_products"] == antes["total_products"] + 1
+
+    # Una actualización de precios en lote también descarta la respuesta guardada
+    inventario()
+    db = SessionLocal()
+    crud.actualizar_precios_en_lote(db, [{"Id": PRODUCT_ID, "Price": "11.00"}])
+    db.close()
+    fallos = response_cache.stats()["misses"]
+    inventario()
+    assert response_cache.stats()["misses"] == fallos + 1
+
+
+if __name__ == "__main__":
+    test_cambio_de_stock_invalida_el_resumen()
+    test_alta_y_precios_invalidan_el_resumen()
+    print("✅ El resumen del dashboard se invalida con cambios de inventario")
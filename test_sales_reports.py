@@ -0,0 +1,123 @@
+"""
+Prueba de los reportes agregados del día (crud_cash_register.obtener_ventas_del_dia
+y crud_tickets.resumen_tickets) contra una referencia calculada en Python.
+
+Los reportes suman todo el día, así que corren sobre una BD propia: en una
+corrida completa la BD del proceso la comparten todas las pruebas.
+
+    python test_sales_reports.py
+    python -m pytest test_sales_reports.py
+"""
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIR, 'sales_reports.db')}"
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+import crud_cash_register
+import crud_tickets
+from app.core.time_window import day_window
+from database import Base
+from models import CashRegister, SaleTicket
+
+engine = create_engine(f"sqlite:///{os.path.join(DIR, 'reportes.db')}")
+
+DIA = date(2026, 2, 10)
+VENTANA = day_window(DIA)
+METODOS = ("cash", "card", "transfer")
+
+
+def preparar() -> list[dict]:
+    """Tickets dentro de la ventana y en sus bordes, más cajas del día y del anterior"""
+    Base.metadata.create_all(bind=engine)
+    inicio, fin = VENTANA
+    azar = random.Random(15)
+    momentos = [inicio, fin - timedelta(microseconds=1), inicio - timedelta(seconds=1), fin]
+    momentos += [inicio + timedelta(minutes=azar.randrange(24 * 60)) for _ in range(60)]
+
+    tickets = [
+        {
+            "ticket_number": f"RP-{i}", "cart_id": i + 1, "user_id": 1,
+            "subtotal": total, "total": total,
+            # Sin tickets de transferencia completados: el método no debe aparecer
+            "payment_method": metodo,
+            "status": "cancelled" if metodo == "transfer" or i % 7 == 0 else "completed",
+            "created_at": momento
+        }
+        for i, momento in enumerate(momentos)
+        for total, metodo in [(Decimal(azar.randrange(100, 99999)) / 100, METODOS[i % 3])]
+    ]
+    cajas = [
+        {"user_id": 1, "opened_at": inicio + timedelta(hours=1), "status": "open"},
+        {"user_id": 1, "opened_at": inicio + timedelta(hours=2), "status": "closed"},
+        {"user_id": 1, "opened_at": inicio + timedelta(hours=3), "status": "closed"},
+        {"user_id": 1, "opened_at": inicio - timedelta(hours=1), "status": "closed"},
+    ]
+    with Session(engine) as db:
+        db.execute(insert(SaleTicket), tickets)
+        db.execute(insert(CashRegister), cajas)
+        db.commit()
+    return tickets
+
+
+TICKETS = preparar()
+
+
+def del_dia(tickets: list[dict]) -> list[dict]:
+    inicio, fin = VENTANA
+    return [t for t in tickets if inicio <= t["created_at"] < fin]
+
+
+def test_ventas_del_dia_contra_referencia():
+    completados = [t for t in del_dia(TICKETS) if t["status"] == "completed"]
+    por_metodo = {m: sum((t["total"] for t in completados if t["payment_method"] == m), Decimal(0)) for m in METODOS}
+
+    with Session(engine) as db:
+        reporte = crud_cash_register.obtener_ventas_del_dia(db, DIA)
+
+    assert reporte == {
+        "fecha": DIA.isoformat(),
+        "num_tickets": len(completados),
+        "total_ventas": float(sum(t["total"] for t in completados)),
+        "ventas_efectivo": float(por_metodo["cash"]),
+        "ventas_tarjeta": float(por_metodo["card"]),
+        "ventas_transferencia": 0.0,
+        "num_cajas": 3,
+        "cajas_abiertas": 1,
+        "cajas_cerradas": 2
+    }
+
+
+def test_resumen_tickets_contra_referencia():
+    dia = del_dia(TICKETS)
+    completados = [t for t in dia if t["status"] == "completed"]
+    por_metodo = {}
+    for t in completados:
+        por_metodo[t["payment_method"]] = por_metodo.get(t["payment_method"], Decimal(0)) + t["total"]
+
+    with Session(engine) as db:
+        resumen = crud_tickets.resumen_tickets(db, VENTANA)
+
+    assert resumen == {
+        "total_tickets": len(dia),
+        "completados": len(completados),
+        "cancelados": len(dia) - len(completados),
+        "total_ventas": float(sum(t["total"] for t in completados)),
+        "por_metodo": {metodo: float(total) for metodo, total in por_metodo.items()}
+    }
+    assert set(resumen["por_metodo"]) == {"cash", "card"}
+    # Los dos tickets de los bordes de la ventana quedan dentro, los de fuera no
+    assert len(dia) == len(TICKETS) - 2
+
+
+if __name__ == "__main__":
+    test_ventas_del_dia_contra_referencia()
+    print("✅ Ventas del día: forma y totales por método contra la referencia")
+    test_resumen_tickets_contra_referencia()
+    print("✅ Resumen de tickets: forma y totales por método contra la referencia")
@@ -0,0 +1,111 @@
+"""
+Prueba de los rollups de ventas (crud_rollups).
+
+Los rollups mantenidos en crear_ticket / cancelar_ticket deben coincidir
+con la agregación directa de sale_tickets, y la reconstrucción debe
+producir exactamente lo mismo.
+
+    python test_sales_rollups.py
+    python -m pytest test_sales_rollups.py
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "sales_rollups.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import func
+from database import Base, SessionLocal, engine
+from models import Product, SaleTicket, SaleTicketItem, SalesRollupHourly, SalesRollupProductDaily
+from schemas import CreateTicketRequest
+import crud
+import crud_rollups
+import crud_tickets
+
+
+def vender(db, user_id, lineas, metodo="cash"):
+    cart = crud.crear_carrito(db, user_id)
+    for producto, cantidad in lineas:
+        crud.agregar_item(db, cart.id, producto, Decimal(cantidad))
+    return crud_tickets.crear_ticket(
+        db, CreateTicketRequest(CartId=cart.id, PaymentMethod=metodo), user_id
+    )
+
+
+def rollups(db, usuario, productos):
+    """
+    Rollups del cajero y los productos de la prueba: en una corrida completa
+    la BD es compartida y otros módulos también registran ventas.
+    """
+    horas = {
+        (r.day, r.hour, r.payment_method, r.user_id): (r.num_tickets, r.total)
+        for r in db.query(SalesRollupHourly).filter(SalesRollupHourly.user_id == usuario.ID) if r.num_tickets
+    }
+    por_producto = {
+        (r.day, r.product_id): (r.quantity, r.revenue, r.num_orders)
+        for r in db.query(SalesRollupProductDaily).filter(
+            SalesRollupProductDaily.product_id.in_([p.Id for p in productos])
+        ) if r.num_orders
+    }
+    return horas, por_producto
+
+
+def preparar(sufijo: str):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    usuario = crud.create_user(db, f"cajero_{sufijo}", "1234")
+    productos = []
+    for i in range(3):
+        producto = Product(
+            Code=f"{sufijo}{i}", Barcode=f"{sufijo}B{i}", Product=f"Producto {i}", Category="Abarrotes",
+            Units="Pza", Price=Decimal(10 + i), Stock=Decimal(100), Min_Stock=Decimal(1)
+        )
+        db.add(producto)
+        productos.append(producto)
+    db.commit()
+    return db, usuario, productos
+
+
+def test_rollups_siguen_ventas_y_cancelaciones():
+    db, usuario, (a, b, c) = preparar("RV")
+
+    vender(db, usuario.ID, [(a, 2), (b, "1.5")])
+    vender(db, usuario.ID, [(a, 1), (a, 1)], metodo="card")
+    cancelado = vender(db, usuario.ID, [(b, 3), (c, 1)])
+    crud_tickets.cancelar_ticket(db, cancelado.id, "prueba", usuario.ID)
+
+    horas, productos = rollups(db, usuario, (a, b, c))
+    assert sum(n for n, _ in horas.values()) == 2
+    assert sum(t for _, t in horas.values()) == db.query(func.sum(SaleTicket.total)).filter(
+        SaleTicket.status == "completed", SaleTicket.user_id == usuario.ID
+    ).scalar()
+
+    dia = cancelado.created_at.date()
+    assert productos[(dia, a.Id)] == (Decimal("4"), Decimal("40.00"), 2)
+    assert productos[(dia, b.Id)][2] == 1
+    assert (dia, c.Id) not in productos
+
+    ventas = db.query(func.sum(SaleTicketItem.subtotal)).join(SaleTicket).filter(
+        SaleTicket.status == "completed", SaleTicket.user_id == usuario.ID
+    ).scalar()
+    assert sum(r for _, r, _ in productos.values()) == ventas
+    db.close()
+
+
+def test_reconstruccion_igual_a_incremental():
+    db, usuario, productos = preparar("RR")
+    a, b, _ = productos
+    vender(db, usuario.ID, [(a, 1), (b, 2)], metodo="transfer")
+
+    incremental = rollups(db, usuario, productos)
+    crud_rollups.reconstruir_rollups(db)
+    assert rollups(db, usuario, productos) == incremental
+    db.close()
+
+
+if __name__ == "__main__":
+    test_rollups_siguen_ventas_y_cancelaciones()
+    print("✅ Los rollups siguen las ventas y las cancelaciones")
+    test_reconstruccion_igual_a_incremental()
+    print("✅ La reconstrucción coincide con los rollups incrementales")
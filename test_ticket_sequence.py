@@ -0,0 +1,71 @@
+"""
+Prueba de estrés del consecutivo de tickets (generar_numero_ticket).
+
+Abre muchas sesiones a la vez, cada una pide un número y hace commit.
+Todos los números deben ser únicos y consecutivos, sin huecos.
+
+    python test_ticket_sequence.py
+    python -m pytest test_ticket_sequence.py
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "ticket_sequence.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from database import Base, SessionLocal, engine
+import crud_tickets
+
+SESIONES = 50
+
+
+def pedir_numeros(sesiones: int) -> list[str]:
+    """Cada hilo abre su sesión, espera a los demás y pide un número"""
+    barrera = Barrier(sesiones)
+
+    def pedir(_):
+        db = SessionLocal()
+        try:
+            barrera.wait()
+            numero = crud_tickets.generar_numero_ticket(db)
+            db.commit()
+            return numero
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=sesiones) as pool:
+        return list(pool.map(pedir, range(sesiones)))
+
+
+def test_numeros_unicos_con_sesiones_concurrentes():
+    Base.metadata.create_all(bind=engine)
+
+    numeros = pedir_numeros(SESIONES)
+    consecutivos = sorted(int(n.rsplit("-", 1)[1]) for n in numeros)
+
+    assert len(set(numeros)) == SESIONES
+    assert consecutivos == list(range(consecutivos[0], consecutivos[0] + SESIONES))
+
+
+def test_rollback_no_deja_huecos():
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    anterior = crud_tickets.generar_numero_ticket(db)
+    db.commit()
+    crud_tickets.generar_numero_ticket(db)
+    db.rollback()
+    siguiente = crud_tickets.generar_numero_ticket(db)
+    db.commit()
+    db.close()
+
+    assert int(siguiente.rsplit("-", 1)[1]) == int(anterior.rsplit("-", 1)[1]) + 1
+
+
+if __name__ == "__main__":
+    test_numeros_unicos_con_sesiones_concurrentes()
+    print(f"✅ {SESIONES} sesiones concurrentes obtuvieron números únicos y consecutivos")
+    test_rollback_no_deja_huecos()
+    print("✅ Un rollback no deja huecos en la numeración")
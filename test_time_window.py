@@ -0,0 +1,208 @@
+"""
+Prueba de las ventanas de tiempo de los reportes (app.core.time_window).
+
+Verifica la conversión día de negocio -> [inicio, fin) en UTC, que los
+reportes del día comparan la columna de fecha sin funciones contra
+parámetros y, con EXPLAIN QUERY PLAN, que usan los índices de fecha
+(idx_ticket_date, idx_register_date, idx_withdrawal_date). Con una
+STORE_TIMEZONE distinta de UTC, el "hoy" del dashboard coincide con el de
+los reportes del día de caja y de tickets.
+
+Los planes se piden sobre una BD propia con datos y estadísticas fijos:
+la elección del planificador depende del contenido de las tablas, y en una
+corrida completa la BD del proceso la comparten todas las pruebas.
+
+    python test_time_window.py
+    python -m pytest test_time_window.py
+"""
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIR, 'time_window.db')}"
+os.environ.setdefault("SECRET_KEY", "prueba-ventanas-" + "x" * 32)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert
+from sqlalchemy.orm import Session, sessionmaker
+from database import Base, get_db
+from models import SaleTicket
+from app.core import time_window
+from app.core.response_cache import response_cache
+from app.core.time_window import business_today, day_window
+import crud
+import crud_cash_register
+import crud_rollups
+import crud_withdrawals
+import main
+from contador_consultas import ContadorConsultas
+
+
+# BD propia para los planes (no la del proceso)
+engine = create_engine(f"sqlite:///{os.path.join(DIR, 'planes.db')}")
+
+
+def sentencias_de(funcion, *args) -> list[tuple]:
+    """Ejecuta la función sobre la BD de planes y regresa los SELECT que emitió"""
+    with Session(engine) as db, ContadorConsultas(engine) as consultas:
+        funcion(db, *args)
+    return consultas.selects()
+
+
+def planes_de(funcion, *args) -> list[str]:
+    """Ejecuta la función y regresa el plan de cada SELECT que emitió"""
+    planes = []
+    with engine.connect() as conn:
+        for statement, parameters in sentencias_de(funcion, *args):
+            filas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            planes.append(" | ".join(fila[-1] for fila in filas))
+    return planes
+
+
+def compara_columna_sin_funcion(statement: str, columna: str) -> bool:
+    """La columna aparece sola contra parámetros (>= ? AND < ?): el filtro puede usar su índice"""
+    return bool(
+        re.search(rf"(?<![\w(]){columna} >= \?", statement)
+        and re.search(rf"(?<![\w(]){columna} < \?", statement)
+    )
+
+
+def preparar():
+    """Un año de tickets (casi todos completados) y estadísticas del planificador"""
+    Base.metadata.create_all(bind=engine)
+    db = Session(engine)
+    if db.query(SaleTicket).count() == 0:
+        inicio = datetime(2025, 3, 1)
+        db.execute(insert(SaleTicket), [
+            {
+                "ticket_number": f"TW-{i}", "cart_id": i, "user_id": 1,
+                "subtotal": Decimal("10"), "total": Decimal("10"), "payment_method": "cash",
+                "status": "cancelled" if i % 50 == 0 else "completed",
+                "created_at": inicio + timedelta(minutes=90 * i)
+            }
+            for i in range(6000)
+        ])
+        db.commit()
+    db.close()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def test_ventana_utc_y_zona_horaria():
+    assert day_window(date(2026, 3, 1), "UTC") == (
+        datetime(2026, 3, 1), datetime(2026, 3, 2)
+    )
+    # Ciudad de México: UTC-6 todo el año
+    assert day_window(date(2026, 3, 1), "America/Mexico_City") == (
+        datetime(2026, 3, 1, 6), datetime(2026, 3, 2, 6)
+    )
+    # Cambio de horario: el día de negocio dura 23 horas
+    inicio, fin = day_window(date(2026, 3, 8), "America/New_York")
+    assert (fin - inicio).total_seconds() == 23 * 3600
+
+
+def test_reportes_del_dia_filtran_la_columna_sin_funciones():
+    preparar()
+
+    ventas, cajas = sentencias_de(crud_cash_register.obtener_ventas_del_dia, date(2026, 3, 1))[:2]
+    assert compara_columna_sin_funcion(ventas[0], "sale_tickets.created_at"), ventas[0]
+    assert compara_columna_sin_funcion(cajas[0], "cash_register.opened_at"), cajas[0]
+    assert "date(" not in ventas[0].lower()
+
+    (retiros, _), *_ = sentencias_de(crud_withdrawals.listar_retiros_del_dia, date(2026, 3, 1))
+    assert compara_columna_sin_funcion(retiros, "cash_withdrawals.created_at"), retiros
+
+
+def test_reportes_del_dia_usan_indices_de_fecha():
+    preparar()
+
+    planes = planes_de(crud_cash_register.obtener_ventas_del_dia, date(2026, 3, 1))
+    assert "idx_ticket_date" in planes[0], planes[0]
+    assert "idx_register_date" in planes[1], planes[1]
+
+    planes = planes_de(crud_withdrawals.listar_retiros_del_dia, date(2026, 3, 1))
+    assert "idx_withdrawal_date" in planes[0], planes[0]
+
+
+def test_func_date_no_usa_el_indice():
+    preparar()
+
+    def con_func_date(db, fecha):
+        db.query(SaleTicket).filter(func.date(SaleTicket.created_at) == fecha).all()
+
+    planes = planes_de(con_func_date, date(2026, 3, 1))
+    assert "idx_ticket_date" not in planes[0], planes[0]
+
+
+def test_hoy_del_dashboard_coincide_con_los_reportes_del_dia():
+    """Ventas en los bordes del día local: el dashboard y los reportes cuentan las mismas"""
+    zona = create_engine(f"sqlite:///{os.path.join(DIR, 'zona.db')}")
+    Base.metadata.create_all(bind=zona)
+    ZonaSession = sessionmaker(bind=zona)
+
+    def get_db_zona():
+        db = ZonaSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    anterior = time_window.STORE_TIMEZONE
+    time_window.STORE_TIMEZONE = "America/Mexico_City"
+    main.app.dependency_overrides[get_db] = get_db_zona
+    response_cache.clear()
+    try:
+        inicio, fin = day_window(business_today())
+        assert inicio.hour == 6
+        with ZonaSession() as db:
+            crud.create_user(db, "gerente_zona", "1234", role="admin")
+            db.execute(insert(SaleTicket), [
+                {
+                    "ticket_number": f"TZ-{i}", "cart_id": i + 1, "user_id": 1,
+                    "subtotal": total, "total": total, "payment_method": metodo,
+                    "status": "completed", "created_at": momento
+                }
+                for i, (momento, total, metodo) in enumerate([
+                    (inicio, Decimal("10.00"), "cash"),
+                    (fin - timedelta(minutes=1), Decimal("25.50"), "card"),
+                    # Mismo día UTC que el inicio, pero el día local anterior
+                    (inicio - timedelta(minutes=1), Decimal("100.00"), "cash"),
+                    (fin, Decimal("200.00"), "cash"),
+                ])
+            ])
+            db.commit()
+            crud_rollups.reconstruir_rollups(db)
+
+        client = TestClient(main.app)
+        token = client.post("/users/login", json={"Username": "gerente_zona", "Password": "1234"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        resumen = client.get("/dashboard/summary", params={"period": "today"}, headers=headers).json()
+        caja = client.get("/cash-register/reports/today", headers=headers).json()
+        tickets = client.get("/tickets/reports/today", params={"incluir_tickets": False}, headers=headers).json()
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+        time_window.STORE_TIMEZONE = anterior
+        response_cache.clear()
+
+    assert resumen["date_range"] == {"start": inicio.isoformat(), "end": fin.isoformat()}
+    assert resumen["transactions"]["total"] == caja["num_tickets"] == tickets["completados"] == 2
+    assert resumen["sales"]["total"] == caja["total_ventas"] == tickets["total_ventas"] == 35.5
+    assert {m["method"]: m["total"] for m in resumen["payment_methods"]} == tickets["por_metodo"]
+    assert resumen["sales"]["previous_period"] == 100.0
+
+
+if __name__ == "__main__":
+    test_ventana_utc_y_zona_horaria()
+    print("✅ Día de negocio -> [inicio, fin) en UTC, con zona horaria y cambio de horario")
+    test_reportes_del_dia_filtran_la_columna_sin_funciones()
+    print("✅ Los reportes del día comparan la columna de fecha sola contra parámetros")
+    test_reportes_del_dia_usan_indices_de_fecha()
+    print("✅ Los reportes del día usan idx_ticket_date, idx_register_date e idx_withdrawal_date")
+    test_func_date_no_usa_el_indice()
+    print("✅ func.date(created_at) = fecha no puede usar el índice")
+    test_hoy_del_dashboard_coincide_con_los_reportes_del_dia()
+    print("✅ El \"hoy\" del dashboard coincide con los reportes del día en otra zona horaria")